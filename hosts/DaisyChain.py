@@ -9,10 +9,24 @@ import socket
 import select
 import json
 import re
+import time
+import struct
 import hashlib
+import threading
+import tempfile
+import zlib
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from typing import Union, Tuple, Optional, TYPE_CHECKING
 
+try:
+    # optional, for the binary codec: pip install msgpack (into Resolve's python)
+    import msgpack
+except ImportError:
+    msgpack = None
+
 if TYPE_CHECKING:
     from resolve_types import BMD, Resolve, Fusion
 else:
@@ -48,11 +62,12 @@ else:
     - Initializes the connection to Resolve
         - Starts a UI window to see status
 
-    - Hosts a TCP server for command requests
+    - Hosts a TCP server (and a Unix domain socket
+        server, for local clients) for command requests
 
     - On command request:
         - Deserializes the command and its args
-            from the json bytes on the wire
+            from the json (or msgpack) bytes on the wire
         - Reconstructs it into a function call
             if all args are valid (else error)
         - Performs the requested command
@@ -61,9 +76,60 @@ else:
 
 """
 
-HOST = "127.0.0.1"  # Standard loopback interface address (localhost)
-PORT = 65432  # Port to listen on (non-privileged ports are > 1023)
-RATE = 50  # Milliseconds per update
+# settings come from the environment (DAISYCHAIN_<NAME>), else this
+# json file, else their defaults, as for clients (see daisychain.config)
+CONFIG = Path(
+    os.environ.get("DAISYCHAIN_CONFIG", Path.home() / ".daisychain.json")
+).expanduser()
+
+
+def load_config(path: Path) -> dict:
+    try:
+        with open(path) as config_file:
+            return json.load(config_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"❌ Ignoring config {path}: {e}")
+        return {}
+
+
+config = load_config(CONFIG)
+
+
+def setting(name: str, default=None):
+    value = os.environ.get(f"DAISYCHAIN_{name.upper()}")
+    if value is not None:
+        return value
+    return config.get(name, default)
+
+
+def default_socket(port: int) -> Optional[str]:
+    if not hasattr(socket, "AF_UNIX"):
+        return None  # Windows
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime, f"daisychain-{port}.sock")
+
+
+HOST = setting("host", "127.0.0.1")  # Standard loopback interface address (localhost)
+# Port to listen on (non-privileged ports are > 1023)
+PORT = int(setting("port", 65432))
+RATE = int(setting("rate", 50))  # Milliseconds per update
+SOCKET = setting("socket", default_socket(PORT))  # Unix domain socket, or "none"
+if SOCKET is not None and SOCKET.lower() in ("", "none"):
+    SOCKET = None
+RECORD = os.environ.get("DAISYCHAIN_RECORD")  # Log requests & replies to this path
+
+MAGIC = 0xDC  # first byte of a framed (binary) message, json ones start with "{"
+FRAME = struct.Struct(">BBI")  # magic, codec id, payload length
+HANDLE = 1  # msgpack ext type of API object handles
+HANDLE_REF = struct.Struct(">HI")  # type index, handle
+COMPRESSED = 0x80  # codec id flag of zlib compressed frames
+COMPRESSION = ["zlib"]  # compressions the host speaks
+COMPRESS_LEVEL = 1  # fast, large replies are what's worth compressing
+SHARED = 0x40  # codec id flag of frames whose payload is in the file they name
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+SHARED_TTL = 60  # seconds before unclaimed shared replies are deleted
 
 
 def script_init() -> Tuple[BMD, Resolve, Fusion]:
@@ -91,6 +157,39 @@ def log_to_file(log_string: str):
         log_file.write("\n")
 
 
+class RequestLog:
+    """
+    Append-only log of requests & replies with timings, one json
+    object per line, as read by the client's `daisychain.replay`
+    """
+
+    def __init__(self, path: str):
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()  # replies may be sent from the sender
+        self.file = open(path, "ab")
+        header = {"daisychain_log": 1, "side": "host", "started": time.time()}
+        self.file.write(json.dumps(header).encode() + b"\n")
+        self.file.flush()
+
+    def record(self, rqst: bytes, resp: bytes, started: float, ended: float):
+        # json messages are spliced in as they are, framed ones converted
+        rqst, resp = as_json(rqst), as_json(resp)
+        at = started - self.origin
+        ms = (ended - started) * 1000
+        with self.lock:
+            self.file.write(
+                f'{{"at": {at:.6f}, "ms": {ms:.3f}, "rqst": '.encode()
+                + rqst
+                + b', "resp": '
+                + resp
+                + b"}\n"
+            )
+            self.file.flush()
+
+
+request_log = RequestLog(RECORD) if RECORD else None
+
+
 class API_Object:
     def GetUniqueId(self) -> str:
         return str()
@@ -103,54 +202,282 @@ API_ObjType = Union[API_Object, API_Roots]
 # this is an ongoing cache which can be
 # reset by clicking the clear cache btn
 API_Objects: dict[str, API_ObjType] = {}
+# the type & uuid of each of them, by repr, to skip re-hashing
+API_Keys: dict[str, Tuple[str, str]] = {}
+
+# binary codecs refer to API objects by small integer handles instead,
+# which unlike uuids are never reused, so stale handles find nothing
+API_Handles: dict[int, str] = {}
+handle_refs: dict[str, "msgpack.ExtType"] = {}
+last_handle = 0
+
+# changes whenever the objects are reset (and so on every start), so that
+# clients can tell that their references are stale and find them again
+epoch = int.from_bytes(os.urandom(4), "big")
+# the objects (& handles) from before the last reset, to tell that those
+# found again are still them
+Retired_Objects: dict[str, API_ObjType] = {}
+Retired_Handles: dict[int, str] = {}
+
+# ...and to their types by index, sending each client each name once
+API_Types: list[str] = []
+type_ids: dict[str, int] = {}
+
+
+class Histogram:
+    """Latency histogram over fixed, log-spaced millisecond buckets"""
+
+    BOUNDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect_left(self.BOUNDS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the `q` quantile"""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "max_ms": round(self.max, 3),
+            "p50_ms": round(self.quantile(0.50), 3),
+            "p95_ms": round(self.quantile(0.95), 3),
+            "bounds_ms": list(self.BOUNDS),
+            "buckets": self.counts,
+        }
 
 
-def serialize(
-    obj: Union[API_Value, API_Object, API_Roots], error: Optional[str] = None
-):
-    global API_Objects
+class MethodStats:
+    """Counters and latency histograms for one (type, method)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.decode = Histogram()
+        self.call = Histogram()
+        self.encode = Histogram()
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "decode": self.decode.to_dict(),
+            "call": self.call.to_dict(),
+            "encode": self.encode.to_dict(),
+        }
 
-    if error is not None:
-        print(f"❌ Execution error > {error}")
+
+class HostMetrics:
+    """
+    Everything the host knows about where its time goes,
+    served to clients by the `daisychain_stats` command
+    """
+
+    WINDOW = 5.0  # seconds of history for the live rate & p95
+
+    def __init__(self):
+        self.started = time.time()
+        self.lock = threading.Lock()  # replies may be sent from the sender
+        self.methods: dict[Tuple[str, str], MethodStats] = {}
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compressed = 0
+        self.compressed_bytes_in = 0
+        self.compressed_bytes_out = 0
+        self.compress = Histogram()
+        self.shared = 0
+        self.shared_bytes = 0
+        self.queue_depth = 0
+        self.queue_depth_max = 0
+        self.recent: deque = deque(maxlen=4096)  # (timestamp, total_ms)
+
+    def record(
+        self,
+        typ: str,
+        impl: str,
+        decode_ms: float,
+        call_ms: float,
+        encode_ms: float,
+        error: bool,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+    ):
+        stats = self.methods.get((typ, impl))
+        if stats is None:
+            stats = self.methods[(typ, impl)] = MethodStats()
+
+        stats.calls += 1
+        stats.errors += int(error)
+        stats.bytes_in += bytes_in
+        stats.bytes_out += bytes_out
+        stats.decode.add(decode_ms)
+        stats.call.add(call_ms)
+        stats.encode.add(encode_ms)
+
+        self.requests += 1
+        self.recent.append((time.time(), decode_ms + call_ms + encode_ms))
+
+    def record_sent(self, size: int):
+        with self.lock:
+            self.bytes_out += size
+
+    def record_compression(self, size_in: int, size_out: int, ms: float):
+        with self.lock:
+            self.compressed += 1
+            self.compressed_bytes_in += size_in
+            self.compressed_bytes_out += size_out
+            self.compress.add(ms)
+
+    def record_shared(self, size: int):
+        with self.lock:
+            self.shared += 1
+            self.shared_bytes += size
+
+    def record_queue(self, depth: int):
+        self.queue_depth = depth
+        self.queue_depth_max = max(self.queue_depth_max, depth)
+
+    def live(self) -> Tuple[float, Optional[float]]:
+        """Requests/sec and p95 latency (ms) over the last WINDOW seconds"""
+        since = time.time() - self.WINDOW
+        latencies = sorted(ms for t, ms in self.recent if t >= since)
+        if not latencies:
+            return 0.0, None
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        return len(latencies) / self.WINDOW, p95
+
+    def snapshot(self) -> dict:
+        rate, p95 = self.live()
+        return {
+            "version": __version__,
+            "uptime_s": round(time.time() - self.started, 3),
+            "requests": self.requests,
+            "requests_per_s": round(rate, 3),
+            "p95_ms": None if p95 is None else round(p95, 3),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "queue_depth": self.queue_depth,
+            "queue_depth_max": self.queue_depth_max,
+            "api_objects": len(API_Objects),
+            "compression": {
+                "replies": self.compressed,
+                "bytes_in": self.compressed_bytes_in,
+                "bytes_out": self.compressed_bytes_out,
+                "compress": self.compress.to_dict(),
+            },
+            "shared": {"replies": self.shared, "bytes": self.shared_bytes},
+            "methods": {
+                f"{typ}.{impl}": stats.to_dict()
+                for (typ, impl), stats in self.methods.items()
+            },
+        }
+
+
+metrics = HostMetrics()
+
+
+def api_ref(typ: str, uuid: str):
+    """Reference to the API object `uuid` of type `typ`, as json"""
+    return {"API_Object": {"type": typ, "uuid": uuid}}
+
+
+def unique_id_of(obj) -> Optional[str]:
+    """Resolve's own id for `obj`, if it has one"""
+    try:
+        get_unique_id = getattr(obj, "GetUniqueId", None)
+        unique_id = get_unique_id() if callable(get_unique_id) else None
+    except Exception:
+        return None
+    return unique_id if isinstance(unique_id, str) and unique_id else None
+
+
+def to_wire(obj: Union[API_Value, API_Object, API_Roots], ref=api_ref):
+    """
+    Convert `obj` into json-able values, replacing (recursively)
+    any API objects with references kept in API_Objects, made by `ref`
+    """
+    global API_Objects
 
     if isinstance(obj, list):
-        # recurse through args to ensure they
-        # are serialized if API_Objects
-        obj = [json.loads(serialize(elem))["value"] for elem in obj]
+        return [to_wire(elem, ref) for elem in obj]
 
     if isinstance(obj, dict):
-        # recurse through args to ensure they
-        # are serialized if API_Objects
-        obj = {k: json.loads(serialize(v))["value"] for k, v in obj.items()}
+        # keys as json would have them, whichever the codec
+        return {
+            k if isinstance(k, str) else json.dumps(k): to_wire(v, ref)
+            for k, v in obj.items()
+        }
 
-    if not isinstance(obj, API_Value):
-        # obj is an api object!
-        try:
-            # key by repr
-            key_obj = str(obj)
-            typ_obj = re.findall(r"^\w+", str(obj))[0]
+    if isinstance(obj, API_Value):
+        return obj
+
+    # obj is an api object!
+    # key by repr
+    key_obj = str(obj)
+    known = API_Keys.get(key_obj)
+    if known is not None:
+        return ref(*known)
 
-            # generate a unique id for the key obj
-            key_obj = hashlib.sha256(key_obj.encode()).hexdigest()
-            jsn_obj = {"API_Object": {"type": typ_obj, "uuid": key_obj}}
+    typ_obj = re.findall(r"^\w+", key_obj)[0]
 
-            # retain reference to obj
-            API_Objects[key_obj] = obj
-            print(f"👍 Added {typ_obj} to API_Objects")
+    # generate a unique id for the key obj
+    uuid = hashlib.sha256(key_obj.encode()).hexdigest()
 
-        except TypeError:
-            jsn_obj = None
+    # retain reference to obj
+    API_Objects[uuid] = obj
+    API_Keys[key_obj] = known = (typ_obj, uuid)
+    print(f"👍 Added {typ_obj} to API_Objects")
+
+    return ref(*known)
+
+
+def envelope(
+    obj: Union[API_Value, API_Object, API_Roots],
+    error: Optional[str] = None,
+    ref=api_ref,
+) -> dict:
+    """Reply envelope for `obj` (or for the `error` raised making it)"""
+    if error is None:
+        try:
+            obj = to_wire(obj, ref)
+        except (TypeError, IndexError):
             error = f"TypeError: {obj} cannot be serialized"
 
-    else:
-        jsn_obj = obj
+    if error is not None:
+        obj = None
+        print(f"❌ Execution error > {error}")
 
-    return json.dumps(
-        {
-            "value": jsn_obj,
-            "error": error,
-        }
-    )
+    return {
+        "value": obj,
+        "error": error,
+    }
+
+
+def serialize(
+    obj: Union[API_Value, API_Object, API_Roots], error: Optional[str] = None
+) -> str:
+    return json.dumps(envelope(obj, error))
 
 
 def deserialize(desc: dict):
@@ -161,23 +488,303 @@ def deserialize(desc: dict):
     """
     global API_Objects
 
-    if desc["uuid"] in API_Objects.keys():
-        return API_Objects[desc["uuid"]]
+    uuid = desc["uuid"]
+    if isinstance(uuid, int):
+        uuid = API_Handles.get(uuid)
+
+    if uuid in API_Objects.keys():
+        return API_Objects[uuid]
     else:
         return None
 
 
+class StaleHandleError(Exception):
+    """A reference to an object from before a reset (or another host)"""
+
+
+def by_uuid(value):
+    """
+    `value` from a client with its references by uuid, as `to_wire` makes
+    them, rather than by handle (as binary codecs send them)
+    """
+    if isinstance(value, list):
+        return [by_uuid(elem) for elem in value]
+    if isinstance(value, dict):
+        ref = value.get("API_Object")
+        if isinstance(ref, dict) and isinstance(ref.get("uuid"), int):
+            return api_ref(ref.get("type"), API_Handles.get(ref["uuid"]))
+        return {k: by_uuid(v) for k, v in value.items()}
+    return value
+
+
+def from_wire(value):
+    """Inverse of `to_wire`, replacing references with their API objects"""
+    if isinstance(value, list):
+        return [from_wire(elem) for elem in value]
+
+    if isinstance(value, dict):
+        if "API_Object" in value:
+            obj = deserialize(value["API_Object"])
+            if obj is None:
+                raise StaleHandleError(f'unknown {value["API_Object"].get("type")}')
+            return obj
+        return {k: from_wire(v) for k, v in value.items()}
+
+    return value
+
+
+def retired(handle: Union[str, int]):
+    """The object `handle` referred to before the last reset, if it's known"""
+    uuid = Retired_Handles.get(handle) if isinstance(handle, int) else handle
+    return Retired_Objects.get(uuid)
+
+
+def still(was, obj) -> bool:
+    """Whether `obj` is `was` (from before the reset), as far as can be told"""
+    if was is None or str(was) == str(obj):
+        return True
+    # asked only now, as asking every object would cost as much again as
+    # listing them
+    was_id = unique_id_of(was)
+    return was_id is None or was_id == unique_id_of(obj)
+
+
+def find_again(root, steps: list) -> list:
+    """
+    Follow `steps` (each `{"impl", "args", "kwgs", "key"}`) down from
+    `root`, for clients to find their objects again after a reset:
+    what each step found (picking `key` out of what it returned),
+    but the whole of what the last step returned. Steps may say what
+    they `"was"` (its handle from before the reset), and the last what
+    each of its objects `"were"` (`[key, handle]`s): an object which is
+    no longer that (a clip was deleted, and the next one moved into its
+    place) is gone
+    """
+    found = []
+    obj = root
+    for step in steps:
+        value = getattr(obj, step["impl"])(
+            *from_wire(step.get("args", [])), **from_wire(step.get("kwgs", {}))
+        )
+        obj = value
+        for key, handle in step.get("were", []):
+            if isinstance(value, dict) and key not in value:
+                key = json.loads(key)  # non-str keys went over the wire as json
+            try:
+                if not still(retired(handle), value[key]):
+                    value[key] = None
+            except (IndexError, KeyError):
+                pass  # gone, with the listing shorter
+        key = step.get("key")
+        if key is not None:
+            if isinstance(value, dict) and key not in value:
+                key = json.loads(key)
+            obj = value[key]
+        if "was" in step and not still(retired(step["was"]), obj):
+            raise StaleHandleError(f"{step['impl']} finds something else where it was")
+        found.append(obj)
+    found[-1] = value
+    return found
+
+
 def reset_cache():
     """
     Clear the API_Objects cache
     """
-    global API_Objects
+    global API_Objects, API_Keys, API_Handles, handle_refs, epoch
+    global Retired_Objects, Retired_Handles
+    Retired_Objects, Retired_Handles = API_Objects, API_Handles
     API_Objects = {}
+    API_Keys = {}
+    API_Handles = {}
+    handle_refs = {}
+    epoch = int.from_bytes(os.urandom(4), "big")
+
+
+class JSONCodec:
+    """The default codec, which clients in any language can speak"""
+
+    name = "json"
+    id = 0
+    ref = staticmethod(api_ref)
+
+    def loads(self, payload: bytes) -> dict:
+        return json.loads(payload.decode())
+
+    def to_json(self, payload: bytes) -> bytes:
+        return payload
+
+    def dumps(self, reply_env: dict) -> bytes:
+        return json.dumps(reply_env).encode()
+
+    def with_timings(self, output: bytes, timings: dict) -> bytes:
+        # splice the timings into the already encoded envelope
+        return output[:-1] + b', "timings": ' + json.dumps(timings).encode() + b"}"
+
+    def frame(self, output: bytes, known_types: int) -> bytes:
+        return output
+
+
+class MsgpackCodec:
+    """
+    MessagePack, with API objects as ext type HANDLE (type index & handle),
+    and replies framed with the type names the client doesn't know yet
+    """
+
+    name = "msgpack"
+    id = 1
+
+    def ref(self, typ: str, uuid: str) -> "msgpack.ExtType":
+        global last_handle
 
+        ref = handle_refs.get(uuid)
+        if ref is not None:
+            return ref
 
-def execute_remote_command(raw_cmd: bytes) -> str:
+        typ_id = type_ids.get(typ)
+        if typ_id is None:
+            typ_id = type_ids[typ] = len(API_Types)
+            API_Types.append(typ)
+
+        last_handle += 1
+        API_Handles[last_handle] = uuid
+        ref = handle_refs[uuid] = msgpack.ExtType(
+            HANDLE, HANDLE_REF.pack(typ_id, last_handle)
+        )
+        return ref
+
+    def ext_hook(self, code: int, data: bytes):
+        if code != HANDLE:
+            return msgpack.ExtType(code, data)
+        typ_id, handle = HANDLE_REF.unpack(data)
+        return api_ref(API_Types[typ_id], handle)
+
+    def loads(self, payload: bytes) -> dict:
+        return msgpack.unpackb(payload, ext_hook=self.ext_hook, strict_map_key=False)
+
+    def dumps(self, reply_env: dict) -> bytes:
+        return msgpack.packb(reply_env)
+
+    def with_timings(self, output: bytes, timings: dict) -> bytes:
+        # the envelope is a small map: count one more entry and append it
+        return (
+            bytes([output[0] + 1])
+            + output[1:]
+            + msgpack.packb("timings")
+            + msgpack.packb(timings)
+        )
+
+    def frame(self, output: bytes, known_types: int) -> bytes:
+        types = msgpack.packb([known_types, API_Types[known_types:]])
+        return FRAME.pack(MAGIC, self.id, len(types) + len(output)) + types + output
+
+    def to_json(self, payload: bytes) -> bytes:
+        """The (last) message in `payload`, as json"""
+        unpacker = msgpack.Unpacker(ext_hook=self.ext_hook, strict_map_key=False)
+        unpacker.feed(payload)
+        *_, message = unpacker
+        return json.dumps(message).encode()
+
+
+# in order of preference
+CODECS = {"json": JSONCodec()}
+if msgpack is not None:
+    CODECS = {"msgpack": MsgpackCodec(), **CODECS}
+
+FRAMED = {codec.id: codec for codec in CODECS.values()}
+
+
+def compress_frame(message: bytes) -> bytes:
+    """`message` (json, or a frame) as a compressed frame"""
+    codec_id, payload = 0, message
+    if message[0] == MAGIC:
+        codec_id, payload = message[1], message[FRAME.size :]
+    payload = zlib.compress(payload, COMPRESS_LEVEL)
+    return FRAME.pack(MAGIC, codec_id | COMPRESSED, len(payload)) + payload
+
+
+class SharedReplies:
+    """
+    Large replies to clients on this machine, written to files (in
+    shared memory where there is one) which clients map and delete,
+    so that only their paths go through the socket
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.written: deque = deque()  # (time, path)
+
+        # clients read the token back to know they see the same files
+        self.token = os.urandom(16).hex()
+        self.probe = self.write(self.token.encode(), ".probe")
+
+    def write(self, payload: bytes, suffix: str = ".reply") -> str:
+        fd, path = tempfile.mkstemp(suffix, "daisychain-", self.directory)
+        with os.fdopen(fd, "wb") as shared_file:
+            shared_file.write(payload)
+        return path
+
+    def share_frame(self, message: bytes) -> bytes:
+        """`message` (json, or a frame) as a frame naming the file it's in"""
+        codec_id, payload = 0, message
+        if message[0] == MAGIC:
+            codec_id, payload = message[1], message[FRAME.size :]
+        path = self.write(payload)
+        self.written.append((time.time(), path))
+        path = path.encode()
+        return FRAME.pack(MAGIC, codec_id | SHARED, len(path)) + path
+
+    def sweep(self, ttl: float = SHARED_TTL):
+        """Delete replies which went unclaimed (clients delete the rest)"""
+        while self.written and self.written[0][0] < time.time() - ttl:
+            _, path = self.written.popleft()
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        self.sweep(ttl=0)
+        os.remove(self.probe)
+
+
+def unframe(message: bytes) -> Tuple[int, bytes]:
+    """The codec id and (decompressed) payload of a framed `message`"""
+    codec_id, payload = message[1], message[FRAME.size :]
+    if codec_id & COMPRESSED:
+        codec_id, payload = codec_id & ~COMPRESSED, zlib.decompress(payload)
+    return codec_id, payload
+
+
+def as_json(message: bytes) -> bytes:
+    """`message` (json, or a frame) as json, for logging"""
+    if message[0] != MAGIC:
+        return message
+    codec_id, payload = unframe(message)
+    return FRAMED[codec_id].to_json(payload)
+
+
+def message_complete(message: bytes) -> bool:
+    """Whether `message` holds a whole command (json ones may yet fail to parse)"""
+    if message[0] == MAGIC:
+        if len(message) < FRAME.size:
+            return False
+        return len(message) >= FRAME.size + FRAME.unpack_from(message)[2]
+    return message.endswith(b"}")
+
+
+def execute_remote_command(
+    raw_cmd: bytes, tick: Optional[float] = None, waited: float = 0.0
+) -> Tuple[bytes, Optional[str]]:
     """Validate and execute the remote command call
-    from its json encoded in utf-8 bytes over TCP.
+    from its json encoded in utf-8 bytes over TCP
+    (or, once negotiated, framed in another codec, see CODECS),
+    returning the reply and how to deliver it if not as it is:
+    "zlib" to compress it, or "shared" to share it through a file.
+
+    `tick` is the `time.perf_counter()` at which the host loop
+    picked up this command; if the command asks for `"trace": true`
+    the reply carries the host's `"timings"` in milliseconds
 
     Schema must exactly match:
     - root: dict - object lookup {'API_Object': {'type':str, 'uuid':str}}
@@ -214,42 +821,227 @@ def execute_remote_command(raw_cmd: bytes) -> str:
     If the function signature doesn't match any known functions
         in the Resolve API, we will raise KeyError / TypeError
 
+    The `daisychain_init` command may offer `"codecs": [...]` and
+    `"compression": [...]`, and the reply names the first of each that
+    the host speaks as `"codec"` and `"compression"`. Commands may then
+    ask for replies over `"compress": n` bytes to be compressed.
+
+    It may also offer `"shared": true`, and the reply then carries
+    `"shared": {"probe": path, "token": str}`; clients which find the token
+    in the probe file may ask for replies over `"share": n` bytes to be shared
+
+    Its reply also carries the host's `"epoch"`, which commands may carry
+    back: commands from before a reset (or from before the host restarted)
+    are answered with a `StaleHandleError` and the current `"epoch"`, and
+    `daisychain_resolve` follows a list of steps (see `find_again`) to find
+    those objects again, in one request; steps which say what they `"was"`
+    are checked (by `GetUniqueId`) to find the same object again, and not
+    the next clip along
+
+    `daisychain_watch` follows steps like `daisychain_resolve`, but only
+    replies with what the last step returned once it's no longer the
+    `last` the client has (or it has `waited` its `"timeout"` seconds):
+    "wait" is how to deliver it until then, its reply the seconds until
+    the host loop is to ask again (its `"every"`, or the next tick), so
+    clients hear of changes without polling for them
+
+    `daisychain_batch` makes a list of calls (each `{"impl", "args",
+    "kwgs"}`, and `"on"` another object rather than the root) one after
+    another, in one request: its reply is the list of their
+    `{"value", "error"}`s
+
     """
 
-    # decode json bytes to python dictionary
-    cmd: dict = json.loads(raw_cmd.decode())
+    t_start = time.perf_counter()
+    t_decoded = t_called = None
+    typ, impl = "?", "?"
+    traced = False
+    known_types = 0
+    compress_above = share_above = None
+    codec = CODECS["json"]
+
+    def reply(
+        obj, error: Optional[str] = None, **fields
+    ) -> Tuple[bytes, Optional[str]]:
+        """Serialize the reply and record where the time went"""
+        t_reply = time.perf_counter()
+        reply_env = envelope(obj, error, codec.ref)
+        reply_env.update(fields)
+        output = codec.dumps(reply_env)
+        t_end = time.perf_counter()
+
+        decoded = t_decoded or t_reply
+        called = t_called or decoded
+        timings = {
+            "queue_ms": (t_start - (tick or t_start)) * 1000,
+            "decode_ms": (decoded - t_start) * 1000,
+            "call_ms": (called - decoded) * 1000,
+            "encode_ms": (t_end - called) * 1000,
+        }
+        metrics.record(
+            typ,
+            impl,
+            decode_ms=timings["decode_ms"],
+            call_ms=timings["call_ms"],
+            encode_ms=timings["encode_ms"],
+            error=reply_env["error"] is not None,
+            bytes_in=len(raw_cmd),
+            bytes_out=len(output),
+        )
+
+        if traced:
+            # add the timings to the already encoded envelope,
+            # so that they can include the time taken to encode it
+            output = codec.with_timings(output, timings)
+
+        output = codec.frame(output, known_types)
+        if share_above is not None and len(output) > share_above:
+            return output, "shared"
+        if compress_above is not None and len(output) > compress_above:
+            return output, "zlib"
+        return output, None
+
+    # decode json (or framed) bytes to python dictionary
+    payload = raw_cmd
+    if raw_cmd[0] == MAGIC:
+        codec_id, payload = unframe(raw_cmd)
+        if codec_id not in FRAMED:
+            return reply(None, error=f"TypeError: unknown codec {codec_id}")
+        codec = FRAMED[codec_id]
+
+    cmd: dict = codec.loads(payload)
+    traced = cmd.get("trace") is True
+    known_types = cmd.get("types", 0)
+    compress_above = cmd.get("compress")
+    share_above = cmd.get("share")
 
     # validate the command schema and types
     # (basics)
     try:
         assert "root" in cmd.keys() and isinstance(cmd["root"], dict)
     except AssertionError:
-        return serialize(None, error=f"TypeError: invalid command type: {cmd}")
+        return reply(None, error=f"TypeError: invalid command type: {cmd}")
 
     try:
         assert "impl" in cmd.keys() and isinstance(cmd["impl"], str)
     except AssertionError:
-        return serialize(None, error=f"TypeError: invalid command type: {cmd}")
+        return reply(None, error=f"TypeError: invalid command type: {cmd}")
+
+    impl = cmd["impl"]
 
     try:
         assert ("args" in cmd.keys()) and isinstance(cmd["args"], list)
     except AssertionError:
-        return serialize(None, error=f"TypeError: invalid command args: {cmd}")
+        return reply(None, error=f"TypeError: invalid command args: {cmd}")
 
     try:
         assert ("kwgs" in cmd.keys()) and isinstance(cmd["kwgs"], dict)
     except AssertionError:
-        return serialize(None, error=f"TypeError: invalid command kwgs: {cmd}")
+        return reply(None, error=f"TypeError: invalid command kwgs: {cmd}")
 
     # detect if this is an initialization requst (`daisychain_init`)
     # in which case we simply return the root ref resolve
     if cmd["impl"] == "daisychain_init":
         print("🌼 Initializing:", cmd)
-        return serialize(resolve)
+        typ = "DaisyChain"
+        offered = [name for name in cmd.get("codecs", []) if name in CODECS]
+        compression = [c for c in cmd.get("compression", []) if c in COMPRESSION]
+        t_decoded = time.perf_counter()
+        shared = None
+        if cmd.get("shared") and shared_replies is not None:
+            shared = {"probe": shared_replies.probe, "token": shared_replies.token}
+        return reply(
+            resolve,
+            codec=offered[0] if offered else "json",
+            compression=compression[0] if compression else None,
+            shared=shared,
+            epoch=epoch,
+        )
+
+    # host metrics are answered by the host itself, not by Resolve
+    if cmd["impl"] == "daisychain_stats":
+        typ = "DaisyChain"
+        t_decoded = time.perf_counter()
+        return reply(metrics.snapshot())
+
+    # references from before a reset are stale, even if their handles
+    # happen to have been reused
+    if cmd.get("epoch", epoch) != epoch:
+        return reply(
+            None, error="StaleHandleError: the host's objects were reset", epoch=epoch
+        )
 
     # validate that the type exists and the impl exists for that type
     src_desc = cmd["root"]["API_Object"]
+    typ = src_desc.get("type", "?")
     src_root = deserialize(src_desc)
+    if src_root is None:
+        return reply(None, error=f"StaleHandleError: unknown {typ}", epoch=epoch)
+
+    if cmd["impl"] == "daisychain_resolve":
+        t_decoded = time.perf_counter()
+        try:
+            found = find_again(src_root, cmd["args"][0])
+        except Exception as e:
+            return reply(
+                None, error=f"StaleHandleError: not found again ({e})", epoch=epoch
+            )
+        t_called = time.perf_counter()
+        return reply(found)
+
+    if cmd["impl"] == "daisychain_watch":
+        try:
+            steps, last = cmd["args"]
+            assert isinstance(steps, list) and steps
+            assert all(isinstance(step, dict) and "impl" in step for step in steps)
+            timeout = float(cmd["kwgs"].get("timeout", 0))
+            every = float(cmd["kwgs"].get("every", 0))
+        except (AssertionError, TypeError, ValueError):
+            return reply(None, error=f"TypeError: invalid watch args: {cmd}")
+        t_decoded = time.perf_counter()
+        try:
+            value = find_again(src_root, steps)[-1]
+        except Exception:
+            value = None  # nothing there, eg. no item under the playhead
+        t_called = time.perf_counter()
+        try:
+            unchanged = to_wire(value) == by_uuid(last)
+        except (TypeError, IndexError):
+            return reply(None, error=f"TypeError: {value} cannot be serialized")
+        if unchanged and waited < timeout:
+            # but not past the timeout, to reply with no change on time
+            return str(min(every, timeout - waited)).encode(), "wait"
+        return reply(value)
+
+    if cmd["impl"] == "daisychain_batch":
+        try:
+            calls = [
+                (
+                    from_wire(call["on"]) if "on" in call else src_root,
+                    call["impl"],
+                    from_wire(call.get("args", [])),
+                    from_wire(call.get("kwgs", {})),
+                )
+                for call in cmd["args"][0]
+            ]
+        except StaleHandleError as e:
+            return reply(None, error=f"StaleHandleError: {e}", epoch=epoch)
+        t_decoded = time.perf_counter()
+        results = []
+        for on, call_impl, args, kwgs in calls:
+            call = getattr(on, call_impl, None)
+            if call is None:
+                error = f"AttributeError: {on} has no impl {call_impl}"
+                results.append({"value": None, "error": error})
+                continue
+            try:
+                results.append({"value": call(*args, **kwgs), "error": None})
+            except Exception as e:
+                # and the rest are still made, as they would be one by one
+                results.append({"value": None, "error": str(e)})
+        t_called = time.perf_counter()
+        return reply(results)
+
     src_call = getattr(src_root, cmd["impl"])
     # ^ Resolve API things that every object has every attribute,
     # but if it actually does not, src_call will be None, not a function
@@ -257,38 +1049,34 @@ def execute_remote_command(raw_cmd: bytes) -> str:
     # TODO: validate that the resulting type is equivalent
 
     if src_call is None:
-        return serialize(
+        return reply(
             None, error=f'AttributeError: {src_root} has no impl {cmd["impl"]}'
         )
 
     # TODO: validate input argument types
 
-    # deserialize any args or kwgs which are API_Objects
-    for a, value in enumerate(cmd["args"]):
-        cmd["args"][a] = (
-            deserialize(value["API_Object"])
-            if hasattr(value, "__iter__") and "API_Object" in value
-            else value
-        )
+    # deserialize any args or kwgs which are (or hold) API_Objects
+    try:
+        cmd["args"] = from_wire(cmd["args"])
+        cmd["kwgs"] = from_wire(cmd["kwgs"])
+    except StaleHandleError as e:
+        return reply(None, error=f"StaleHandleError: {e}", epoch=epoch)
 
-    for n, value in cmd["kwgs"]:
-        cmd["kwgs"][n] = (
-            deserialize(value["API_Object"])
-            if hasattr(value, "__iter__") and "API_Object" in value
-            else value
-        )
+    t_decoded = time.perf_counter()
 
     # execute command in resolve API, retreive its values
     print("🌼 Running:", cmd)
 
     try:
         output = src_call(*cmd["args"], **cmd["kwgs"])
-        output = serialize(output)
+        t_called = time.perf_counter()
+        output = reply(output)
     except Exception as e:
         # fail with error to the output
-        output = serialize(None, error=str(e))
+        t_called = time.perf_counter()
+        output = reply(None, error=str(e))
 
-    print("🌼 Returning:", output)
+    print("🌼 Returning:", output[0])
 
     return output
 
@@ -297,6 +1085,12 @@ try:
     # fill the objects cache with just resolve and fusion
     reset_cache()
 
+    # large replies to clients on this machine can skip the socket
+    try:
+        shared_replies: Optional[SharedReplies] = SharedReplies(SHARED_DIR)
+    except OSError:
+        shared_replies = None
+
     # build the tiny ui
     ui = fusion.UIManager  # type: ignore
     dispatcher = bmd.UIDispatcher(ui)  # type: ignore
@@ -320,14 +1114,32 @@ try:
         ]
     )
 
-    def set_status(s: str):
-        wnd.Find("status_line").Text = f"🌼 DaisyChain {s}"
+    status_text = ""
+    status_live = ""
+
+    def set_status(s: str, refresh: bool = False):
+        """
+        Show state plus live rate & p95 (recomputed on `refresh`),
+        touching the ui only when the text actually changes
+        """
+        global status_text, status_live
+
+        if refresh:
+            rate, p95 = metrics.live()
+            status_live = f"{rate:.1f} req/s"
+            if p95 is not None:
+                status_live += f" · p95 {p95:.1f} ms"
+
+        text = f"🌼 DaisyChain {s}\n{status_live}"
+        if text != status_text:
+            status_text = text
+            wnd.Find("status_line").Text = text
 
     wnd_id = "com.blackmagicdesign.resolve.DaisyChain"
     wnd = dispatcher.AddWindow(
         {
             "ID": wnd_id,
-            "Geometry": [100, 100, 250, 75],
+            "Geometry": [100, 100, 250, 95],
             "WindowTitle": f"DaisyChain Host v{__version__}",
         },
         layout,
@@ -338,11 +1150,17 @@ try:
         """Context manager for application state.
         Opens and closes:
             - socket (tcp)
+            - socket (unix domain, if any)
             - window (fusion ui)
             - timers (fusion ui)
+            - sender (thread)
+            - shared replies (files)
+            - watches (parked until they change)
         """
 
-        def __init__(self, host: str, port: int, rate: int):
+        def __init__(
+            self, host: str, port: int, rate: int, unix_path: Optional[str] = None
+        ):
             # all timeouts go to the context loop!
             dispatcher["On"]["Timeout"] = lambda event: self.loop(event)
             self.timer = ui.Timer({"ID": "main", "Interval": rate})
@@ -351,22 +1169,121 @@ try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.socket.bind((host, port))
+            self.listeners: list[socket.SocketType] = [self.socket]
+
+            # ...and to the unix domain socket, which local clients prefer
+            self.unix_path = unix_path
+            if unix_path is not None:
+                try:
+                    self.listeners.append(self.bind_unix(unix_path))
+                except OSError as e:
+                    print(f"❌ No unix domain socket at {unix_path}: {e}")
+                    self.unix_path = None
 
             # no self.clients yet!
-            self.sockets: list[socket.SocketType] = [self.socket]
+            self.sockets: list[socket.SocketType] = list(self.listeners)
             self.clients: dict[socket.SocketType, str] = {}
+            self.buffers: dict[socket.SocketType, bytes] = {}
+            # watches waiting for a change:
+            # client: (command, received at, when to look again)
+            self.parked: dict[socket.SocketType, Tuple[bytes, float, float]] = {}
+
+            # large replies are compressed or shared & sent off the ui
+            # thread (zlib and file writes let go of the GIL while they work)
+            self.sender = ThreadPoolExecutor(1, "daisychain sender")
+
+        def bind_unix(self, path: str) -> socket.SocketType:
+            # we hold the port, so a socket already there is left over
+            # from a host which didn't get to quit
+            if os.path.exists(path):
+                os.remove(path)
+            unix_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            unix_socket.bind(path)
+            os.chmod(path, 0o600)  # for this user's clients only
+            return unix_socket
 
         def __enter__(self):
-            self.socket.listen()
-            self.socket.setblocking(False)
+            for listener in self.listeners:
+                listener.listen()
+                listener.setblocking(False)
             self.timer.Start()
             print("🌼 Running")
             wnd.Show()
             return self
 
+        def send(
+            self,
+            client: socket.SocketType,
+            message: bytes,
+            reply: bytes,
+            started: float,
+            wire: Optional[bytes] = None,
+        ):
+            """Send the `reply` to `message` (received at `started`) as `wire`"""
+            wire = reply if wire is None else wire
+            client.sendall(wire)
+            metrics.record_sent(len(wire))
+
+            if request_log is not None:
+                request_log.record(message, reply, started, time.perf_counter())
+
+        def deliver(
+            self,
+            client: socket.SocketType,
+            message: bytes,
+            reply: bytes,
+            started: float,
+            delivery: str,
+        ):
+            """Compress or share, then send, the `reply`, on the sender thread"""
+            try:
+                if delivery == "shared":
+                    wire = shared_replies.share_frame(reply)
+                    metrics.record_shared(len(reply))
+                else:
+                    t_start = time.perf_counter()
+                    wire = compress_frame(reply)
+                    t_end = time.perf_counter()
+                    metrics.record_compression(
+                        len(reply), len(wire), (t_end - t_start) * 1000
+                    )
+                self.send(client, message, reply, started, wire)
+            except OSError as e:
+                print(f"❌ Could not reply to {self.clients.get(client)}: {e}")
+
+        def respond(
+            self,
+            client: socket.SocketType,
+            message: bytes,
+            reply: bytes,
+            started: float,
+            delivery: Optional[str],
+        ):
+            """Send the `reply` to `message`, or have the sender deliver it"""
+            if delivery is not None:
+                self.sender.submit(
+                    self.deliver, client, message, reply, started, delivery
+                )
+                return
+            try:
+                self.send(client, message, reply, started)
+            except OSError as e:
+                # the client gave up waiting (timed out)
+                print(f"❌ Could not reply to {self.clients.get(client)}: {e}")
+
+        def forget(self, client: socket.SocketType):
+            if client in self.sockets:
+                self.sockets.remove(client)
+            self.clients.pop(client, None)
+            self.buffers.pop(client, None)
+            self.parked.pop(client, None)
+            client.close()
+
         def loop(self, _):
             """RPC Server Loop"""
-            set_status("ready")
+            set_status("ready", refresh=True)
+            if shared_replies is not None:
+                shared_replies.sweep()
 
             read_sockets: list[socket.SocketType]
             error_sockets: list[socket.SocketType]
@@ -374,27 +1291,75 @@ try:
             read_sockets, _, error_sockets = select.select(
                 self.sockets, [], self.sockets, 0
             )
+            tick = time.perf_counter()
+
+            # requests waiting on this tick (not counting new connections)
+            metrics.record_queue(
+                sum(1 for sock in read_sockets if sock not in self.listeners)
+            )
 
             # process any reads / writes
             for notified_socket in read_sockets:
                 # read or write from sockets
-                if notified_socket == self.socket:
-                    client_socket, client_address = self.socket.accept()
+                if notified_socket in self.listeners:
+                    client_socket, client_address = notified_socket.accept()
+                    client_address = client_address or self.unix_path
+                    # may inherit non-blocking (macOS), but replies are sent whole
+                    client_socket.setblocking(True)
                     print(f"🌼 Received request from {client_address}")
                     self.sockets.append(client_socket)
                     self.clients[client_socket] = client_address
                 else:
-                    message = notified_socket.recv(16384)
+                    try:
+                        message = notified_socket.recv(65536)
+                    except OSError:
+                        message = b""  # reset by a client which gave up waiting
 
                     if message:
+                        metrics.bytes_in += len(message)
+
+                        # commands can span many reads, wait until it's whole
+                        message = self.buffers.pop(notified_socket, b"") + message
+                        if not message_complete(message):
+                            self.buffers[notified_socket] = message
+                            continue
+
                         print(f"🌼 Executing remote command: {message}")
                         set_status("executing")
-                        reply = execute_remote_command(message)
+                        started = time.perf_counter()
+                        try:
+                            reply, delivery = execute_remote_command(message, tick)
+                        except json.JSONDecodeError:
+                            self.buffers[notified_socket] = message
+                            continue
+                        if delivery == "wait":
+                            due = tick + float(reply)
+                            self.parked[notified_socket] = (message, started, due)
+                            continue
                         set_status("responding")
-                        notified_socket.send(reply.encode())
+                        self.respond(notified_socket, message, reply, started, delivery)
                     else:
-                        self.sockets.remove(notified_socket)
-                        del self.clients[notified_socket]
+                        self.forget(notified_socket)
+
+            # watches are looked at again (every tick, at most), until they've
+            # changed: each call on Resolve's ui thread, so only as often as asked
+            for client, (message, started, due) in list(self.parked.items()):
+                if tick < due:
+                    continue
+                try:
+                    reply, delivery = execute_remote_command(
+                        message, tick, tick - started
+                    )
+                    if delivery == "wait":
+                        self.parked[client] = (message, started, tick + float(reply))
+                        continue
+                except Exception as e:
+                    # not to stop the loop for every other client
+                    print(f"❌ Watch failed > {e}")
+                    self.forget(client)
+                    continue
+                del self.parked[client]
+                self.respond(client, message, reply, started, delivery)
 
             # process any exceptions in sockets
             for notified_socket in error_sockets:
@@ -414,24 +1379,30 @@ try:
                     print(f"❌ OS error on {client_info}: {e}")
 
                 finally:
-                    if notified_socket in self.sockets:
-                        self.sockets.remove(notified_socket)
-                    if notified_socket in self.clients:
-                        del self.clients[notified_socket]
-                    notified_socket.close()
+                    self.forget(notified_socket)
 
         def __exit__(self, *_):
             print("🌼 Quitting")
-            self.socket.close()
+            self.sender.shutdown(wait=True)
+            if shared_replies is not None:
+                shared_replies.close()
+            for listener in self.listeners:
+                listener.close()
+            # clients keep connections open, so they'd wait on a closed host
+            for client in self.clients:
+                client.close()
+            if self.unix_path is not None:
+                os.remove(self.unix_path)
             self.timer.Stop()
             wnd.Hide()
             return False
 
     # register function to exit from RunLoop()
     wnd.On[wnd_id].Close = lambda _: dispatcher.ExitLoop()
+    wnd.On["reset_btn"].Clicked = lambda _: reset_cache()
 
     print("🌼 Starting")
-    with DaisyContext(HOST, PORT, RATE) as ctx:
+    with DaisyContext(HOST, PORT, RATE, SOCKET) as ctx:
         dispatcher.RunLoop()  # blocking event loop
 
 except Exception as _:
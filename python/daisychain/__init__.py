@@ -1,8 +1,33 @@
-from daisychain.remote import rpc_init
-from daisychain.resolve import Resolve
+from typing import TYPE_CHECKING
+import importlib
 
+if TYPE_CHECKING:
+    from daisychain.remote import rpc_init
+    from daisychain.resolve import Resolve
 
-def get_resolve() -> Resolve:
+# loaded on first use (PEP 562), so that scripts started from
+# a hotkey don't wait for what they never touch
+LAZY = {"rpc_init": "daisychain.remote", "Resolve": "daisychain.resolve"}
+SUBMODULES = ("agent", "config", "fake", "fingerprint", "fusion", "netsim")
+SUBMODULES += ("profiling", "remote", "replay", "resolve", "trace")
+
+
+def __getattr__(name: str):
+    if name in LAZY:
+        value = getattr(importlib.import_module(LAZY[name]), name)
+    elif name in SUBMODULES:
+        value = importlib.import_module(f"daisychain.{name}")
+    else:
+        raise AttributeError(f"module 'daisychain' has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *LAZY, *SUBMODULES})
+
+
+def get_resolve() -> "Resolve":
     """
     Initialize Resolve connection
 
@@ -15,6 +40,9 @@ def get_resolve() -> Resolve:
         resolve: Resolve = await get_resolve()
     ```
     """
+    from daisychain.remote import rpc_init
+    from daisychain.resolve import Resolve
+
     link = Resolve(rpc_init())
 
     if link is None:
@@ -0,0 +1,337 @@
+"""
+# Agent
+_One warm connection to the Host for every short-lived tool_
+
+Every `bindive`, `copycat` or `collate` run would otherwise connect,
+agree on a codec with `daisychain_init` and walk down from `resolve`
+again. `daisychain agent` does that once and stays running, listening on
+a Unix domain socket (see `agent` in `daisychain.config`) which clients
+on this machine prefer over the Host by themselves:
+
+```
+daisychain agent --ttl 2
+```
+
+- `daisychain_init` is answered by the agent, without a trip to the Host
+- requests go to the Host over a few kept-open connections (so skip the
+    Host's accept), in the best codec both speak, whatever clients speak;
+    watches (parked at the Host until they change) don't wait for those
+- replies to `Get*` calls are cached for `ttl` seconds (`agent_ttl`)
+    and shared by every client; any other call clears the cache, since
+    it may have changed anything. `GetCurrent*` calls are never cached
+- clients share one table of the Host's objects, so a clip one tool
+    found is the same handle, and the same cache entry, for the next
+
+Clients speak plain JSON to the agent; if it stops, they go back to the
+Host by themselves, with the same handles.
+"""
+
+from daisychain.config import setting, agent_path
+from daisychain.replay import request_key
+from daisychain import remote
+
+from typing import Dict, Optional, Tuple
+import threading
+import asyncio
+import socket
+import json
+import time
+import os
+
+# seconds to serve cached replies for
+TTL = float(setting("agent_ttl", 2.0))
+# connections to the host, at most, for requests from clients at once
+CONNECTIONS = int(setting("agent_connections", 4))
+
+
+def cacheable(rqst: dict) -> bool:
+    """Whether the reply to `rqst` may be served to later requests"""
+    impl = rqst.get("impl", "")
+    return impl.startswith("Get") and not impl.startswith("GetCurrent")
+
+
+def changes(rqst: dict) -> bool:
+    """Whether `rqst` may change anything (so any cached reply)"""
+    impl = rqst.get("impl", "")
+    if impl == "daisychain_batch":
+        # as its calls may
+        return any(
+            not call.get("impl", "").startswith("Get") for call in rqst["args"][0]
+        )
+    return not impl.startswith(("Get", "daisychain_"))
+
+
+def agent_running(path: Optional[str] = None) -> bool:
+    """Whether an agent is listening at `path` (default: the configured one)"""
+    path = path or agent_path(remote.PORT)
+    if path is None or not os.path.exists(path):
+        return False
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+class Agent:
+    """
+    Answers clients on the Unix domain socket at `path` on behalf of
+    the host `daisychain.remote` points at
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = TTL,
+        connections: int = CONNECTIONS,
+    ):
+        path = path or agent_path(remote.PORT)
+        if path is None:
+            raise RuntimeError("No Unix domain sockets here, so no agent")
+        self.path = path
+        self.ttl = ttl
+        self.connections = connections
+
+        self.init: Optional[dict] = None  # the host's reply to daisychain_init
+        self.session = remote.Session()  # what's spoken to the host, as agreed
+        self.cache: Dict[str, Tuple[float, dict]] = {}
+        self.pending: Dict[str, asyncio.Future] = {}  # cacheable, in flight
+        self.idle: Optional[asyncio.Queue] = None  # open host connections
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.initializing: Optional[asyncio.Lock] = None
+
+        self.stats = {"requests": 0, "cached": 0, "clients": 0, "host": 0}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.thread: Optional[threading.Thread] = None
+        self.started = threading.Event()
+
+    async def initialize(self) -> dict:
+        """Agree on a codec with the host (once, until it goes away)"""
+        if self.init is not None:
+            return self.init
+        # one at a time, each agreeing afresh in json (the host may have
+        # restarted), while requests in flight keep to the session they sent in
+        async with self.initializing:
+            if self.init is None:
+                self.forget()
+                rqst = remote.init_request()
+                session = remote.Session()
+                message = remote.encode_request(dict(rqst), session)
+                timeout = remote.reply_timeout(rqst)
+                resp, _ = await self.exchange(rqst, message, timeout, session)
+                if resp["error"] is not None:
+                    raise remote.RPCError(resp["error"])
+                self.session = remote.Session.agreed(resp)
+                self.init = {
+                    "value": resp["value"],
+                    "error": None,
+                    "epoch": resp.get("epoch"),
+                }
+        return self.init
+
+    def forget(self):
+        """Drop everything learnt from the host, which may have restarted"""
+        self.init = None
+        self.cache.clear()
+        while self.idle is not None and not self.idle.empty():
+            _, writer = self.idle.get_nowait()
+            writer.close()
+
+    async def host_request(self, rqst: dict) -> dict:
+        """Send `rqst` to the host over an open connection, if there is one"""
+        while True:
+            try:
+                await self.initialize()
+            except (OSError, remote.RPCError) as e:
+                return {"value": None, "error": f"ConnectionError: {e}"}
+            # the reply comes in what the request was sent in, whatever
+            # initializing again (after a host restart) agrees meanwhile
+            session = self.session
+            message = remote.encode_request(dict(rqst), session)
+            timeout = remote.reply_timeout(rqst)
+
+            if rqst.get("impl") == "daisychain_watch":
+                # parked at the host until something changes, so not holding
+                # one of the connections every other request waits for
+                resp, again = await self.exchange(rqst, message, timeout, session)
+            else:
+                async with self.slots:
+                    resp, again = await self.exchange(rqst, message, timeout, session)
+            if not again:
+                return resp
+
+    async def exchange(
+        self,
+        rqst: dict,
+        message: bytes,
+        timeout: Optional[float],
+        session: "remote.Session",
+    ) -> Tuple[dict, bool]:
+        """
+        The host's reply to `message` (sent in, so decoded in, `session`),
+        and whether to send it again
+        """
+        pooled = not self.idle.empty()
+        writer = None
+        try:
+            if pooled:
+                reader, writer = self.idle.get_nowait()
+            else:
+                reader, writer = await asyncio.wait_for(
+                    remote.open_connection(agent=False), remote.CONNECT_TIMEOUT
+                )
+            writer.write(message)
+            await writer.drain()
+            resp = await asyncio.wait_for(
+                remote.read_reply(reader, session=session), timeout
+            )
+        except asyncio.TimeoutError:
+            # the host is stalled (rendering, or showing a dialog)
+            if writer is not None:
+                writer.close()
+            error = f"TimeoutError: no reply from the host to {rqst.get('impl')}"
+            return {"value": None, "error": error}, False
+        except (OSError, EOFError, remote.RPCError) as e:
+            if writer is not None:
+                writer.close()
+            self.forget()
+            # the host may have restarted since it was pooled, so again
+            return {"value": None, "error": f"ConnectionError: {e}"}, pooled
+        self.idle.put_nowait((reader, writer))
+
+        self.stats["host"] += 1
+        if (resp.get("error") or "").startswith("StaleHandleError"):
+            if self.init is not None and resp.get("epoch") != self.init["epoch"]:
+                self.forget()  # the host reset its objects, so the cache is stale
+        return resp, False
+
+    async def request(self, rqst: dict) -> dict:
+        """The reply to `rqst`, from the cache if it's fresh"""
+        self.stats["requests"] += 1
+        if rqst.get("impl") == "daisychain_init":
+            try:
+                init = await self.initialize()
+            except (OSError, remote.RPCError) as e:
+                return {"value": None, "error": f"ConnectionError: {e}"}
+            # whatever the host speaks, clients speak json to the agent
+            return {**init, "codec": "json", "compression": None, "shared": None}
+
+        if changes(rqst):
+            self.cache.clear()  # it may have changed anything
+        if not cacheable(rqst):
+            return await self.host_request(rqst)
+
+        key = request_key(rqst)
+        cached = self.cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            self.stats["cached"] += 1
+            return cached[1]
+
+        # clients asking for the same thing at once share one request
+        if key in self.pending:
+            self.stats["cached"] += 1
+            return await asyncio.shield(self.pending[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        try:
+            resp = await self.host_request(rqst)
+            if resp["error"] is None:
+                # timings (if traced) were only true of this request
+                shared = {k: v for k, v in resp.items() if k != "timings"}
+                self.cache[key] = (time.monotonic(), shared)
+            future.set_result(resp)
+        finally:
+            del self.pending[key]
+            if not future.done():
+                future.cancel()  # we were, or failed, and so are those waiting on us
+        return resp
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["clients"] += 1
+        try:
+            await self.serve(reader, writer)
+        except (asyncio.CancelledError, ConnectionError):
+            pass  # stopping with connections open, or the client went away
+        writer.close()
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        data = b""
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            data += chunk
+            if not chunk.endswith(b"}"):
+                continue
+            try:
+                rqst = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            data = b""
+
+            resp = await self.request(rqst)
+            writer.write(json.dumps(resp).encode())
+            await writer.drain()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.idle = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.connections)
+        self.initializing = asyncio.Lock()
+
+        # we're not running (see `start`), so a socket there is left over
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.server = self.loop.run_until_complete(
+            asyncio.start_unix_server(self.handle, self.path)
+        )
+        os.chmod(self.path, 0o600)  # for this user's clients only
+        try:
+            # so that the first client doesn't wait for it
+            self.loop.run_until_complete(self.initialize())
+        except (OSError, remote.RPCError):
+            pass  # the host isn't up yet, so the first client will
+        self.started.set()
+        self.loop.run_forever()
+
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.forget()
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def start(self) -> "Agent":
+        if agent_running(self.path):
+            raise RuntimeError(f"An agent is already running at {self.path}")
+        # the agent goes to the host, not to (another) agent
+        remote.AGENT = None
+        self.thread = threading.Thread(
+            target=self.run, name="daisychain agent", daemon=True
+        )
+        self.thread.start()
+        self.started.wait()
+        return self
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self) -> "Agent":
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+        return False
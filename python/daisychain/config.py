@@ -0,0 +1,94 @@
+"""
+# Configuration
+_Where the Host is, and how to talk to it_
+
+Each setting comes from the environment (`DAISYCHAIN_<NAME>`), else from
+the config file (`$DAISYCHAIN_CONFIG`, by default `~/.daisychain.json`),
+else its default. The Host reads the same file, so one file can move both:
+
+```
+{"port": 65433, "socket": "/tmp/daisychain.sock", "rate": 20}
+```
+
+- `host`, `port`: the Host's TCP address
+- `socket`: the Host's Unix domain socket, which clients on its machine
+    prefer (`"none"` for TCP only); by default one per port in the
+    runtime directory
+- `rate`: the Host's timer, in milliseconds
+- `agent`: the socket of the `daisychain agent`, which clients prefer
+    over the Host when it's running (`"none"` to never use one)
+- `agent_ttl`, `agent_connections`: see `daisychain.agent`
+- `index`: the media index file, see `daisychain.fingerprint`
+- `host_script`: the Host script `daisychain.fake` runs, if not the
+    repo's `hosts/DaisyChain.py` (as when installed from a package)
+- `codec`, `compress_above`, `share_above`, `keep_open`: see `daisychain.remote`
+- `timeout`, `timeouts`, `connect_timeout`, `retries`, `backoff`,
+    `breaker_failures`, `breaker_reset`, `watch_timeout`: see `daisychain.remote`
+"""
+
+from typing import Any, Optional
+import socket
+import json
+import os
+
+CONFIG = os.path.expanduser(os.environ.get("DAISYCHAIN_CONFIG", "~/.daisychain.json"))
+
+LOOPBACK = ("127.0.0.1", "localhost", "::1")
+
+
+def load_config(path: str = CONFIG) -> dict:
+    """The settings in the config file at `path`, if there is one"""
+    try:
+        with open(path) as config_file:
+            return json.load(config_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"❌ Ignoring config {path}: {e}")
+        return {}
+
+
+config = load_config()
+
+
+def setting(name: str, default: Any = None) -> Any:
+    """`DAISYCHAIN_<NAME>` from the environment, else `name` from the config"""
+    value = os.environ.get(f"DAISYCHAIN_{name.upper()}")
+    if value is not None:
+        return value
+    return config.get(name, default)
+
+
+def runtime_socket(name: str) -> Optional[str]:
+    """A Unix domain socket called `name` in the runtime directory"""
+    if not hasattr(socket, "AF_UNIX"):
+        return None  # Windows
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtime:
+        import tempfile  # which is slow to import
+
+        runtime = tempfile.gettempdir()
+    return os.path.join(runtime, name)
+
+
+def default_socket(port: int) -> Optional[str]:
+    """Where the Host listening on `port` puts its Unix domain socket"""
+    return runtime_socket(f"daisychain-{port}.sock")
+
+
+def socket_path(host: str, port: int) -> Optional[str]:
+    """The Unix domain socket to reach the Host at `host:port` by, if any"""
+    path = setting("socket")
+    if path is not None:
+        return None if path.lower() in ("", "none") else path
+    if host not in LOOPBACK:
+        return None
+    return default_socket(port)
+
+
+def agent_path(port: int) -> Optional[str]:
+    """The socket of the agent for the Host on `port`, if any"""
+    path = setting("agent")
+    if path is not None:
+        return None if path.lower() in ("", "none") else path
+    return runtime_socket(f"daisychain-agent-{port}.sock")
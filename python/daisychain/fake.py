@@ -0,0 +1,1372 @@
+"""
+# Fake Resolve
+_An in-process stand-in for DaVinci Resolve, for running offline_
+
+Implements the `resolve_types.py` surface (Resolve, ProjectManager, Project,
+MediaStorage, MediaPool, Folder, MediaPoolItem, Timeline, TimelineItem)
+in plain Python, with a configurable latency per API call, so that the real
+DaisyChain Host can be run (and measured) without Resolve:
+
+```
+resolve = generate_project(clips=50_000, bin_depth=4, timeline_items=5_000)
+
+with run_host(resolve):
+    resolve = daisychain.get_resolve()  # talking to the fake through the host
+```
+
+Objects repr like Resolve's own (`MediaPoolItem (0x...) [App: 'Resolve' ...]`)
+and return `None` for unknown attributes, as Resolve does.
+"""
+
+from daisychain.config import setting
+
+from typing import Any, Callable, Dict, List, Optional, Union
+from pathlib import Path
+import functools
+import itertools
+import threading
+import base64
+import random
+import runpy
+import time
+import csv
+import os
+
+IMPORTABLE = {
+    ".mp3",
+    ".wav",
+    ".m4a",
+    ".mov",
+    ".mp4",
+    ".mxf",
+    ".braw",
+    ".r3d",
+    ".jpg",
+    ".jpeg",
+    ".tif",
+    ".tiff",
+    ".png",
+}
+
+MARKER_COLORS = ["Blue", "Cyan", "Green", "Yellow", "Red", "Pink", "Purple", "Fuchsia"]
+
+
+class FakeAPI:
+    """Settings & counters shared by every object of one fake Resolve"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency  # seconds per API call
+        self.jitter = jitter  # extra (uniformly random) seconds per API call
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.ids = itertools.count(1)
+
+    def wait(self):
+        self.calls += 1
+        delay = self.latency
+        if self.jitter:
+            delay += self.random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def api_call(method: Callable) -> Callable:
+    """Charge the configured latency for each call of `method`"""
+
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        self._api.wait()
+        return method(self, *args, **kwargs)
+
+    return call
+
+
+class FakeObject:
+    def __init__(self, api: FakeAPI):
+        self._api = api
+        self._id = next(api.ids)
+        self._uuid = f"{self._id:08x}-fake-4000-8000-{api.random.getrandbits(48):012x}"
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__} (0x{self._id:012x}) "
+            f"[App: 'Resolve' on 127.0.0.1, UUID: {self._uuid}]"
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        # Resolve answers every attribute, unknown ones with None
+        return None
+
+    @api_call
+    def GetUniqueId(self) -> str:
+        return self._uuid
+
+
+class Annotated(FakeObject):
+    """Markers, flags and clip colors, shared by clips and timeline items"""
+
+    def __init__(self, api: FakeAPI):
+        super().__init__(api)
+        self._markers: Dict[int, Dict[str, Any]] = {}
+        self._flags: List[str] = []
+        self._clip_color = ""
+
+    @api_call
+    def AddMarker(
+        self,
+        frameId: int,
+        color: str,
+        name: str,
+        note: str,
+        duration: int,
+        customData: str = "",
+    ) -> bool:
+        if frameId in self._markers:
+            return False
+        self._markers[frameId] = {
+            "color": color,
+            "duration": duration,
+            "note": note,
+            "name": name,
+            "customData": customData,
+        }
+        return True
+
+    @api_call
+    def GetMarkers(self) -> Dict[int, Dict[str, Any]]:
+        return {frame: dict(marker) for frame, marker in self._markers.items()}
+
+    @api_call
+    def GetMarkerByCustomData(self, customData: str) -> Dict[int, Dict[str, Any]]:
+        for frame, marker in self._markers.items():
+            if marker["customData"] == customData:
+                return {frame: dict(marker)}
+        return {}
+
+    @api_call
+    def UpdateMarkerCustomData(self, frameId: int, customData: str) -> bool:
+        if frameId not in self._markers:
+            return False
+        self._markers[frameId]["customData"] = customData
+        return True
+
+    @api_call
+    def GetMarkerCustomData(self, frameId: int) -> str:
+        return self._markers.get(frameId, {}).get("customData", "")
+
+    @api_call
+    def DeleteMarkersByColor(self, color: str) -> bool:
+        frames = [
+            frame
+            for frame, marker in self._markers.items()
+            if color == "All" or marker["color"] == color
+        ]
+        for frame in frames:
+            del self._markers[frame]
+        return bool(frames)
+
+    @api_call
+    def DeleteMarkerAtFrame(self, frameNum: int) -> bool:
+        return self._markers.pop(frameNum, None) is not None
+
+    @api_call
+    def DeleteMarkerByCustomData(self, customData: str) -> bool:
+        for frame, marker in list(self._markers.items()):
+            if marker["customData"] == customData:
+                del self._markers[frame]
+                return True
+        return False
+
+    @api_call
+    def AddFlag(self, color: str) -> bool:
+        if color not in self._flags:
+            self._flags.append(color)
+        return True
+
+    @api_call
+    def GetFlagList(self) -> List[str]:
+        return list(self._flags)
+
+    @api_call
+    def ClearFlags(self, color: str) -> bool:
+        self._flags = [] if color == "All" else [f for f in self._flags if f != color]
+        return True
+
+    @api_call
+    def GetClipColor(self) -> str:
+        return self._clip_color
+
+    @api_call
+    def SetClipColor(self, colorName: str) -> bool:
+        self._clip_color = colorName
+        return True
+
+    @api_call
+    def ClearClipColor(self) -> bool:
+        self._clip_color = ""
+        return True
+
+
+class MediaPoolItem(Annotated):
+    def __init__(
+        self,
+        api: FakeAPI,
+        file_path: str,
+        frames: int = 240,
+        fps: float = 24.0,
+        resolution: str = "3840x2160",
+    ):
+        super().__init__(api)
+        self._folder: Optional["Folder"] = None
+        name = os.path.basename(file_path)
+        self._properties: Dict[str, Any] = {
+            "Clip Name": name,
+            "File Name": name,
+            "File Path": file_path,
+            "Type": "Video",
+            "Format": "QuickTime",
+            "Video Codec": "Apple ProRes 422 HQ",
+            "Resolution": resolution,
+            "FPS": fps,
+            "Frames": frames,
+            "Duration": frames_to_timecode(frames, fps),
+            "Start TC": "00:00:00:00",
+            "End TC": frames_to_timecode(frames, fps),
+            "Comments": "",
+            "Proxy Media Path": "",
+        }
+        self._metadata: Dict[str, str] = {"Comments": "", "Description": ""}
+
+    @api_call
+    def GetName(self) -> str:
+        return self._properties["Clip Name"]
+
+    @api_call
+    def GetMetadata(self, metadataType: Optional[str] = None) -> Union[Dict, str]:
+        if metadataType is None:
+            return dict(self._metadata)
+        return self._metadata.get(metadataType, "")
+
+    @api_call
+    def SetMetadata(self, metadataType: Any, metadataValue: Optional[str] = None):
+        if isinstance(metadataType, dict):
+            self._metadata.update(metadataType)
+        else:
+            self._metadata[metadataType] = metadataValue
+        return True
+
+    @api_call
+    def GetMediaId(self) -> str:
+        return f"media-{self._uuid}"
+
+    @api_call
+    def GetClipProperty(self, propertyName: Optional[str] = None) -> Any:
+        if propertyName is None:
+            return dict(self._properties)
+        return self._properties.get(propertyName, "")
+
+    @api_call
+    def SetClipProperty(self, propertyName: str, propertyValue: Any) -> bool:
+        self._properties[propertyName] = propertyValue
+        return True
+
+    @api_call
+    def LinkProxyMedia(self, proxyMediaFilePath: str) -> bool:
+        self._properties["Proxy Media Path"] = proxyMediaFilePath
+        return True
+
+    @api_call
+    def UnlinkProxyMedia(self) -> bool:
+        self._properties["Proxy Media Path"] = ""
+        return True
+
+    @api_call
+    def ReplaceClip(self, filePath: str) -> bool:
+        self._relink(filePath)
+        return True
+
+    def _relink(self, file_path: str):
+        self._properties["File Path"] = file_path
+        self._properties["File Name"] = os.path.basename(file_path)
+
+
+class Folder(FakeObject):
+    def __init__(self, api: FakeAPI, name: str, parent: Optional["Folder"] = None):
+        super().__init__(api)
+        self._name = name
+        self._parent = parent
+        self._clips: List[MediaPoolItem] = []
+        self._subfolders: List["Folder"] = []
+
+    def _add_clip(self, clip: MediaPoolItem):
+        clip._folder = self
+        self._clips.append(clip)
+
+    def _walk(self):
+        yield self
+        for folder in self._subfolders:
+            yield from folder._walk()
+
+    @api_call
+    def GetClipList(self) -> List[MediaPoolItem]:
+        return list(self._clips)
+
+    @api_call
+    def GetName(self) -> str:
+        return self._name
+
+    @api_call
+    def GetSubFolderList(self) -> List["Folder"]:
+        return list(self._subfolders)
+
+    @api_call
+    def GetIsFolderStale(self) -> bool:
+        return False
+
+
+class TimelineItem(Annotated):
+    def __init__(
+        self,
+        api: FakeAPI,
+        timeline: "Timeline",
+        clip: Optional[MediaPoolItem],
+        start: int,
+        duration: int,
+        left_offset: int = 0,
+    ):
+        super().__init__(api)
+        self._timeline = timeline
+        self._clip = clip
+        self._name = clip._properties["Clip Name"] if clip else "Solid Color"
+        self._start = start
+        self._duration = duration
+        self._left_offset = left_offset
+        self._properties: Dict[str, Any] = {
+            "Pan": 0.0,
+            "Tilt": 0.0,
+            "ZoomX": 1.0,
+            "ZoomY": 1.0,
+            "Opacity": 100.0,
+            "RotationAngle": 0.0,
+            "CompositeMode": 0,
+        }
+
+    @api_call
+    def GetName(self) -> str:
+        return self._name
+
+    @api_call
+    def GetDuration(self) -> int:
+        return self._duration
+
+    @api_call
+    def GetStart(self) -> int:
+        return self._start
+
+    @api_call
+    def GetEnd(self) -> int:
+        return self._start + self._duration
+
+    @api_call
+    def GetLeftOffset(self) -> int:
+        return self._left_offset
+
+    @api_call
+    def GetRightOffset(self) -> int:
+        if self._clip is None:
+            return 0
+        frames = self._clip._properties["Frames"]
+        return max(0, frames - self._left_offset - self._duration)
+
+    @api_call
+    def GetProperty(self, propertyKey: Optional[str] = None) -> Any:
+        if propertyKey is None:
+            return dict(self._properties)
+        return self._properties.get(propertyKey)
+
+    @api_call
+    def SetProperty(self, propertyKey: str, propertyValue: Any) -> bool:
+        self._properties[propertyKey] = propertyValue
+        return True
+
+    @api_call
+    def GetMediaPoolItem(self) -> Optional[MediaPoolItem]:
+        return self._clip
+
+    @api_call
+    def GetFusionCompCount(self) -> int:
+        return 0
+
+    @api_call
+    def GetFusionCompNameList(self) -> List[str]:
+        return []
+
+
+class Timeline(Annotated):
+    def __init__(self, api: FakeAPI, name: str, fps: float = 24.0):
+        super().__init__(api)
+        self._name = name
+        self._fps = fps
+        self._start_frame = int(round(fps)) * 60 * 60  # 01:00:00:00
+        self._playhead = self._start_frame
+        self._tracks: Dict[str, List[List[TimelineItem]]] = {
+            "video": [[]],
+            "audio": [[]],
+            "subtitle": [],
+        }
+        self._track_names: Dict[str, List[str]] = {
+            "video": ["Video 1"],
+            "audio": ["Audio 1"],
+            "subtitle": [],
+        }
+        self._settings: Dict[str, Any] = {
+            "timelineFrameRate": fps,
+            "timelineResolutionWidth": "3840",
+            "timelineResolutionHeight": "2160",
+        }
+        self._thumbnail_size = (320, 180)
+
+    def _track(self, track_type: str, index: int) -> List[TimelineItem]:
+        tracks = self._tracks[track_type]
+        while len(tracks) < index:
+            tracks.append([])
+            self._track_names[track_type].append(f"{track_type.title()} {len(tracks)}")
+        return tracks[index - 1]
+
+    def _append(
+        self,
+        clip: Optional[MediaPoolItem],
+        duration: Optional[int] = None,
+        track: int = 1,
+        track_type: str = "video",
+    ) -> TimelineItem:
+        items = self._track(track_type, track)
+        start = items[-1]._start + items[-1]._duration if items else self._start_frame
+        if duration is None:
+            duration = clip._properties["Frames"] if clip else 120
+        item = TimelineItem(self._api, self, clip, start, duration)
+        items.append(item)
+        return item
+
+    def _items(self):
+        for tracks in self._tracks.values():
+            for items in tracks:
+                yield from items
+
+    @api_call
+    def GetName(self) -> str:
+        return self._name
+
+    @api_call
+    def SetName(self, timelineName: str) -> bool:
+        self._name = timelineName
+        return True
+
+    @api_call
+    def GetStartFrame(self) -> int:
+        return self._start_frame
+
+    @api_call
+    def GetEndFrame(self) -> int:
+        ends = [item._start + item._duration for item in self._items()]
+        return max(ends, default=self._start_frame)
+
+    @api_call
+    def GetStartTimecode(self) -> str:
+        return frames_to_timecode(self._start_frame, self._fps)
+
+    @api_call
+    def SetStartTimecode(self, timecode: str) -> bool:
+        self._start_frame = timecode_to_frames(timecode, self._fps)
+        return True
+
+    @api_call
+    def GetTrackCount(self, trackType: str) -> int:
+        return len(self._tracks.get(trackType, []))
+
+    @api_call
+    def GetItemListInTrack(self, trackType: str, index: int) -> List[TimelineItem]:
+        tracks = self._tracks.get(trackType, [])
+        if not 1 <= index <= len(tracks):
+            return []
+        return list(tracks[index - 1])
+
+    @api_call
+    def GetTrackName(self, trackType: str, trackIndex: int) -> str:
+        names = self._track_names.get(trackType, [])
+        return names[trackIndex - 1] if 1 <= trackIndex <= len(names) else ""
+
+    @api_call
+    def SetTrackName(self, trackType: str, trackIndex: int, name: str) -> bool:
+        names = self._track_names.get(trackType, [])
+        if not 1 <= trackIndex <= len(names):
+            return False
+        names[trackIndex - 1] = name
+        return True
+
+    @api_call
+    def GetCurrentTimecode(self) -> str:
+        return frames_to_timecode(self._playhead, self._fps)
+
+    @api_call
+    def SetCurrentTimecode(self, timecode: str) -> bool:
+        self._playhead = timecode_to_frames(timecode, self._fps)
+        return True
+
+    @api_call
+    def GetCurrentVideoItem(self) -> Optional[TimelineItem]:
+        # the top-most video item under the playhead
+        for items in reversed(self._tracks["video"]):
+            for item in items:
+                if item._start <= self._playhead < item._start + item._duration:
+                    return item
+        return None
+
+    @api_call
+    def GetCurrentClipThumbnailImage(self) -> Dict[str, Any]:
+        width, height = self._thumbnail_size
+        pixels = bytes((self._playhead + i) % 256 for i in range(256)) * (
+            width * height * 3 // 256 + 1
+        )
+        return {
+            "width": width,
+            "height": height,
+            "format": "RGB 8 bit",
+            "data": base64.b64encode(pixels[: width * height * 3]).decode(),
+        }
+
+    @api_call
+    def GetSetting(self, settingName: Optional[str] = None) -> Any:
+        if settingName is None:
+            return dict(self._settings)
+        return self._settings.get(settingName, "")
+
+    @api_call
+    def SetSetting(self, settingName: str, settingValue: Any) -> bool:
+        self._settings[settingName] = settingValue
+        return True
+
+    @api_call
+    def DuplicateTimeline(self, timelineName: Optional[str] = None) -> "Timeline":
+        copy = Timeline(self._api, timelineName or f"{self._name} copy", self._fps)
+        for track_type, tracks in self._tracks.items():
+            for index, items in enumerate(tracks, start=1):
+                for item in items:
+                    copy._append(item._clip, item._duration, index, track_type)
+        return copy
+
+
+class MediaPool(FakeObject):
+    def __init__(self, api: FakeAPI, project: "Project"):
+        super().__init__(api)
+        self._project = project
+        self._root = Folder(api, "Master")
+        self._current = self._root
+
+    def _clips(self):
+        for folder in self._root._walk():
+            yield from folder._clips
+
+    def _import(self, paths: List[str]) -> List[MediaPoolItem]:
+        clips = []
+        for path in paths:
+            path = str(path)
+            if os.path.isdir(path):
+                entries = sorted(os.path.join(path, name) for name in os.listdir(path))
+                clips += self._import(
+                    [entry for entry in entries if os.path.isfile(entry)]
+                )
+            elif os.path.splitext(path)[1].lower() in IMPORTABLE:
+                clip = MediaPoolItem(self._api, path)
+                self._current._add_clip(clip)
+                clips.append(clip)
+        return clips
+
+    @api_call
+    def GetRootFolder(self) -> Folder:
+        return self._root
+
+    @api_call
+    def AddSubFolder(self, folder: Folder, name: str) -> Optional[Folder]:
+        if not isinstance(folder, Folder):
+            return None
+        subfolder = Folder(self._api, name, folder)
+        folder._subfolders.append(subfolder)
+        return subfolder
+
+    @api_call
+    def RefreshFolders(self) -> bool:
+        return True
+
+    @api_call
+    def CreateEmptyTimeline(self, name: str) -> Optional[Timeline]:
+        return self._project._add_timeline(name)
+
+    @api_call
+    def AppendToTimeline(self, clips: Any) -> List[TimelineItem]:
+        timeline = self._project._current_timeline
+        if timeline is None:
+            return []
+        clips = clips if isinstance(clips, list) else [clips]
+        items = []
+        for clip in clips:
+            if isinstance(clip, dict):  # clip info
+                clip = clip.get("mediaPoolItem")
+            if isinstance(clip, MediaPoolItem):
+                items.append(timeline._append(clip))
+        return items
+
+    @api_call
+    def CreateTimelineFromClips(self, name: str, clips: Any) -> Optional[Timeline]:
+        timeline = self._project._add_timeline(name)
+        if timeline is None:
+            return None
+        for clip in clips if isinstance(clips, list) else [clips]:
+            if isinstance(clip, MediaPoolItem):
+                timeline._append(clip)
+        return timeline
+
+    @api_call
+    def DeleteTimelines(self, timelines: List[Timeline]) -> bool:
+        project = self._project
+        project._timelines = [t for t in project._timelines if t not in timelines]
+        if project._current_timeline in timelines:
+            project._current_timeline = (project._timelines or [None])[0]
+        return True
+
+    @api_call
+    def GetCurrentFolder(self) -> Folder:
+        return self._current
+
+    @api_call
+    def SetCurrentFolder(self, folder: Folder) -> bool:
+        if not isinstance(folder, Folder):
+            return False
+        self._current = folder
+        return True
+
+    @api_call
+    def DeleteClips(self, clips: List[MediaPoolItem]) -> bool:
+        for clip in clips:
+            if clip._folder is not None and clip in clip._folder._clips:
+                clip._folder._clips.remove(clip)
+                clip._folder = None
+        return True
+
+    @api_call
+    def DeleteFolders(self, subfolders: List[Folder]) -> bool:
+        for folder in subfolders:
+            if folder._parent is not None and folder in folder._parent._subfolders:
+                folder._parent._subfolders.remove(folder)
+        return True
+
+    @api_call
+    def MoveClips(self, clips: List[MediaPoolItem], targetFolder: Folder) -> bool:
+        for clip in clips:
+            if clip._folder is not None:
+                clip._folder._clips.remove(clip)
+            targetFolder._add_clip(clip)
+        return True
+
+    @api_call
+    def MoveFolders(self, folders: List[Folder], targetFolder: Folder) -> bool:
+        for folder in folders:
+            if folder._parent is not None:
+                folder._parent._subfolders.remove(folder)
+            folder._parent = targetFolder
+            targetFolder._subfolders.append(folder)
+        return True
+
+    @api_call
+    def RelinkClips(self, clips: List[MediaPoolItem], folderPath: str) -> bool:
+        relinked = True
+        for clip in clips:
+            file_path = os.path.join(folderPath, clip._properties["File Name"])
+            if os.path.exists(file_path):
+                clip._relink(file_path)
+            else:
+                relinked = False
+        return relinked
+
+    @api_call
+    def UnlinkClips(self, clips: List[MediaPoolItem]) -> bool:
+        return True
+
+    @api_call
+    def ImportMedia(self, items: List[str]) -> List[MediaPoolItem]:
+        return self._import(items)
+
+    @api_call
+    def ExportMetadata(
+        self, fileName: str, clips: Optional[List[MediaPoolItem]] = None
+    ) -> bool:
+        clips = list(self._clips()) if not clips else clips
+        with open(fileName, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["File Name", "Clip Directory", "Comments", "Description"])
+            for clip in clips:
+                file_path = clip._properties["File Path"]
+                writer.writerow(
+                    [
+                        os.path.basename(file_path),
+                        os.path.dirname(file_path),
+                        clip._metadata.get("Comments", ""),
+                        clip._metadata.get("Description", ""),
+                    ]
+                )
+        return True
+
+
+class Project(FakeObject):
+    def __init__(self, api: FakeAPI, name: str):
+        super().__init__(api)
+        self._name = name
+        self._media_pool = MediaPool(api, self)
+        self._timelines: List[Timeline] = []
+        self._current_timeline: Optional[Timeline] = None
+        self._settings: Dict[str, Any] = {
+            "timelineFrameRate": "24",
+            "timelineResolutionWidth": "3840",
+            "timelineResolutionHeight": "2160",
+        }
+        self._render_settings: Dict[str, Any] = {"TargetDir": "", "CustomName": ""}
+        self._render_presets = ["H.264 Master", "YouTube - 1080p", "ProRes 422 HQ"]
+        self._render_jobs: Dict[str, Dict[str, Any]] = {}
+        self._render_seconds = 5.0  # how long a fake render takes
+
+    def _add_timeline(self, name: str, fps: float = 24.0) -> Optional[Timeline]:
+        if any(timeline._name == name for timeline in self._timelines):
+            return None
+        timeline = Timeline(self._api, name, fps)
+        self._timelines.append(timeline)
+        self._current_timeline = self._current_timeline or timeline
+        return timeline
+
+    @api_call
+    def GetMediaPool(self) -> MediaPool:
+        return self._media_pool
+
+    @api_call
+    def GetTimelineCount(self) -> int:
+        return len(self._timelines)
+
+    @api_call
+    def GetTimelineByIndex(self, idx: int) -> Optional[Timeline]:
+        return self._timelines[idx - 1] if 1 <= idx <= len(self._timelines) else None
+
+    @api_call
+    def GetCurrentTimeline(self) -> Optional[Timeline]:
+        return self._current_timeline
+
+    @api_call
+    def SetCurrentTimeline(self, timeline: Timeline) -> bool:
+        if timeline not in self._timelines:
+            return False
+        self._current_timeline = timeline
+        return True
+
+    @api_call
+    def GetName(self) -> str:
+        return self._name
+
+    @api_call
+    def SetName(self, projectName: str) -> bool:
+        self._name = projectName
+        return True
+
+    @api_call
+    def GetSetting(self, settingName: Optional[str] = None) -> Any:
+        if settingName is None:
+            return dict(self._settings)
+        return self._settings.get(settingName, "")
+
+    @api_call
+    def SetSetting(self, settingName: str, settingValue: Any) -> bool:
+        self._settings[settingName] = settingValue
+        return True
+
+    @api_call
+    def GetRenderPresetList(self) -> List[str]:
+        return list(self._render_presets)
+
+    @api_call
+    def LoadRenderPreset(self, presetName: str) -> bool:
+        if presetName not in self._render_presets:
+            return False
+        self._render_settings["PresetName"] = presetName
+        return True
+
+    @api_call
+    def SetRenderSettings(self, settings: Dict[str, Any]) -> bool:
+        self._render_settings.update(settings)
+        return True
+
+    @api_call
+    def AddRenderJob(self) -> str:
+        timeline = self._current_timeline
+        job_id = f"{next(self._api.ids):08x}-job"
+        self._render_jobs[job_id] = {
+            "JobId": job_id,
+            "RenderJobName": f"Job {len(self._render_jobs) + 1}",
+            "TimelineName": timeline._name if timeline else "",
+            "TargetDir": self._render_settings.get("TargetDir", ""),
+            "OutputFilename": self._render_settings.get("CustomName", ""),
+            "PresetName": self._render_settings.get("PresetName", "Custom"),
+            "MarkIn": self._render_settings.get("MarkIn", 0),
+            "MarkOut": self._render_settings.get("MarkOut", 0),
+            "started": None,
+            "stopped": None,
+        }
+        return job_id
+
+    @api_call
+    def DeleteRenderJob(self, jobId: str) -> bool:
+        return self._render_jobs.pop(jobId, None) is not None
+
+    @api_call
+    def DeleteAllRenderJobs(self) -> bool:
+        self._render_jobs.clear()
+        return True
+
+    @api_call
+    def GetRenderJobList(self) -> List[Dict[str, Any]]:
+        return [
+            {k: v for k, v in job.items() if k not in ("started", "stopped")}
+            for job in self._render_jobs.values()
+        ]
+
+    @api_call
+    def StartRendering(self, *jobIds: Any, isInteractiveMode: bool = False) -> bool:
+        if jobIds and isinstance(jobIds[0], list):
+            # ([jobIds...], isInteractiveMode), as `start_rendering` sends them
+            jobIds = tuple(jobIds[0])
+        jobs = (
+            [self._render_jobs[j] for j in jobIds if j in self._render_jobs]
+            if jobIds
+            else list(self._render_jobs.values())
+        )
+        # jobs render one after another
+        at = time.time()
+        for job in jobs:
+            job["started"], job["stopped"] = at, None
+            at += self._render_seconds
+        return bool(jobs)
+
+    @api_call
+    def StopRendering(self) -> None:
+        for job in self._render_jobs.values():
+            if job["started"] is not None and job["stopped"] is None:
+                job["stopped"] = time.time()
+
+    @api_call
+    def IsRenderingInProgress(self) -> bool:
+        return any(
+            self._job_status(job)["JobStatus"] == "Rendering"
+            for job in self._render_jobs.values()
+        )
+
+    @api_call
+    def GetRenderJobStatus(self, jobId: str) -> Dict[str, Any]:
+        job = self._render_jobs.get(jobId)
+        return {} if job is None else self._job_status(job)
+
+    def _job_status(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        if job["started"] is None:
+            return {"JobStatus": "Ready", "CompletionPercentage": 0}
+        now = job["stopped"] or time.time()
+        progress = (now - job["started"]) / self._render_seconds
+        if progress >= 1:
+            return {
+                "JobStatus": "Complete",
+                "CompletionPercentage": 100,
+                "TimeTakenToRenderInMs": int(self._render_seconds * 1000),
+            }
+        if job["stopped"] is not None:
+            return {
+                "JobStatus": "Cancelled",
+                "CompletionPercentage": int(100 * max(progress, 0)),
+            }
+        if progress < 0:
+            return {"JobStatus": "Ready", "CompletionPercentage": 0}
+        return {
+            "JobStatus": "Rendering",
+            "CompletionPercentage": int(100 * progress),
+            "EstimatedTimeRemainingInMs": int(
+                (1 - progress) * self._render_seconds * 1000
+            ),
+        }
+
+
+class ProjectManager(FakeObject):
+    def __init__(self, api: FakeAPI):
+        super().__init__(api)
+        self._projects: Dict[str, Project] = {}
+        self._current: Optional[Project] = None
+
+    def _add_project(self, name: str) -> Project:
+        project = self._projects[name] = Project(self._api, name)
+        self._current = project
+        return project
+
+    @api_call
+    def CreateProject(self, projectName: str) -> Optional[Project]:
+        if projectName in self._projects:
+            return None
+        return self._add_project(projectName)
+
+    @api_call
+    def DeleteProject(self, projectName: str) -> bool:
+        project = self._projects.get(projectName)
+        if project is None or project is self._current:
+            return False
+        del self._projects[projectName]
+        return True
+
+    @api_call
+    def LoadProject(self, projectName: str) -> Optional[Project]:
+        project = self._projects.get(projectName)
+        if project is not None:
+            self._current = project
+        return project
+
+    @api_call
+    def GetCurrentProject(self) -> Optional[Project]:
+        return self._current
+
+    @api_call
+    def SaveProject(self) -> bool:
+        return self._current is not None
+
+    @api_call
+    def CloseProject(self, project: Project) -> bool:
+        if project is not self._current:
+            return False
+        self._current = None
+        return True
+
+    @api_call
+    def GetProjectListInCurrentFolder(self) -> List[str]:
+        return list(self._projects)
+
+    @api_call
+    def GetFolderListInCurrentFolder(self) -> List[str]:
+        return []
+
+    @api_call
+    def GetCurrentDatabase(self) -> Dict[str, str]:
+        return {"DbType": "Disk", "DbName": "Local Database"}
+
+    @api_call
+    def GetDatabaseList(self) -> List[Dict[str, str]]:
+        return [{"DbType": "Disk", "DbName": "Local Database"}]
+
+
+class MediaStorage(FakeObject):
+    def __init__(self, api: FakeAPI, resolve: "Resolve"):
+        super().__init__(api)
+        self._resolve = resolve
+
+    @api_call
+    def GetMountedVolumeList(self) -> List[str]:
+        return [str(Path.home())]
+
+    @api_call
+    def GetSubFolderList(self, folderPath: str) -> List[str]:
+        if not os.path.isdir(folderPath):
+            return []
+        return sorted(entry.path for entry in os.scandir(folderPath) if entry.is_dir())
+
+    @api_call
+    def GetFileList(self, folderPath: str) -> List[str]:
+        if not os.path.isdir(folderPath):
+            return []
+        return sorted(entry.path for entry in os.scandir(folderPath) if entry.is_file())
+
+    @api_call
+    def RevealInStorage(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    @api_call
+    def AddItemListToMediaPool(self, *items: Any) -> List[MediaPoolItem]:
+        if len(items) == 1 and isinstance(items[0], list):
+            items = tuple(items[0])
+        project = self._resolve._project_manager._current
+        return [] if project is None else project._media_pool._import(list(items))
+
+
+class Resolve(FakeObject):
+    def __init__(self, api: Optional[FakeAPI] = None):
+        super().__init__(api or FakeAPI())
+        self._project_manager = ProjectManager(self._api)
+        self._media_storage = MediaStorage(self._api, self)
+        self._page = "edit"
+
+    @property
+    def api(self) -> FakeAPI:
+        """Latency settings and call counter of this fake"""
+        return self._api
+
+    @api_call
+    def Fusion(self) -> None:
+        return None  # the fake has no Fusion
+
+    @api_call
+    def GetMediaStorage(self) -> MediaStorage:
+        return self._media_storage
+
+    @api_call
+    def GetProjectManager(self) -> ProjectManager:
+        return self._project_manager
+
+    @api_call
+    def OpenPage(self, pageName: str) -> bool:
+        if pageName not in (
+            "media",
+            "cut",
+            "edit",
+            "fusion",
+            "color",
+            "fairlight",
+            "deliver",
+        ):
+            return False
+        self._page = pageName
+        return True
+
+    @api_call
+    def GetCurrentPage(self) -> str:
+        return self._page
+
+    @api_call
+    def GetProductName(self) -> str:
+        return "DaVinci Resolve"
+
+    @api_call
+    def GetVersion(self) -> List[Any]:
+        return [18, 6, 0, 16, ""]
+
+    @api_call
+    def GetVersionString(self) -> str:
+        return "18.6.0.16"
+
+    @api_call
+    def Quit(self) -> None:
+        return None
+
+
+def frames_to_timecode(frames: int, fps: float) -> str:
+    rate = int(round(fps))
+    return f"{frames // (rate * 3600):02d}:{frames // (rate * 60) % 60:02d}:{frames // rate % 60:02d}:{frames % rate:02d}"
+
+
+def timecode_to_frames(timecode: str, fps: float) -> int:
+    rate = int(round(fps))
+    hours, minutes, seconds, frames = (
+        int(part) for part in timecode.replace(";", ":").split(":")
+    )
+    return ((hours * 60 + minutes) * 60 + seconds) * rate + frames
+
+
+def generate_project(
+    clips: int = 1_000,
+    bin_depth: int = 2,
+    bin_fanout: int = 4,
+    timelines: int = 1,
+    timeline_items: int = 500,
+    markers: int = 20,
+    media_dir: Optional[Union[str, Path]] = None,
+    media_bytes: int = 1024,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    seed: int = 0,
+    name: str = "Synthetic Project",
+) -> Resolve:
+    """
+    Build a fake Resolve with one open project of synthetic scale:
+
+    - `clips` spread over a bin tree `bin_depth` deep with `bin_fanout` bins per bin
+    - `timelines` timelines of `timeline_items` items (V1, V2 and A1) with `markers`
+    - clip files under `media_dir`, which (if given) are actually written,
+        `media_bytes` each, so that scripts like `collate` have something to copy
+    - `latency` (+ up to `jitter`) seconds charged for every API call
+    """
+    api = FakeAPI(seed=seed)
+    resolve = Resolve(api)
+    project = resolve._project_manager._add_project(name)
+    media_pool = project._media_pool
+    media_root = (
+        Path(media_dir) if media_dir is not None else Path("/Volumes/Media") / name
+    )
+
+    # a full tree of bins, clips spread across all of them
+    folders = [media_pool._root]
+    parents = [media_pool._root]
+    for depth in range(bin_depth):
+        children = []
+        for parent in parents:
+            for n in range(bin_fanout):
+                child = Folder(api, f"Bin {depth + 1}.{n + 1}", parent)
+                parent._subfolders.append(child)
+                children.append(child)
+        folders += children
+        parents = children
+
+    for n in range(clips):
+        folder = folders[n % len(folders)]
+        reel = n // 999 + 1
+        file_path = (
+            media_root
+            / folder_path(folder)
+            / f"A{reel:03d}C{n % 999 + 1:03d}_{n:06d}.mov"
+        )
+        clip = MediaPoolItem(api, str(file_path), frames=api.random.randint(48, 2400))
+        folder._add_clip(clip)
+
+        if media_dir is not None:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_bytes(bytes(media_bytes))
+
+    pool = list(media_pool._clips())
+    for t in range(timelines):
+        timeline = project._add_timeline(f"Timeline {t + 1}")
+        for i in range(timeline_items):
+            clip = api.random.choice(pool) if pool else None
+            duration = api.random.randint(24, 240)
+            timeline._append(clip, duration, track=1)
+            if i % 4 == 0:
+                timeline._append(clip, duration, track=1, track_type="audio")
+            if i % 10 == 0:
+                timeline._append(
+                    api.random.choice(pool) if pool else None, duration // 2, track=2
+                )
+
+        end = max(
+            (item._start + item._duration for item in timeline._items()),
+            default=timeline._start_frame,
+        )
+        for m in range(markers):
+            frame = timeline._start_frame + (end - timeline._start_frame) * m // max(
+                markers, 1
+            )
+            timeline._markers[frame - timeline._start_frame] = {
+                "color": MARKER_COLORS[m % len(MARKER_COLORS)],
+                "duration": 1,
+                "note": "",
+                "name": f"Section {m + 1}",
+                "customData": "",
+            }
+
+    api.latency, api.jitter = latency, jitter
+    return resolve
+
+
+def folder_path(folder: Folder) -> Path:
+    """Path of bin names below the root bin"""
+    names = []
+    while folder._parent is not None:
+        names.append(folder._name)
+        folder = folder._parent
+    return Path(*reversed(names)) if names else Path()
+
+
+# The Host runs inside Resolve's UI, so it's given a little fake of that UI:
+# a window whose status line can be read back, and a dispatcher whose
+# RunLoop is a plain Python loop calling the Host's timer every interval
+
+
+class FakeTimer:
+    def __init__(self, props: dict):
+        self.interval_ms = props.get("Interval", 50)
+        self.running = False
+
+    def Start(self):
+        self.running = True
+
+    def Stop(self):
+        self.running = False
+
+
+class FakeElement:
+    def __init__(self, props: Optional[dict] = None):
+        self.Text = (props or {}).get("Text", "")
+
+
+class FakeUIManager:
+    def __init__(self, interval_ms: Optional[int] = None):
+        self.interval_ms = interval_ms
+        self.timers: List[FakeTimer] = []
+
+    def VGroup(self, *args, **kwargs):
+        return None
+
+    def Label(self, props: dict):
+        return FakeElement(props)
+
+    def Button(self, props: dict):
+        return FakeElement(props)
+
+    def Font(self, *args, **kwargs):
+        return None
+
+    def Timer(self, props: dict) -> FakeTimer:
+        timer = FakeTimer(props)
+        if self.interval_ms is not None:
+            timer.interval_ms = self.interval_ms
+        self.timers.append(timer)
+        return timer
+
+
+class FakeWindow:
+    def __init__(self):
+        self.elements: Dict[str, FakeElement] = {}
+        self.On: Dict[str, Any] = {}
+        self.visible = False
+
+    def Find(self, element_id: str) -> FakeElement:
+        return self.elements.setdefault(element_id, FakeElement())
+
+    def __getattr__(self, name: str) -> Any:
+        return None
+
+    def Show(self):
+        self.visible = True
+
+    def Hide(self):
+        self.visible = False
+
+
+class FakeEvents(dict):
+    """`wnd.On[id].Close = ...` style event registration"""
+
+    def __missing__(self, key: str) -> Any:
+        handlers = self[key] = type("Handlers", (), {})()
+        return handlers
+
+
+class FakeDispatcher(dict):
+    def __init__(self, ui: FakeUIManager):
+        super().__init__(On={})
+        self.ui = ui
+        self.window: Optional[FakeWindow] = None
+        self.running = threading.Event()
+        self.stopping = threading.Event()
+        self.clicks: List[str] = []  # buttons clicked since the last tick
+
+    def AddWindow(self, props: dict, layout: Any = None) -> FakeWindow:
+        self.window = FakeWindow()
+        self.window.On = FakeEvents()
+        return self.window
+
+    def RunLoop(self):
+        self.running.set()
+        while not self.stopping.is_set():
+            # events are handled between ticks, as in Resolve's own UI loop
+            while self.clicks and self.window is not None:
+                self.window.On[self.clicks.pop(0)].Clicked({})
+            timers = [timer for timer in self.ui.timers if timer.running]
+            if timers and "Timeout" in self["On"]:
+                self["On"]["Timeout"]({"who": "main"})
+            interval = min((timer.interval_ms for timer in timers), default=50)
+            self.stopping.wait(interval / 1000)
+
+    def ExitLoop(self):
+        self.stopping.set()
+
+
+class FakeBMD:
+    def __init__(self, ui: FakeUIManager):
+        self.ui = ui
+        self.dispatcher: Optional[FakeDispatcher] = None
+
+    def UIDispatcher(self, ui: FakeUIManager) -> FakeDispatcher:
+        self.dispatcher = FakeDispatcher(ui)
+        return self.dispatcher
+
+
+class FakeFusion:
+    def __init__(self, ui: FakeUIManager):
+        self.UIManager = ui
+
+
+# in a checkout of the repo; installed, the `host_script` setting says where
+HOST_SCRIPT = Path(__file__).resolve().parents[2] / "hosts" / "DaisyChain.py"
+
+
+def host_script() -> Path:
+    """The Host script to run: `host_script` (see `daisychain.config`), else the repo's"""
+    script = Path(setting("host_script", HOST_SCRIPT)).expanduser()
+    if not script.is_file():
+        raise FileNotFoundError(
+            f"No DaisyChain Host script at {script}, set `host_script`"
+            " (or $DAISYCHAIN_HOST_SCRIPT) to where hosts/DaisyChain.py is"
+        )
+    return script
+
+
+class FakeHost:
+    """The real DaisyChain Host script, running in a thread against a fake"""
+
+    def __init__(self, thread: threading.Thread, bmd: FakeBMD):
+        self.thread = thread
+        self.bmd = bmd
+
+    @property
+    def status(self) -> str:
+        """Text of the Host window's status line"""
+        window = self.bmd.dispatcher.window if self.bmd.dispatcher else None
+        return window.Find("status_line").Text if window else ""
+
+    def click(self, element_id: str):
+        """Click the Host window's button `element_id` (e.g. `"reset_btn"`)"""
+        if self.bmd.dispatcher is not None:
+            self.bmd.dispatcher.clicks.append(element_id)
+
+    def stop(self, timeout: float = 5.0):
+        if self.bmd.dispatcher is not None:
+            self.bmd.dispatcher.ExitLoop()
+        self.thread.join(timeout)
+
+    def __enter__(self) -> "FakeHost":
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+        return False
+
+
+def run_host(
+    resolve: Resolve,
+    script: Optional[Union[str, Path]] = None,
+    interval_ms: Optional[int] = None,
+    quiet: bool = True,
+    timeout: float = 5.0,
+) -> FakeHost:
+    """
+    Run the DaisyChain Host `script` (default: see `host_script`) in a
+    background thread against `resolve`.
+    `interval_ms` overrides the Host's timer rate; `quiet` silences its printing.
+    """
+    script = script or host_script()
+    ui = FakeUIManager(interval_ms)
+    bmd = FakeBMD(ui)
+    init_globals = {"bmd": bmd, "resolve": resolve, "fusion": FakeFusion(ui)}
+    if quiet:
+        init_globals["print"] = lambda *args, **kwargs: None
+
+    thread = threading.Thread(
+        target=runpy.run_path,
+        args=(str(script),),
+        kwargs={"init_globals": init_globals, "run_name": "__main__"},
+        name="DaisyChain Host (fake)",
+        daemon=True,
+    )
+    thread.start()
+
+    deadline = time.time() + timeout
+    while thread.is_alive() and time.time() < deadline:
+        if bmd.dispatcher is not None and bmd.dispatcher.running.wait(0.01):
+            return FakeHost(thread, bmd)
+
+    raise RuntimeError(
+        f"The Host failed to start (see {Path.home() / 'daisy_chain_error_log.txt'})"
+    )
@@ -0,0 +1,219 @@
+"""
+# Fingerprints
+_Skip media the project already has, without reading all of it_
+
+Re-offloaded cards and duplicate downloads would otherwise import the
+same media twice. A `MediaIndex` knows the media of a project by
+fingerprint: its size and a hash of its head, middle and tail (read
+through mmap), with a hash of the whole file only when two fingerprints
+match. It's built from the project's clips' "File Path"s and from the
+files it's asked about, and kept between runs in `~/.daisychain-index.json`
+(the `index` setting), so files it has seen are only hashed again if
+their size or mtime changes:
+
+```
+index = MediaIndex(project.get_name())
+index.add_project(media_pool)  # once, or to catch up with Resolve
+new = index.new_files(paths)   # what to import
+media_pool.import_media(new)
+index.add(new)
+index.save()
+```
+"""
+
+from daisychain.config import setting
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import json
+import mmap
+import os
+
+if TYPE_CHECKING:
+    from daisychain.resolve import MediaPool, MediaPoolFolder, MediaPoolItem
+
+INDEX = os.path.expanduser(setting("index", "~/.daisychain-index.json"))
+INDEX_VERSION = 1
+
+SAMPLE = 64 * 1024  # bytes hashed at the head, middle and tail of a file
+
+
+def hash_mapped(path: Path, size: int, whole: bool = False) -> str:
+    """A hash of the head, middle & tail of the file at `path`, or of all of it"""
+    digest = hashlib.blake2b(digest_size=16)
+    if size == 0:
+        return digest.hexdigest()  # empty files can't be mapped
+    with open(path, "rb") as media_file:
+        with mmap.mmap(media_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if whole or size <= 3 * SAMPLE:
+                digest.update(mapped)
+            else:
+                middle = (size - SAMPLE) // 2
+                for start in (0, middle, size - SAMPLE):
+                    digest.update(mapped[start : start + SAMPLE])
+    return digest.hexdigest()
+
+
+class MediaIndex:
+    """
+    The media of the project `project`, by fingerprint, kept in the
+    index file at `path` with what's known of every file seen so far
+    """
+
+    def __init__(self, project: str, path: str = INDEX):
+        self.project = project
+        self.path = path
+        # path: [size, mtime_ns, partial hash, whole hash (or None)]
+        self.files: Dict[str, list] = {}
+        self.projects: Dict[str, List[str]] = {}  # project: paths of its media
+        try:
+            with open(path) as index_file:
+                index = json.load(index_file)
+            if index.get("version") == INDEX_VERSION:
+                self.files = index["files"]
+                self.projects = index["projects"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"❌ Starting a new index, couldn't read {path}: {e}")
+
+        self.media = set(self.projects.get(project, []))
+        # (size, partial hash): paths in the project with that fingerprint
+        self.prints: Dict[Tuple[int, str], List[str]] = {}
+        for media_path in self.media:
+            known = self.files.get(media_path)
+            if known is not None:
+                self.prints.setdefault((known[0], known[2]), []).append(media_path)
+
+    @property
+    def known(self) -> bool:
+        """Whether the project's media have been added yet (see `add_project`)"""
+        return self.project in self.projects
+
+    def entry(self, path: str) -> Optional[list]:
+        """What's known of the file at `path`, fingerprinting it if need be"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None  # offline media, known by path alone
+        known = self.files.get(path)
+        if known is None or known[:2] != [stat.st_size, stat.st_mtime_ns]:
+            partial = hash_mapped(Path(path), stat.st_size)
+            known = self.files[path] = [stat.st_size, stat.st_mtime_ns, partial, None]
+        return known
+
+    def whole(self, path: str) -> Optional[str]:
+        known = self.entry(path)
+        if known is None:
+            return None
+        if known[3] is None:
+            known[3] = hash_mapped(Path(path), known[0], whole=True)
+        return known[3]
+
+    def duplicate_of(self, path: str, prints: Optional[dict] = None) -> Optional[str]:
+        """
+        The project's media (or, of `prints`, the file) with the same
+        content as the file at `path`, if any
+        """
+        if prints is None:
+            if path in self.media:
+                return path
+            prints = self.prints
+        known = self.entry(path)
+        if known is None:
+            return None
+        for media_path in prints.get((known[0], known[2]), []):
+            # the samples match, so it's worth reading both whole to be sure
+            if media_path != path and self.whole(media_path) == self.whole(path):
+                return media_path
+        return None
+
+    def new_files(self, paths: Iterable[str]) -> List[str]:
+        """Those of `paths` not in the project (nor duplicates of each other)"""
+        new: List[str] = []
+        batch: Dict[Tuple[int, str], List[str]] = {}
+        for path in paths:
+            original = self.duplicate_of(path) or self.duplicate_of(path, batch)
+            if original is not None:
+                if original != path:
+                    print(f"> Skipping {path}, the same as {original}")
+                continue
+            new.append(path)
+            known = self.entry(path)
+            if known is not None:
+                batch.setdefault((known[0], known[2]), []).append(path)
+        return new
+
+    def add(self, paths: Iterable[str]):
+        """Note that `paths` are now media of the project"""
+        for path in paths:
+            if path in self.media:
+                continue
+            self.media.add(path)
+            known = self.entry(path)
+            if known is not None:
+                self.prints.setdefault((known[0], known[2]), []).append(path)
+
+    def add_project(self, media_pool: "MediaPool", workers: int = 8) -> int:
+        """
+        Make the project's media those of the clips in `media_pool`, asked
+        about a level of bins at a time, reading `workers` files at once
+        """
+        from daisychain import remote
+
+        folders, clips = [media_pool.get_root_folder()], []
+        while folders:
+            found = folder_contents(folders)
+            folders = [sub for _, subs in found for sub in subs]
+            clips += [clip for clip_list, _ in found for clip in clip_list]
+        found = remote.batch_each(clips, [("GetClipProperty", "File Path")])
+        paths = [
+            os.path.abspath(path)
+            for (path,) in found
+            if isinstance(path, str) and path  # not timelines, generators, ...
+        ]
+        # reading files is slow on network storage, so several at once
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(self.entry, paths))
+        self.media, self.prints = set(), {}  # forgetting clips since deleted
+        self.add(paths)
+        self.projects.setdefault(self.project, [])
+        return len(paths)
+
+    def save(self):
+        """Write the index, replacing the file only once it's whole"""
+        self.projects[self.project] = sorted(self.media)
+        temporary = f"{self.path}.{os.getpid()}"
+        with open(temporary, "w") as index_file:
+            json.dump(
+                {
+                    "version": INDEX_VERSION,
+                    "files": self.files,
+                    "projects": self.projects,
+                },
+                index_file,
+            )
+        os.replace(temporary, self.path)
+
+
+def folder_contents(
+    folders: List["MediaPoolFolder"],
+) -> List[Tuple[List["MediaPoolItem"], List["MediaPoolFolder"]]]:
+    """Each of `folders`' clips and bins, in one request"""
+    from daisychain.resolve import MediaPoolFolder, MediaPoolItem
+    from daisychain import remote
+
+    contents = []
+    for clips, subs in remote.batch_each(folders, ["GetClipList", "GetSubFolderList"]):
+        for found in (clips, subs):
+            if isinstance(found, remote.RPCError):
+                raise found
+        contents.append(
+            (
+                [MediaPoolItem(clip) for clip in clips or []],
+                [MediaPoolFolder(sub) for sub in subs or []],
+            )
+        )
+    return contents
@@ -231,6 +231,8 @@ class Fusion(API_Object):
     """ 
         Fusion API 
     """
+    __slots__ = ()
+
     # TODO: translate the types, stubs, and docs from: 
     # https://github.com/EmberLightVFX/BMD-Fusion-Scripting-Stubs
 
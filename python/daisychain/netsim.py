@@ -0,0 +1,178 @@
+"""
+# Network simulator
+_What do scripts feel like from a laptop over Wi-Fi?_
+
+A local TCP proxy to put between clients and the Host, which delays
+traffic the way a real network would: per-packet one-way latency and
+jitter, a bandwidth cap, and packets which are "lost" and wait for a
+retransmit. Opening a connection costs a round trip, as a handshake does.
+
+```
+with NetworkSimulator(PROFILES["wifi"]) as sim:
+    remote.PORT = sim.port  # or DAISYCHAIN_PORT for other processes
+    ...
+```
+
+or from the command line, `daisychain netsim --profile wifi`
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import threading
+import asyncio
+import random
+
+
+@dataclass(frozen=True)
+class NetworkProfile:
+    """One direction's worth of network behaviour (both directions alike)"""
+
+    latency_ms: float = 0.0  # one-way, so a round trip costs twice this
+    jitter_ms: float = 0.0  # extra, uniformly random, per packet
+    bandwidth_mbps: float = 0.0  # 0 for unlimited
+    loss: float = 0.0  # fraction of packets waiting for a retransmit
+    retransmit_ms: float = 200.0
+    mtu: int = 1460  # bytes per packet
+
+
+PROFILES = {
+    "loopback": NetworkProfile(),
+    "lan": NetworkProfile(latency_ms=0.25, jitter_ms=0.1, bandwidth_mbps=940),
+    "wifi": NetworkProfile(
+        latency_ms=3.0, jitter_ms=6.0, bandwidth_mbps=150, loss=0.001
+    ),
+    "wifi-congested": NetworkProfile(
+        latency_ms=8.0, jitter_ms=15.0, bandwidth_mbps=20, loss=0.01
+    ),
+    "vpn": NetworkProfile(latency_ms=20.0, jitter_ms=5.0, bandwidth_mbps=50),
+}
+
+
+class NetworkSimulator:
+    """
+    Proxy listening on `listen` (port 0 picks a free one, see `.port`)
+    and forwarding to `target` through the given `profile`
+    """
+
+    def __init__(
+        self,
+        profile: NetworkProfile,
+        target: Tuple[str, int] = ("127.0.0.1", 65432),
+        listen: Tuple[str, int] = ("127.0.0.1", 0),
+        seed: Optional[int] = None,
+    ):
+        self.profile = profile
+        self.target = target
+        self.listen = listen
+        self.random = random.Random(seed)
+        self.port: Optional[int] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.thread: Optional[threading.Thread] = None
+        self.started = threading.Event()
+
+    def delay(self) -> float:
+        """Seconds a packet spends in flight"""
+        profile = self.profile
+        ms = profile.latency_ms + self.random.uniform(0, profile.jitter_ms)
+        if profile.loss and self.random.random() < profile.loss:
+            ms += profile.retransmit_ms
+        return ms / 1000
+
+    async def pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Forward packets from `reader` to `writer`, in order, delayed"""
+        loop = asyncio.get_running_loop()
+        packets: asyncio.Queue = asyncio.Queue()
+        bytes_per_s = self.profile.bandwidth_mbps * 1e6 / 8
+
+        async def deliver():
+            while True:
+                at, data = await packets.get()
+                if data is None:
+                    break
+                wait = at - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                writer.write(data)
+                await writer.drain()
+
+        delivery = asyncio.ensure_future(deliver())
+        link_free = arrived = 0.0
+        try:
+            while True:
+                data = await reader.read(self.profile.mtu)
+                if not data:
+                    break
+                # the link sends one packet at a time, and a
+                # packet can't overtake the one in front of it
+                link_free = max(loop.time(), link_free)
+                if bytes_per_s:
+                    link_free += len(data) / bytes_per_s
+                arrived = max(link_free + self.delay(), arrived)
+                packets.put_nowait((arrived, data))
+        except ConnectionError:
+            pass
+        finally:
+            packets.put_nowait((0.0, None))
+            try:
+                await delivery
+            except ConnectionError:
+                pass
+            writer.close()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # connecting costs a round trip
+        await asyncio.sleep(self.delay() + self.delay())
+        try:
+            host_reader, host_writer = await asyncio.open_connection(*self.target)
+        except OSError:
+            writer.close()
+            return
+
+        try:
+            await asyncio.gather(
+                self.pipe(reader, host_writer),
+                self.pipe(host_reader, writer),
+            )
+        except asyncio.CancelledError:
+            # stopping with connections open
+            writer.close()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self.handle, *self.listen)
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started.set()
+        self.loop.run_forever()
+
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+
+    def start(self) -> "NetworkSimulator":
+        self.thread = threading.Thread(
+            target=self.run, name="daisychain netsim", daemon=True
+        )
+        self.thread.start()
+        self.started.wait()
+        return self
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self) -> "NetworkSimulator":
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+        return False
@@ -0,0 +1,151 @@
+"""
+# N+1 access-pattern detector
+_Which loops are paying for a round trip per object?_
+
+Set `DAISYCHAIN_PROFILE=1` (or call `start_profiling`) and every
+`API_Object.rpc` is counted by (type, method) and by the line of
+your script that made it. On exit the hot loops are reported, eg.
+
+```
+4,812 × MediaPoolItem.GetClipProperty from collate.py:41
+    9.62 s in round trips (2.00 ms each)
+    → GetClipProperty() with no name returns every property, or ...
+```
+
+along with the bulk API (if there is one) that would replace them.
+"""
+
+from typing import Optional, Tuple
+from dataclasses import dataclass
+import threading
+import atexit
+import sys
+import os
+
+# calls from inside the library are attributed to whoever called it,
+# except for the bundled scripts, which are call sites in their own right
+_LIBRARY = os.path.dirname(os.path.abspath(__file__))
+_SCRIPTS = os.path.join(_LIBRARY, "scripts")
+
+EXPORT_METADATA = "or MediaPool.ExportMetadata(file, clips) for many clips at once"
+
+# "Type.Method" -> the call which does the same work for many objects
+BULK_APIS = {
+    "MediaPoolItem.GetClipProperty": (
+        f"GetClipProperty() with no name returns every property, {EXPORT_METADATA}"
+    ),
+    "MediaPoolItem.GetMetadata": (
+        f"GetMetadata() with no type returns all metadata, {EXPORT_METADATA}"
+    ),
+    "MediaPoolItem.SetMetadata": "SetMetadata({...}) sets many fields in one call",
+    "MediaPoolItem.ReplaceClip": (
+        "MediaPool.RelinkClips(clips, folder_path) relinks a folder's clips at once"
+    ),
+    "MediaPool.ImportMedia": "MediaPool.ImportMedia([...]) takes every path at once",
+    "MediaPool.MoveClips": "MediaPool.MoveClips(clips, folder) takes every clip at once",
+    "MediaPool.DeleteClips": "MediaPool.DeleteClips(clips) takes every clip at once",
+    "MediaPool.AppendToTimeline": (
+        "MediaPool.AppendToTimeline(clips) takes every clip at once"
+    ),
+    "MediaPool.SetCurrentFolder": (
+        "group work by target folder, so the folder is switched once per group"
+    ),
+    "MediaStorage.AddItemListToMediaPool": (
+        "MediaStorage.AddItemListToMediaPool(*paths) takes every path at once"
+    ),
+    "TimelineItem.GetProperty": "GetProperty() with no key returns every property",
+    "Timeline.GetSetting": "GetSetting() with no name returns every setting",
+    "Project.GetSetting": "GetSetting() with no name returns every setting",
+    "Project.GetRenderJobStatus": (
+        'remote.batch(project, [("GetRenderJobStatus", job_id), ...]) asks for all'
+    ),
+}
+
+
+@dataclass
+class CallSite:
+    """Calls of one (type, method) from one line"""
+
+    count: int = 0
+    seconds: float = 0.0
+
+
+class Profiler:
+    """Aggregates rpc calls by (type, method, call site)"""
+
+    def __init__(self, min_calls: int = 10):
+        self.min_calls = min_calls
+        self.lock = threading.Lock()
+        self.sites: dict[Tuple[str, str, str, int], CallSite] = {}
+
+    def record(self, typ: str, impl: str, seconds: float):
+        filename, lineno = call_site()
+        key = (typ, impl, filename, lineno)
+        with self.lock:
+            site = self.sites.get(key)
+            if site is None:
+                site = self.sites[key] = CallSite()
+            site.count += 1
+            site.seconds += seconds
+
+    def hot_loops(self) -> list:
+        """Call sites repeated at least `min_calls` times, most expensive first"""
+        with self.lock:
+            sites = list(self.sites.items())
+        hot = [(key, site) for key, site in sites if site.count >= self.min_calls]
+        return sorted(hot, key=lambda hot_site: hot_site[1].seconds, reverse=True)
+
+    def report(self) -> str:
+        hot = self.hot_loops()
+        if not hot:
+            return "🔁 No repeated calls found"
+
+        lines = ["🔁 Hot loops (the same call repeated from one place):"]
+        for (typ, impl, filename, lineno), site in hot:
+            each_ms = 1000 * site.seconds / site.count
+            lines.append(
+                f"{site.count:>8,} × {typ}.{impl} from {os.path.basename(filename)}:{lineno}"
+            )
+            lines.append(
+                f"           {site.seconds:.2f} s in round trips ({each_ms:.2f} ms each)"
+            )
+            bulk = BULK_APIS.get(f"{typ}.{impl}")
+            if bulk is not None:
+                lines.append(f"           → {bulk}")
+
+        return "\n".join(lines)
+
+
+def call_site() -> Tuple[str, int]:
+    """The first frame outside of the daisychain library"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_LIBRARY) or filename.startswith(_SCRIPTS):
+            return filename, frame.f_lineno
+        frame = frame.f_back
+    return "?", 0
+
+
+profiler: Optional[Profiler] = None
+
+
+def start_profiling(min_calls: int = 10) -> Profiler:
+    """Count every API_Object.rpc from now on, reporting hot loops at exit"""
+    global profiler
+    if profiler is None:
+        atexit.register(stop_profiling)
+    profiler = Profiler(min_calls)
+    return profiler
+
+
+def stop_profiling():
+    """Stop counting and print the hot loops found"""
+    global profiler
+    if profiler is not None:
+        print(profiler.report())
+        profiler = None
+
+
+if os.environ.get("DAISYCHAIN_PROFILE"):
+    start_profiling(int(os.environ.get("DAISYCHAIN_PROFILE_MIN_CALLS", 10)))
@@ -1,57 +1,797 @@
-from unsync import unsync
-from typing import Any
-import asyncio
+from daisychain.config import setting, socket_path, agent_path, LOOPBACK
+from typing import Any, Dict, List, Optional, Tuple, Union
+import importlib
+import threading
+import struct
+import socket
+import mmap
 import json
+import time
+import zlib
+import sys
+import os
 
-HOST = "127.0.0.1"
-PORT = "65432"
+try:
+    import msgpack  # optional, for the binary codec: pip install msgpack
+except ImportError:
+    msgpack = None
+
+# see `daisychain.config` for the environment variables & config file
+HOST = setting("host", "127.0.0.1")
+PORT = int(setting("port", 65432))
+CODEC = setting("codec")  # insist on one, eg. "json"
+
+# compress messages over this many bytes (negative for never), by default
+# only off this machine: on loopback, compressing costs more than it saves
+COMPRESS_ABOVE = int(setting("compress_above", -1 if HOST in LOOPBACK else 64 * 1024))
+COMPRESS_LEVEL = 1
+
+# a `daisychain agent` on this machine, which answers for the host
+# (None to always go to the host; the agent itself does)
+AGENT = agent_path(PORT)
+
+# keep a connection open per thread, for long-running clients (which
+# then skip the host's accept on every request), rather than one per request;
+# or for some threads only, by `keep_open`
+KEEP_OPEN = str(setting("keep_open", False)).lower() in ("1", "true")
+
+# replies over this many bytes from a host on this machine come
+# through shared memory rather than the socket (negative for never)
+SHARE_ABOVE = int(setting("share_above", 256 * 1024))
+
+# seconds to wait for a reply (0 for ever), for every call or by name, eg.
+# {"ImportMedia": 300}: Resolve stops answering while rendering or showing
+# a dialog, and callers shouldn't pile up behind it
+TIMEOUT = float(setting("timeout", 30.0))
+# but calls which may well take minutes (importing or relinking hundreds
+# of files, say) get as long by default, as they aren't sent again
+SLOW_CALLS = {
+    "ImportMedia": 600.0,
+    "RelinkClips": 600.0,
+    "AddItemListToMediaPool": 600.0,
+    "ImportTimelineFromFile": 600.0,
+    "ImportFolderFromFile": 600.0,
+    "CreateTimelineFromClips": 300.0,
+    "AppendToTimeline": 300.0,
+    "DeleteClips": 300.0,
+    "MoveClips": 300.0,
+    "daisychain_batch": 300.0,
+}
+# calls which only read, and quickly, so are sent again when unanswered
+# (see `RETRIES`): not slow ones, nor `GetCurrent*` (which ask Resolve's UI
+# and may wait on it), nor batches, which may hold anything
+RETRYABLE = {
+    "daisychain_init",
+    "daisychain_stats",
+    "daisychain_resolve",
+    "GetProjectManager",
+    "GetMediaPool",
+    "GetRootFolder",
+    "GetClipList",
+    "GetSubFolderList",
+    "GetName",
+    "GetUniqueId",
+    "GetClipProperty",
+    "GetMetadata",
+    "GetMediaPoolItem",
+    "GetTimelineCount",
+    "GetTimelineByIndex",
+    "GetTrackCount",
+    "GetItemListInTrack",
+    "GetStartFrame",
+    "GetEndFrame",
+    "GetDuration",
+    "GetMarkers",
+    "GetSetting",
+    "GetRenderPresetList",
+    "GetRenderJobList",
+    "GetRenderJobStatus",
+    "IsRenderingInProgress",
+}
+TIMEOUTS: Dict[str, float] = setting("timeouts", {})
+if isinstance(TIMEOUTS, str):
+    TIMEOUTS = json.loads(TIMEOUTS)  # from the environment
+TIMEOUTS = {**SLOW_CALLS, **TIMEOUTS}
+CONNECT_TIMEOUT = float(setting("connect_timeout", 2.0))
+# seconds a `watch` waits for a change, before replying with no change
+WATCH_TIMEOUT = float(setting("watch_timeout", 20.0))
+
+# `RETRYABLE` calls are sent again this many times, after `BACKOFF`,
+# 2 × `BACKOFF`, ... seconds (jittered), when unanswered, while their
+# timeout (which is for all the tries) lasts
+RETRIES = int(setting("retries", 2))
+BACKOFF = float(setting("backoff", 0.2))
+
+# after this many unanswered requests in a row, fail fast for this many
+# seconds rather than wait on a host which isn't answering
+BREAKER_FAILURES = int(setting("breaker_failures", 3))
+BREAKER_RESET = float(setting("breaker_reset", 5.0))
+
+MAGIC = 0xDC  # first byte of a framed (binary) message, json ones start with "{"
+FRAME = struct.Struct(">BBI")  # magic, codec id, payload length
+HANDLE = 1  # msgpack ext type of API object handles
+HANDLE_REF = struct.Struct(">HI")  # type index, handle
+COMPRESSED = 0x80  # codec id flag of zlib compressed frames
+SHARED = 0x40  # codec id flag of frames whose payload is in the file they name
+
+# tracing, profiling & recording load only when used, by their variable
+# or their `start_...` function, to keep scripts quick to start
+INSTRUMENTS = {
+    "trace": "DAISYCHAIN_TRACE",
+    "profiling": "DAISYCHAIN_PROFILE",
+    "replay": "DAISYCHAIN_RECORD",
+}
+
+
+def instrument(module: str, name: str) -> Any:
+    """`daisychain.<module>.<name>`, if that module is loaded"""
+    return getattr(sys.modules.get(f"daisychain.{module}"), name, None)
 
 
 class RPCError(Exception):
     """Exception raised on RPC Errors"""
 
 
-async def rpc_connection(message):
-    reader, writer = await asyncio.open_connection(HOST, PORT)
-    writer.write(message.encode())
-    data = await reader.read(16384)
-    writer.close()
-    return data.decode()
+class RPCTimeout(RPCError):
+    """Raised when the host doesn't reply in time"""
+
+
+class HostUnavailable(RPCError):
+    """Raised without trying while the host isn't answering (see `CircuitBreaker`)"""
+
+
+class StaleHandleError(RPCError):
+    """
+    Raised for references to objects from before the host reset them
+    (or restarted), with the host's current `epoch`
+    """
+
+    def __init__(self, message: str, epoch: Optional[int] = None):
+        super().__init__(message)
+        self.epoch = epoch
+
+
+def wire_default(obj):
+    """API objects passed as args go over the wire as their references"""
+    if isinstance(obj, API_Object):
+        return obj.root
+    raise TypeError(f"{obj!r} cannot be serialized")
+
+
+class JSONCodec:
+    """The default codec, which every host speaks"""
+
+    name = "json"
+    id = 0
+
+    def encode(self, rqst: dict) -> bytes:
+        return json.dumps(rqst, default=wire_default).encode()
+
+    def decode(self, payload: bytes) -> dict:
+        return json.loads(bytes(payload))
+
+
+class MsgpackCodec:
+    """
+    MessagePack, in which the host sends API objects as small integer
+    handles and type indices, with the type names the client hasn't
+    seen yet framed ahead of each reply
+    """
+
+    name = "msgpack"
+    id = 1
+
+    def __init__(self):
+        self.types: List[str] = []
+
+    def encode(self, rqst: dict) -> bytes:
+        rqst["types"] = len(self.types)
+        payload = msgpack.packb(rqst, default=wire_default)
+        return FRAME.pack(MAGIC, self.id, len(payload)) + payload
+
+    def ext_hook(self, code: int, data: bytes):
+        if code != HANDLE:
+            return msgpack.ExtType(code, data)
+        # short-lived: API objects keep only the type & handle
+        typ_id, handle = HANDLE_REF.unpack(data)
+        return {"API_Object": {"type": self.types[typ_id], "uuid": handle}}
+
+    def decode(self, payload: bytes) -> dict:
+        unpacker = msgpack.Unpacker(ext_hook=self.ext_hook, strict_map_key=False)
+        unpacker.feed(payload)
+        # requests in flight at once may all bring the same new types
+        start, types = unpacker.unpack()
+        self.types[start : start + len(types)] = types
+        return unpacker.unpack()
+
+
+# in order of preference
+CODECS: Dict[str, Any] = {"json": JSONCodec()}
+if msgpack is not None:
+    CODECS = {"msgpack": MsgpackCodec(), **CODECS}
+
+# until the host says otherwise (see `rpc_init`), speak json, uncompressed,
+# through the socket only
+codec = CODECS["json"]
+compression: Optional[str] = None
+shared = False
+
+# the host's objects' epoch (None for hosts without), and its root
+# reference in that epoch, as of the last `rpc_init`
+epoch: Optional[int] = None
+root_ref: Optional[dict] = None
+
+
+class Session:
+    """
+    What a connection to the host speaks, as agreed by `daisychain_init`:
+    its codec (with the types it's been sent), compression & shared replies
+    """
+
+    __slots__ = ("codec", "compression", "shared")
+
+    def __init__(
+        self, codec: Any = None, compression: Optional[str] = None, shared=False
+    ):
+        self.codec = codec or CODECS["json"]
+        self.compression = compression
+        self.shared = shared
+
+    @classmethod
+    def agreed(cls, resp: dict) -> "Session":
+        """What the host's reply to `daisychain_init` agreed, in a codec of its own"""
+        # hosts predating codecs & compression don't say, and speak json
+        name = resp.get("codec", "json")
+        codec = MsgpackCodec() if name == "msgpack" and name in CODECS else None
+        return cls(codec, resp.get("compression"), sees_shared(resp.get("shared")))
 
 
-@unsync
-async def rpc_request(rqst):
-    rqst = json.dumps(rqst)
-    # loop = asyncio.get_event_loop()
-    # resp = loop.run_until_complete(rpc_connection(rqst))
-    resp = await rpc_connection(rqst)
-    resp = json.loads(resp)
+def current() -> Session:
+    """What this client agreed with the host, as of the last `rpc_init`"""
+    return Session(codec, compression, shared)
+
+
+def compress_frame(message: bytes) -> bytes:
+    """`message` (json, or a frame) as a compressed frame"""
+    codec_id, payload = 0, message
+    if message[0] == MAGIC:
+        codec_id, payload = message[1], message[FRAME.size :]
+    payload = zlib.compress(payload, COMPRESS_LEVEL)
+    return FRAME.pack(MAGIC, codec_id | COMPRESSED, len(payload)) + payload
+
+
+def sees_shared(shared: Optional[dict]) -> bool:
+    """Whether this client sees the host's shared replies (is on its machine)"""
+    if not shared:
+        return False
+    try:
+        with open(shared["probe"]) as probe:
+            return probe.read() == shared["token"]
+    except OSError:
+        return False
+
+
+def decode_shared(path: str, frame_codec) -> dict:
+    """Decode the reply the host left in the file at `path`, and delete it"""
+    with open(path, "rb") as shared_file:
+        with mmap.mmap(shared_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            resp = frame_codec.decode(mapped)
+    os.remove(path)
     return resp
 
 
+def decode_frame(frame: bytes, session: Optional[Session] = None) -> dict:
+    """Decode a whole frame from the host, compressed or shared"""
+    agreed = (session or current()).codec
+    _, codec_id, _ = FRAME.unpack_from(frame)
+    payload = memoryview(frame)[FRAME.size :]
+    frame_codec = agreed if agreed.id == codec_id & 0x3F else CODECS["json"]
+    if codec_id & SHARED:
+        return decode_shared(bytes(payload).decode(), frame_codec)
+    if codec_id & COMPRESSED:
+        payload = zlib.decompress(payload)
+    return frame_codec.decode(payload)
+
+
+def encode_request(rqst: dict, session: Optional[Session] = None) -> bytes:
+    """`rqst` as a message in the agreed codec, compressed if large"""
+    session = session or current()
+    compress = session.compression is not None and COMPRESS_ABOVE >= 0
+    if compress:
+        rqst["compress"] = COMPRESS_ABOVE
+    if session.shared and SHARE_ABOVE >= 0:
+        rqst["share"] = SHARE_ABOVE
+
+    message = session.codec.encode(rqst)
+    if compress and len(message) > COMPRESS_ABOVE:
+        message = compress_frame(message)
+    return message
+
+
+def unix_paths(agent: bool = True) -> List[str]:
+    """Unix domain sockets to try, in order, before the host's TCP port"""
+    paths = [AGENT] if agent else []
+    paths.append(socket_path(HOST, PORT))
+    return [path for path in paths if path is not None]
+
+
+def remaining(deadline: Optional[float], most: Optional[float] = None):
+    """Seconds until `deadline` (a monotonic time, or None for never), at most `most`"""
+    if deadline is None:
+        return most
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise socket.timeout("timed out")
+    return left if most is None else min(left, most)
+
+
+def connect(agent: bool = True, deadline: Optional[float] = None) -> socket.socket:
+    """
+    Connect to the agent if one is running, else to the host,
+    by its Unix domain socket if it's on this machine
+    """
+    for path in unix_paths(agent):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(remaining(deadline, CONNECT_TIMEOUT))
+        try:
+            sock.connect(path)
+            return sock
+        except OSError:
+            sock.close()  # no such socket (or an older host), so on to the next
+    timeout = remaining(deadline, CONNECT_TIMEOUT)
+    sock = socket.create_connection((HOST, PORT), timeout=timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+def recv_reply(
+    sock: socket.socket,
+    marks: Optional[dict] = None,
+    deadline: Optional[float] = None,
+) -> dict:
+    """Read one whole reply, which can span many reads, until `deadline`"""
+    data = bytearray()
+    while True:
+        sock.settimeout(remaining(deadline))
+        chunk = sock.recv(65536)
+        if not chunk:
+            raise RPCError("ConnectionError: host closed the connection")
+        data += chunk
+
+        if data[0] == MAGIC:
+            if len(data) < FRAME.size:
+                continue
+            _, _, length = FRAME.unpack_from(data)
+            # the rest of a large frame straight into place
+            frame = bytearray(FRAME.size + length)
+            frame[: len(data)] = data
+            view, got = memoryview(frame), len(data)
+            while got < len(frame):
+                sock.settimeout(remaining(deadline))
+                received = sock.recv_into(view[got:])
+                if not received:
+                    raise RPCError("ConnectionError: host closed the connection")
+                got += received
+            if marks is not None:
+                marks["received"] = time.perf_counter()
+            return decode_frame(frame)
+
+        if not chunk.endswith(b"}"):
+            continue
+        if marks is not None:
+            marks["received"] = time.perf_counter()
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            continue  # more to come
+
+
+def rpc_exchange(
+    rqst: dict, marks: Optional[dict] = None, timeout: Optional[float] = None
+) -> dict:
+    """Send `rqst` over a new connection and wait for its reply, for `timeout`"""
+    message = encode_request(rqst)
+    if marks is not None:
+        marks["encoded"] = time.perf_counter()
+    deadline = time.monotonic() + timeout if timeout else None
+    try:
+        if KEEP_OPEN or getattr(kept, "wanted", False):
+            return exchange_kept(message, marks, deadline)
+        with connect(deadline=deadline) as sock:
+            return exchange(sock, message, marks, deadline)
+    except socket.timeout:
+        raise RPCTimeout(f"TimeoutError: no reply from the host to {rqst['impl']}")
+
+
+def exchange(
+    sock: socket.socket,
+    message: bytes,
+    marks: Optional[dict] = None,
+    deadline: Optional[float] = None,
+) -> dict:
+    if marks is not None:
+        marks["connected"] = time.perf_counter()
+    sock.settimeout(remaining(deadline))
+    sock.sendall(message)
+    if marks is not None:
+        marks["sent"] = time.perf_counter()
+    return recv_reply(sock, marks, deadline)
+
+
+kept = threading.local()  # each thread's open connection (see `KEEP_OPEN`)
+
+
+def keep_open():
+    """Keep a connection open for this thread's requests, whatever `KEEP_OPEN`"""
+    kept.wanted = True
+
+
+def exchange_kept(
+    message: bytes, marks: Optional[dict] = None, deadline: Optional[float] = None
+) -> dict:
+    """`exchange` over this thread's open connection, opening one if need be"""
+    sock = getattr(kept, "sock", None)
+    if sock is not None:
+        try:
+            return exchange(sock, message, marks, deadline)
+        except socket.timeout:
+            sock.close()  # its reply may yet come, and be taken for the next's
+            kept.sock = None
+            raise
+        except (OSError, RPCError):
+            sock.close()  # the host closed it (restarted?), so on a new one
+            kept.sock = None
+
+    kept.sock = connect(deadline=deadline)
+    try:
+        return exchange(kept.sock, message, marks, deadline)
+    except BaseException:
+        kept.sock.close()
+        kept.sock = None
+        raise
+
+
+def call_timeout(impl: str) -> Optional[float]:
+    """Seconds to wait for the reply to `impl` (None for ever)"""
+    timeout = TIMEOUTS.get(impl, TIMEOUT)
+    return float(timeout) if timeout and timeout > 0 else None
+
+
+def reply_timeout(rqst: dict) -> Optional[float]:
+    """Seconds to wait for the reply to `rqst` (None for ever)"""
+    impl = rqst.get("impl", "")
+    timeout = call_timeout(impl)
+    if impl == "daisychain_watch" and timeout is not None:
+        timeout += rqst.get("kwgs", {}).get("timeout", 0)  # late on purpose
+    if impl == "daisychain_batch" and timeout is not None:
+        # at least as long as the slowest call in it gets
+        for call in rqst["args"][0]:
+            slowest = call_timeout(call.get("impl", ""))
+            if slowest is None:
+                return None
+            timeout = max(timeout, slowest)
+    return timeout
+
+
+def idempotent(impl: str) -> bool:
+    """Whether `impl` only reads, and quickly, so may be sent again"""
+    return impl in RETRYABLE
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the host isn't answering: after `failures`
+    unanswered requests in a row it opens, refusing requests for `reset`
+    seconds, then lets one through to see if the host is back
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset: float = BREAKER_RESET):
+        self.failures = failures
+        self.reset = reset
+        self.failed = 0  # in a row
+        self.opened: Optional[float] = None  # when, on the monotonic clock
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Raise `HostUnavailable` if requests shouldn't be tried now, else
+        whether this one is let through to see if the host is back
+        """
+        with self.lock:
+            if self.opened is None:
+                return False
+            wait = self.opened + self.reset - time.monotonic()
+            if wait <= 0 and not self.probing:
+                self.probing = True  # half open: this one finds out
+                return True
+        raise HostUnavailable(
+            f"HostUnavailable: the host isn't answering, trying again in"
+            f" {max(wait, 0):.1f}s"
+        )
+
+    def success(self):
+        with self.lock:
+            self.failed = 0
+            self.opened = None
+            self.probing = False
+
+    def failure(self):
+        with self.lock:
+            self.failed += 1
+            if self.probing or self.failed >= self.failures > 0:
+                self.opened = time.monotonic()
+            self.probing = False
+
+    def probed(self):
+        """The request let through has ended, whether answered or not"""
+        with self.lock:
+            self.probing = False
+
+
+breaker = CircuitBreaker()
+
+
+def backoff(attempt: int, deadline: Optional[float] = None):
+    """Wait before sending a request again, for longer each time (until `deadline`)"""
+    import random
+
+    wait = random.uniform(0.5, 1.0) * BACKOFF * 2**attempt
+    time.sleep(remaining(deadline, wait))
+
+
+# asyncio (and unsync) load only for those who use them, like the agent
+
+
+async def open_connection(agent: bool = True) -> "Tuple[Any, Any]":
+    """`connect`, as an asyncio stream reader & writer"""
+    import asyncio
+
+    for path in unix_paths(agent):
+        try:
+            return await asyncio.open_unix_connection(path)
+        except OSError:
+            pass
+    return await asyncio.open_connection(HOST, PORT)
+
+
+async def read_reply(
+    reader, marks: Optional[dict] = None, session: Optional[Session] = None
+) -> dict:
+    """`recv_reply`, from an asyncio stream reader, in what `session` agreed"""
+    import asyncio
+
+    data = bytearray()
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            raise RPCError("ConnectionError: host closed the connection")
+        data += chunk
+
+        if data[0] == MAGIC:
+            if len(data) < FRAME.size:
+                continue
+            _, codec_id, length = FRAME.unpack_from(data)
+            if len(data) < FRAME.size + length:
+                data += await reader.readexactly(FRAME.size + length - len(data))
+            if marks is not None:
+                marks["received"] = time.perf_counter()
+            if codec_id & COMPRESSED and not codec_id & SHARED:
+                # off the event loop, which other requests may be sharing
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, decode_frame, data, session)
+            return decode_frame(data, session)
+
+        if not chunk.endswith(b"}"):
+            continue
+        if marks is not None:
+            marks["received"] = time.perf_counter()
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            continue  # more to come
+
+
+async def rpc_connection(
+    message: bytes, marks: Optional[dict] = None, timeout: Optional[float] = None
+) -> dict:
+    import asyncio
+
+    reader, writer = await asyncio.wait_for(open_connection(), CONNECT_TIMEOUT)
+    if marks is not None:
+        marks["connected"] = time.perf_counter()
+    writer.write(message)
+    await writer.drain()
+    if marks is not None:
+        marks["sent"] = time.perf_counter()
+
+    try:
+        return await asyncio.wait_for(read_reply(reader, marks), timeout)
+    except asyncio.TimeoutError:
+        raise RPCTimeout(f"TimeoutError: no reply from the host in {timeout:g}s")
+    finally:
+        writer.close()
+
+
+def rpc_request(rqst: dict, marks: Optional[dict] = None):
+    """Send `rqst` without waiting: its reply as an unsync `Unfuture`"""
+    from unsync import unsync
+
+    timeout = call_timeout(rqst["impl"])
+    return unsync(rpc_connection)(encode_request(rqst), marks, timeout)
+
+
 def rpc(root: dict, impl: str, *args, **kwargs) -> Any:
     """Connect to the DaisyChain RPC Host,
     request to execute a command,
     return results or raise errors
     """
     rqst = {"root": root, "impl": impl, "args": list(args), "kwgs": dict(kwargs)}
+    return rpc_send(rqst)["value"]
+
+
+def rpc_send(rqst: dict, timeout: Optional[float] = None) -> dict:
+    """
+    Send the request `rqst`, returning the reply or raising its error;
+    waiting for `timeout` seconds (default: `call_timeout`) in all, and
+    sending `RETRYABLE` calls again (`RETRIES` times) if they aren't answered
+    """
+    root, impl = rqst["root"], rqst["impl"]
+
+    # when tracing, ask the host for its timings too
+    tracer = instrument("trace", "tracer")
+    recorder = instrument("replay", "recorder")
+    marks = None
+    if tracer is not None or recorder is not None:
+        marks = {"start": time.perf_counter()}
+    if tracer is not None:
+        rqst["trace"] = True
+    if epoch is not None and root:
+        rqst["epoch"] = epoch
 
-    # do
     # do request
-    resp = rpc_request(rqst)
-    resp = resp.result()
+    timeout = reply_timeout(rqst) if timeout is None else timeout
+    deadline = time.monotonic() + timeout if timeout else None
+    retries = RETRIES if idempotent(impl) else 0
+    for attempt in range(retries + 1):
+        probe = breaker.allow()
+        try:
+            # what's left of the deadline (so little, if nothing, times out)
+            left = deadline and max(deadline - time.monotonic(), 1e-3)
+            resp = rpc_exchange(rqst, marks, left)
+            error = resp["error"] or ""
+            if error.startswith(("ConnectionError", "TimeoutError")):
+                # an agent's, for a host which didn't answer it
+                raise (RPCTimeout if error.startswith("Timeout") else RPCError)(error)
+        except (OSError, RPCError):
+            breaker.failure()
+            if attempt == retries:
+                raise
+            try:
+                backoff(attempt, deadline)
+            except socket.timeout:
+                raise RPCTimeout(f"TimeoutError: no reply from the host to {impl}")
+            continue
+        finally:
+            if probe:
+                breaker.probed()  # even if interrupted, or the reply was garbled
+        breaker.success()
+        break
+
+    if marks is not None:
+        marks["end"] = time.perf_counter()
+    if tracer is not None:
+        name = f'{root["API_Object"]["type"]}.{impl}' if root else impl
+        tracer.record_rpc(name, marks, resp.get("timings"))
+    if recorder is not None:
+        recorder.record(rqst, resp, marks["start"], marks["end"])
 
     # raise errors if they occured
     if resp["error"] is not None:
+        if resp["error"].startswith("StaleHandleError"):
+            raise StaleHandleError(resp["error"], resp.get("epoch"))
         raise (RPCError(resp["error"]))
 
-    # get results
-    return resp["value"]
+    return resp
+
+
+def init_request() -> dict:
+    """A `daisychain_init` request, offering every codec this client speaks"""
+    return {
+        "root": {},
+        "impl": "daisychain_init",
+        "args": [],
+        "kwgs": {},
+        "codecs": [CODEC] if CODEC else list(CODECS),
+        "compression": ["zlib"],
+        "shared": True,
+    }
 
 
 def rpc_init() -> dict:
-    """Get `resolve` root reference"""
-    return rpc({}, "daisychain_init")
+    """
+    Get `resolve` root reference, and agree on a codec,
+    compression and shared replies (if on its machine) with the host
+    """
+    global codec, compression, shared, epoch, root_ref
+
+    # start over in json, the host may have been restarted since
+    codec, compression, shared = CODECS["json"], None, False
+    resp = rpc_send(init_request())
+
+    agreed = Session.agreed(resp)
+    codec, compression, shared = agreed.codec, agreed.compression, agreed.shared
+    epoch = resp.get("epoch")
+    root_ref = resp["value"]
+    # found by no call, so found again by initializing again
+    return {**root_ref, "from": (ROOT, None)}
+
+
+def rpc_stats() -> dict:
+    """Get the host's metrics (call counts, latencies, bytes, registry size)"""
+    return rpc({}, "daisychain_stats")
+
+
+class Source:
+    """
+    The call which found API objects, `parent.impl(*args, **kwgs)`,
+    what it returned when it was last made again (if it was), and the
+    handles of the objects it listed (`[key, handle]`s), for the host
+    to tell that those it finds again in their places are still them
+    """
+
+    __slots__ = ("parent", "impl", "args", "kwgs", "fresh", "handles")
+
+    def __init__(self, parent: Optional["API_Object"], impl: str, args, kwgs):
+        self.parent = parent
+        self.impl = impl
+        self.args = args
+        self.kwgs = kwgs
+        self.fresh: Optional[Tuple[Optional[int], Any]] = None  # (epoch, value)
+        self.handles: Optional[list] = None
+
+
+ROOT = Source(None, "daisychain_init", (), {})
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and "API_Object" in value
+
+
+def listed(value: Any) -> list:
+    """The `[key, handle]` of each reference in the listing `value`"""
+    items = value.items() if isinstance(value, dict) else enumerate(value)
+    return [[key, item["API_Object"]["uuid"]] for key, item in items if is_ref(item)]
+
+
+def adopt(value: Any, parent: "API_Object", impl: str, args, kwgs) -> Any:
+    """Mark the references in `value` with the call which found them"""
+    source = None
+    if is_ref(value):
+        source = Source(parent, impl, args, kwgs)
+        value["from"] = (source, None)
+    elif isinstance(value, (list, dict)):
+        items = value.items() if isinstance(value, dict) else enumerate(value)
+        for key, item in items:
+            if is_ref(item):
+                source = source or Source(parent, impl, args, kwgs)
+                item["from"] = (source, key)
+        if source is not None:
+            source.handles = listed(value)
+    return value
+
+
+def pick(value: Any, key: Any) -> Any:
+    if key is None:
+        return value
+    try:
+        return value[key]
+    except (IndexError, KeyError):
+        return None  # the listing is shorter now, so it's gone
+
+
+# objects are found again one at a time, as finding one may find others
+finding = threading.RLock()
 
 
 class API_Object:
@@ -59,8 +799,16 @@ class API_Object:
     Superclass for API Objects
     to retain object references
     and execute remote functions
+
+    Large listings make many of these, so each holds only its
+    (interned) type and handle, and rebuilds its reference to send;
+    and the call which found it, to find it again should the host
+    reset its objects or restart (see `find_again`), and its unique
+    id once it's been asked for (see `get_unique_id`)
     """
 
+    __slots__ = ("typ", "handle", "epoch", "source", "key", "unique_id")
+
     def __new__(cls, object_reference: dict):
         if object_reference is None:
             return None
@@ -68,8 +816,205 @@ class API_Object:
             return super().__new__(cls)
 
     def __init__(self, object_reference: dict):
-        self.root = object_reference
+        self.unique_id: Optional[str] = None
+        self.rebind(object_reference)
+        self.source: Optional[Source]
+        self.source, self.key = object_reference.get("from", (None, None))
+
+    def rebind(self, object_reference: Optional[dict]):
+        """Refer to the object `object_reference` refers to, in this epoch"""
+        if object_reference is None:
+            raise StaleHandleError(f"StaleHandleError: {self.typ} is gone")
+        ref = object_reference["API_Object"]
+        self.typ: str = sys.intern(ref["type"])
+        self.handle: Union[int, str] = ref["uuid"]
+        self.epoch = epoch
+
+    @property
+    def root(self) -> dict:
+        """This object's reference, as it goes over the wire"""
+        return {"API_Object": {"type": self.typ, "uuid": self.handle}}
+
+    def find_again(self, host_epoch: Optional[int] = None):
+        """
+        Find this object again after the host reset its objects (or
+        restarted), by making the calls which found it again, at once
+        """
+        with finding:
+            if host_epoch is not None and host_epoch != epoch:
+                rpc_init()
+
+            # the stale objects up to one which is current, or the root
+            chain: List[API_Object] = []
+            obj = self
+            while obj.epoch != epoch:
+                source = obj.source
+                if source is None:
+                    raise StaleHandleError(
+                        f"StaleHandleError: {obj.typ} wasn't found by a call,"
+                        " so can't be found again"
+                    )
+                if source is ROOT:
+                    obj.rebind(root_ref)
+                    break
+                if not source.impl.startswith("Get"):
+                    raise StaleHandleError(
+                        f"StaleHandleError: {obj.typ} was found by {source.impl},"
+                        " which would do it again rather than find it again"
+                    )
+                if source.fresh is not None and source.fresh[0] == epoch:
+                    obj.rebind(pick(source.fresh[1], obj.key))
+                    break
+                chain.append(obj)
+                obj = source.parent
+            if not chain:
+                return
+            chain.reverse()
+
+            # objects among the args may be stale too
+            for obj in chain:
+                for arg in [*obj.source.args, *obj.source.kwgs.values()]:
+                    if isinstance(arg, API_Object) and arg.epoch != epoch:
+                        arg.find_again()
+
+            start = chain[0].source.parent
+            if start.epoch != epoch:
+                start.find_again()
+            steps = [
+                {
+                    "impl": obj.source.impl,
+                    "args": list(obj.source.args),
+                    "kwgs": obj.source.kwgs,
+                    "key": obj.key,
+                    # for the host to tell that what it finds is still it
+                    "was": obj.handle,
+                }
+                for obj in chain
+            ]
+            # and that the siblings (found with the last) are still them
+            last = chain[-1]
+            if last.source.handles is not None:
+                del steps[-1]["was"]
+                steps[-1]["were"] = last.source.handles
+            found = rpc(start.root, "daisychain_resolve", steps)
+
+            for obj, value in zip(chain[:-1], found):
+                obj.rebind(value)
+            # the last call's other objects (siblings) are found with it
+            last.source.fresh = (epoch, found[-1])
+            if last.source.handles is not None:
+                last.source.handles = listed(found[-1])
+            last.rebind(pick(found[-1], last.key))
+
+    def call(self, impl: str, args: tuple, kwargs: dict):
+        profiler = instrument("profiling", "profiler")
+        if profiler is None:
+            return rpc(self.root, impl, *args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return rpc(self.root, impl, *args, **kwargs)
+        finally:
+            profiler.record(self.typ, impl, time.perf_counter() - start)
 
     def rpc(self, impl: str, *args, **kwargs):
         """Request `root.impl(*args, **kwargs)`"""
-        return rpc(self.root, impl, *args, **kwargs)
+        if self.epoch != epoch:
+            self.find_again()  # another object found the host reset
+        try:
+            value = self.call(impl, args, kwargs)
+        except StaleHandleError as e:
+            self.find_again(e.epoch)
+            for arg in [*args, *kwargs.values()]:
+                if isinstance(arg, API_Object):
+                    arg.find_again()
+            value = self.call(impl, args, kwargs)
+        if impl == "GetUniqueId" and isinstance(value, str):
+            self.unique_id = value
+        return adopt(value, self, impl, args, kwargs)
+
+
+def as_calls(steps: List[Union[str, tuple]]) -> List[dict]:
+    """Calls (names, or `(name, *args)`) as the host takes them"""
+    calls = []
+    for step in steps:
+        if isinstance(step, str):
+            calls.append({"impl": step})
+        else:
+            calls.append({"impl": step[0], "args": list(step[1:])})
+    return calls
+
+
+def batch(obj: API_Object, steps: List[Union[str, tuple]]) -> List[Any]:
+    """
+    What each of `steps` (names, or `(name, *args)`) on `obj` returns,
+    making them one after another in one request: what it returned, or
+    an `RPCError` for each which failed
+    """
+    return made(obj, [(obj, call) for call in as_calls(steps)])
+
+
+def batch_each(objs: List[API_Object], steps: List[Union[str, tuple]]) -> List[list]:
+    """
+    What `batch` would return for each of `objs` (eg. every item on a
+    track), for all of them in one request
+    """
+    if not objs:
+        return []
+    calls = [(on, {**call, "on": on}) for on in objs for call in as_calls(steps)]
+    values = made(objs[0], calls)
+    return [values[n : n + len(steps)] for n in range(0, len(values), len(steps))]
+
+
+def made(obj: API_Object, calls: List[Tuple[API_Object, dict]]) -> List[Any]:
+    """Make `calls` (each on an object) in one `daisychain_batch` sent to `obj`"""
+    wire = [call for _, call in calls]
+
+    def find_args_again():
+        # `rpc` finds `obj` again, but not the objects inside the calls
+        for call in wire:
+            for arg in [call.get("on"), *call.get("args", ())]:
+                if isinstance(arg, API_Object) and arg.epoch != epoch:
+                    arg.find_again()
+
+    find_args_again()
+    try:
+        results = obj.rpc("daisychain_batch", wire)
+    except StaleHandleError:
+        find_args_again()
+        results = obj.rpc("daisychain_batch", wire)
+
+    values = []
+    for (on, call), result in zip(calls, results):
+        if result["error"] is not None:
+            values.append(RPCError(result["error"]))
+            continue
+        # found by that call (not by the batch), so found again by it
+        impl, args = call["impl"], tuple(call.get("args", ()))
+        values.append(adopt(result["value"], on, impl, args, {}))
+    return values
+
+
+def watch(
+    obj: API_Object,
+    steps: List[Union[str, tuple]],
+    last: Any = None,
+    timeout: float = WATCH_TIMEOUT,
+    every: float = 0.0,
+) -> Any:
+    """
+    What calling `steps` (names, or `(name, *args)`) one after another
+    down from `obj` returns, as soon as that isn't `last` (else after
+    `timeout` seconds): the host looks again every `every` seconds (or
+    tick), so one request waits out any number of them. Values are
+    compared as they go over the wire, so watch for ids rather than
+    objects. Raises `RPCError` for hosts which can't watch
+    """
+    return obj.rpc(
+        "daisychain_watch", as_calls(steps), last, timeout=timeout, every=every
+    )
+
+
+for module, variable in INSTRUMENTS.items():
+    if os.environ.get(variable):
+        importlib.import_module(f"daisychain.{module}")
@@ -0,0 +1,262 @@
+"""
+# Record & replay
+_Capture a slow session in the edit bay, reproduce it anywhere_
+
+Set `DAISYCHAIN_RECORD=/path/to/session.jsonl` (or call `start_recording`)
+and every request and reply is appended to the log, one JSON object per line:
+
+```
+{"daisychain_log": 1, "side": "client", "started": 1700000000.0}
+{"at": 0.0012, "ms": 2.31, "rqst": {...}, "resp": {...}}
+```
+
+where `at` is seconds since the log started and `ms` the request's duration.
+The Host can write the same log (see `RECORD` in `DaisyChain.py`).
+
+`ReplayHost` then stands in for the Host, answering each request with
+the reply recorded for it (in recorded order, for requests made many
+times), either at full speed or at the recorded pacing; and `drive`
+sends a log's requests to a host, for benchmarking without Resolve:
+
+```
+daisychain replay session.jsonl --pace recorded
+```
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+from collections import deque
+import threading
+import asyncio
+import atexit
+import json
+import time
+import os
+
+LOG_VERSION = 1
+
+
+class Recorder:
+    """Appends requests and replies to a log file, safe across threads"""
+
+    def __init__(self, path: str, side: str = "client"):
+        self.path = path
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.file = open(path, "a", buffering=1)
+        header = {"daisychain_log": LOG_VERSION, "side": side, "started": time.time()}
+        self.file.write(json.dumps(header) + "\n")
+
+    def record(self, rqst: dict, resp: dict, started: float, ended: float):
+        """Log one request; `started` and `ended` are perf_counter times"""
+        line = json.dumps(
+            {
+                "at": round(started - self.origin, 6),
+                "ms": round((ended - started) * 1000, 3),
+                "rqst": rqst,
+                "resp": resp,
+            },
+            default=lambda obj: obj.root,  # API objects among the args
+        )
+        with self.lock:
+            self.file.write(line + "\n")
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def read_log(path: str) -> Iterator[dict]:
+    """Every request/reply record in the log(s) at `path`"""
+    with open(path) as log_file:
+        for line in log_file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "daisychain_log" in record:
+                continue  # a header; logs are appended to, so there may be many
+            yield record
+
+
+def request_key(rqst: dict) -> str:
+    """What makes two requests the same request"""
+    return json.dumps(
+        [rqst.get("root"), rqst.get("impl"), rqst.get("args"), rqst.get("kwgs")],
+        sort_keys=True,
+    )
+
+
+class ReplayHost:
+    """
+    A stand-in for the Host, serving the replies recorded in `path`,
+    immediately (`pace="full"`) or after the recorded duration (`"recorded"`)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        pace: str = "full",
+        listen: Tuple[str, int] = ("127.0.0.1", 0),
+    ):
+        self.pace = pace
+        self.listen = listen
+        self.replies: Dict[str, deque] = {}
+        for record in read_log(path):
+            key = request_key(record["rqst"])
+            self.replies.setdefault(key, deque()).append(record)
+
+        self.served = 0
+        self.missed = 0
+        self.port: Optional[int] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.started = threading.Event()
+
+    def reply_for(self, rqst: dict) -> Tuple[dict, float]:
+        """The recorded reply to `rqst` and how long it took, in seconds"""
+        records = self.replies.get(request_key(rqst))
+        if not records:
+            self.missed += 1
+            name = rqst.get("root", {}).get("API_Object", {}).get("type", "?")
+            error = f"ReplayError: no recorded reply for {name}.{rqst.get('impl')}"
+            return {"value": None, "error": error}, 0.0
+
+        self.served += 1
+        # replay in recorded order, holding on to the last reply
+        record = records.popleft() if len(records) > 1 else records[0]
+        resp = record["resp"]
+        if rqst.get("impl") == "daisychain_init":
+            # whatever was recorded, replays are in plain json
+            resp = {**resp, "codec": "json", "compression": None, "shared": None}
+        return resp, record["ms"] / 1000
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await self.serve(reader, writer)
+        except asyncio.CancelledError:
+            pass  # stopping with connections open
+        writer.close()
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        data = b""
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            data += chunk
+            if not chunk.endswith(b"}"):
+                continue
+            try:
+                rqst = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            data = b""
+
+            resp, seconds = self.reply_for(rqst)
+            if self.pace == "recorded" and seconds:
+                await asyncio.sleep(seconds)
+            writer.write(json.dumps(resp).encode())
+            await writer.drain()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(
+            asyncio.start_server(self.handle, *self.listen)
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        self.started.set()
+        self.loop.run_forever()
+
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        server.close()
+        self.loop.run_until_complete(server.wait_closed())
+        self.loop.close()
+
+    def start(self) -> "ReplayHost":
+        self.thread = threading.Thread(
+            target=self.run, name="daisychain replay", daemon=True
+        )
+        self.thread.start()
+        self.started.wait()
+        return self
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self) -> "ReplayHost":
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+        return False
+
+
+def drive(path: str, pace: str = "full") -> dict:
+    """
+    Send the requests in the log at `path` to the host (whichever
+    `daisychain.remote` is pointed at), back to back (`pace="full"`)
+    or at their recorded start times (`"recorded"`), and compare timings
+    """
+    from daisychain.remote import rpc, RPCError
+
+    records: List[dict] = list(read_log(path))
+    errors = 0
+    latencies = []
+    start = time.perf_counter()
+    for record in records:
+        if pace == "recorded":
+            wait = record["at"] - records[0]["at"] - (time.perf_counter() - start)
+            if wait > 0:
+                time.sleep(wait)
+
+        rqst = record["rqst"]
+        sent = time.perf_counter()
+        try:
+            rpc(rqst["root"], rqst["impl"], *rqst["args"], **rqst["kwgs"])
+        except RPCError:
+            errors += 1
+        latencies.append(time.perf_counter() - sent)
+
+    wall = time.perf_counter() - start
+    recorded_wall = (
+        records[-1]["at"] + records[-1]["ms"] / 1000 - records[0]["at"]
+        if records
+        else 0.0
+    )
+    return {
+        "requests": len(records),
+        "errors": errors,
+        "wall_s": wall,
+        "recorded_wall_s": recorded_wall,
+        "recorded_request_s": sum(record["ms"] for record in records) / 1000,
+        "request_s": sum(latencies),
+    }
+
+
+recorder: Optional[Recorder] = None
+
+
+def start_recording(path: str) -> Recorder:
+    """Append every rpc's request and reply to `path` from now on"""
+    global recorder
+    if recorder is None:
+        atexit.register(stop_recording)
+    recorder = Recorder(path)
+    return recorder
+
+
+def stop_recording():
+    global recorder
+    if recorder is not None:
+        recorder.close()
+        recorder = None
+
+
+if os.environ.get("DAISYCHAIN_RECORD"):
+    start_recording(os.environ["DAISYCHAIN_RECORD"])
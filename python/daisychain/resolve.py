@@ -1,6 +1,8 @@
-from typing import List, Optional, Dict, Union, Any
+from typing import TYPE_CHECKING, List, Optional, Dict, Union, Any
 from daisychain.remote import API_Object
-from daisychain.fusion import Fusion
+
+if TYPE_CHECKING:
+    from daisychain.fusion import Fusion  # loaded by `Resolve.fusion`
 
 '''
 # Resolve API
@@ -29,8 +31,12 @@ class Resolve(API_Object):
         Resolve API functions and types including various 
         export types for timelines and subtypes for AAF and EDL exports.
     '''
+    __slots__ = ()
+
     def fusion(self) -> "Fusion":
         """Returns the Fusion object. Starting point for Fusion scripts."""
+        from daisychain.fusion import Fusion
+
         return Fusion(self.rpc("Fusion"))
 
     def get_media_storage(self) -> "MediaStorage":
@@ -90,6 +96,8 @@ class Resolve(API_Object):
         self.rpc("Quit")
 
 class MediaStorage(API_Object):
+    __slots__ = ()
+
     def get_mounted_volume_list(self) -> List[str]:
         """Returns list of folder paths corresponding to mounted volumes displayed in Resolve's Media Storage."""
         return self.rpc("GetMountedVolumeList")
@@ -120,6 +128,8 @@ class MediaStorage(API_Object):
 
 
 class MediaPoolFolder(API_Object):
+    __slots__ = ()
+
     def get_clip_list(self) -> List["MediaPoolItem"]:
         """Returns a list of clips (items) within the folder."""
         return [MediaPoolItem(item) for item in self.rpc("GetClipList")]
@@ -141,6 +151,7 @@ class MediaPoolFolder(API_Object):
         return self.rpc("GetUniqueId")
 
 class ProjectManager(API_Object):
+    __slots__ = ()
 
     def archive_project(
         self,
@@ -243,6 +254,7 @@ class ProjectManager(API_Object):
         return self.rpc("SetCurrentDatabase", db_info)
 
 class Project(API_Object):
+    __slots__ = ()
 
     def get_media_pool(self) -> "MediaPool":
         """Returns the Media Pool object."""
@@ -384,6 +396,8 @@ class Project(API_Object):
         return self.rpc("InsertAudioToCurrentTrackAtPlayhead", media_path, start_offset_in_samples, duration_in_samples)
 
 class MediaPool(API_Object):
+    __slots__ = ()
+
     def get_root_folder(self) -> "MediaPoolFolder":
         """Returns root Folder of Media Pool."""
         return MediaPoolFolder(self.rpc("GetRootFolder"))
@@ -473,6 +487,8 @@ class MediaPool(API_Object):
         return self.rpc("GetUniqueId")
 
 class MediaPoolItem(API_Object):
+    __slots__ = ()
+
     def get_name(self) -> str:
         """Returns the clip name."""
         return self.rpc("GetName")
@@ -581,6 +597,8 @@ class MediaPoolItem(API_Object):
         return self.rpc("GetUniqueId")
 
 class TimelineItem(API_Object):
+    __slots__ = ()
+
     def get_name(self) -> str:
         """Returns the item name."""
         return self.rpc("GetName")
@@ -815,6 +833,7 @@ class TimelineItem(API_Object):
         return self.rpc("GetUniqueId")
 
 class Timeline(API_Object):
+    __slots__ = ()
 
     def get_name(self) -> str:
         """Returns the timeline name."""
@@ -998,6 +1017,10 @@ class RenderJob(API_Object):
     - PresetName: str
     - RenderJobName: str 
     """
+    __slots__ = ("root",)  # a plain dict, rather than a reference
+
+    def __init__(self, object_reference: dict):
+        self.root = object_reference
     
     AudioCodec: str
     AudioSampleRate: int
@@ -1032,6 +1055,11 @@ class RenderJobStatus(API_Object):
         - EstimatedTimeRemainingInMs: Optional[int]
         - Error: Optional[str]
     """
+    __slots__ = ("root",)  # a plain dict, rather than a reference
+
+    def __init__(self, object_reference: dict):
+        self.root = object_reference
+
     CompletionPercentage: float
     JobStatus: str # 'Ready' | 'Rendering' | 'Cancelled' | 'Complete' | 'Failed'
     TimeTakenToRenderInMs: Optional[int]
@@ -1040,14 +1068,18 @@ class RenderJobStatus(API_Object):
 
 class FusionComp(API_Object):
     """ Return or argument type for some TimelineItem methods but otherwise undocumented """
+    __slots__ = ()
 
 # TODO:❔ should the above really be daisychain.fusion.Composition type?
 # ie `FusionComp = daisychain.fusion.Composition`
 
 class GalleryStill(API_Object):
     """ Return or argument type for some TimelineItem methods but otherwise undocumented """
+    __slots__ = ()
 
 class Gallery(API_Object):
+    __slots__ = ()
+
     def get_album_name(self, gallery_still_album: "GalleryStillAlbum") -> str:
         """Returns the name of the GalleryStillAlbum object 'galleryStillAlbum'."""
         return self.rpc("GetAlbumName", gallery_still_album)
@@ -1069,6 +1101,8 @@ class Gallery(API_Object):
         return [GalleryStillAlbum(album) for album in self.rpc("GetGalleryStillAlbums")]
 
 class GalleryStillAlbum(API_Object):
+    __slots__ = ()
+
     def get_stills(self) -> List["GalleryStill"]:
         """Returns the list of GalleryStill objects in the album."""
         return [GalleryStill(still) for still in self.rpc("GetStills")]
@@ -1,11 +1,21 @@
 from daisychain import get_resolve
-from daisychain.resolve import MediaPool
-from watchfiles import watch as filewatch
 import click
 
 # stdlib
-from typing import Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from collections import defaultdict
+from fnmatch import fnmatch
 from pathlib import Path
+import heapq
+import json
+import time
+import os
+import re
+
+if TYPE_CHECKING:
+    from daisychain.fingerprint import MediaIndex
+    from daisychain.resolve import MediaPool, MediaPoolFolder, MediaPoolItem
 
 resolve_importables = [
     ".mp3",
@@ -21,24 +31,458 @@ resolve_importables = [
 ]
 
 
-def watch_mode(mpool: MediaPool, thisdir: str = "./"):
+class Settling:
+    """
+    Files being written, until their size & mtime stop changing
+
+    Each file is looked at again only when it's due, `settle` seconds
+    after it last changed: a file whose events keep coming is put off
+    without being looked at, and a quiet one is stat-ed once per `settle`
+    """
+
+    def __init__(self, settle: float):
+        self.settle = settle
+        self.files: Dict[Path, Tuple[int, int]] = {}  # path: (size, mtime_ns)
+        self.changed: Dict[Path, float] = {}  # path: when it last changed
+        self.due: List[Tuple[float, Path]] = []  # (when to look, path), a heap
+
+    def __len__(self) -> int:
+        return len(self.changed)
+
+    def __contains__(self, path: Path) -> bool:
+        return path in self.changed
+
+    def change(self, path: Path, now: float):
+        """`path` was added or written to"""
+        if path not in self.changed:
+            self.files[path] = (-1, -1)
+            heapq.heappush(self.due, (now + self.settle, path))
+        self.changed[path] = now
+
+    def remove(self, path: Path):
+        self.changed.pop(path, None)
+        self.files.pop(path, None)
+
+    def settled(self, now: float) -> List[Tuple[Path, int]]:
+        """The files (& their sizes) which have stopped changing by `now`"""
+        settled = []
+        while self.due and self.due[0][0] <= now:
+            _, path = heapq.heappop(self.due)
+            if path not in self.changed:
+                continue  # removed
+            changed = self.changed[path]
+            if changed + self.settle > now:
+                # written to since, so no need to look yet
+                heapq.heappush(self.due, (changed + self.settle, path))
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                self.remove(path)  # gone again
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != self.files[path]:
+                # still being written, without telling us
+                self.files[path] = (stat.st_size, stat.st_mtime_ns)
+                self.changed[path] = now
+                heapq.heappush(self.due, (now + self.settle, path))
+                continue
+            self.remove(path)
+            settled.append((path, stat.st_size))
+        return settled
+
+
+def skip_known(
+    index: Optional["MediaIndex"], settled: List[Tuple[Path, int]]
+) -> List[Tuple[Path, int]]:
+    """Those of `settled` files which the project doesn't have already"""
+    if index is None:
+        return settled
+    new = set(index.new_files([str(path.resolve()) for path, _ in settled]))
+    return [(path, size) for path, size in settled if str(path.resolve()) in new]
+
+
+def imported_paths(paths: List[str], mitems: List["MediaPoolItem"]) -> List[str]:
+    """Which of `paths` were imported, as `mitems`"""
+    if len(mitems) == len(paths):
+        return paths
+    return [mitem.get_clip_property("File Path") for mitem in mitems]
+
+
+def import_settled(
+    mpool: "MediaPool",
+    settled: List[Tuple[Path, int]],
+    chunk: int,
+    index: Optional["MediaIndex"] = None,
+):
+    """
+    Import `settled` files, `chunk` at a time, reporting throughput,
+    and noting them in `index` (which the caller saves)
+    """
+    start = time.perf_counter()
+    imported = 0
+    for n in range(0, len(settled), chunk):
+        paths = [str(path.resolve()) for path, _ in settled[n : n + chunk]]
+        mitems = mpool.import_media(paths)
+        imported += len(mitems)
+        if len(mitems) < len(paths):  # Resolve's API fails silently...
+            print(f"💩 {len(paths) - len(mitems)} of {len(paths)} failed to import")
+        if index is not None:
+            index.add(imported_paths(paths, mitems))
+
+    seconds = max(time.perf_counter() - start, 1e-6)
+    size = sum(size for _, size in settled)
+    print(
+        f"> Imported {imported} of {len(settled)} files ({size / 1e6:,.1f} MB)"
+        f" in {seconds:.2f}s: {imported / seconds:,.1f} files/s,"
+        f" {size / 1e6 / seconds:,.1f} MB/s"
+    )
+    return imported
+
+
+def watch_mode(
+    mpool: "MediaPool",
+    thisdir: str = "./",
+    settle: float = 2.0,
+    chunk: int = 200,
+    index: Optional["MediaIndex"] = None,
+):
+    from watchfiles import watch as filewatch, Change
+    from daisychain import remote
 
     watch = Path(thisdir)
-    print(f'👀 Watching {watch.absolute()}')
+    print(f"👀 Watching {watch.absolute()}")
 
-    for changes in filewatch(watch):
-        for change in changes:
-            change_type, path = change
+    settling = Settling(settle)
+    failed: List[Tuple[Path, int]] = []  # to import again
+    total = 0
+    # wake up at least every half `settle` to import what's settled,
+    # batching events as they come (rather than one by one)
+    tick = max(int(settle * 500), 50)
+    for changes in filewatch(
+        watch, debounce=tick, step=50, rust_timeout=tick, yield_on_timeout=True
+    ):
+        now = time.monotonic()
+        for change_type, path in changes:
             path = Path(path)
+            if change_type == Change.deleted:
+                settling.remove(path)
+            elif change_type == Change.added and path.is_file():
+                settling.change(path, now)
+            elif change_type == Change.modified and path in settling:
+                settling.change(path, now)  # still being written
+
+        settled = skip_known(index, failed + settling.settled(now))
+        failed = []
+        if settled:
+            try:
+                total += import_settled(mpool, settled, chunk, index)
+                print(f"> {total} imported so far, {len(settling)} still settling")
+            except remote.RPCError as e:
+                # so again next time (the index skips what did import)
+                print(f"❌ Import failed, trying again: {e}")
+                failed = settled
+            if index is not None:
+                index.save()
+
+
+def scan_dir(directory: Path) -> Tuple[List[Tuple[Path, int]], List[Path]]:
+    """The importable files (& their sizes) and the subdirectories in `directory`"""
+    files, subdirs = [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(Path(entry.path))
+            elif Path(entry.name).suffix.lower() in resolve_importables:
+                files.append((Path(entry.path), entry.stat().st_size))
+    return sorted(files), subdirs
+
+
+def scan_tree(top: Path, workers: int) -> Dict[Path, List[Tuple[Path, int]]]:
+    """
+    The importable files in every directory under `top` which has any,
+    by their path relative to `top`, scanning `workers` directories at once
+    (which is what's slow on network storage)
+    """
+    tree: Dict[Path, List[Tuple[Path, int]]] = {}
+    with ThreadPoolExecutor(workers) as pool:
+        scans = {pool.submit(scan_dir, top): top}
+        while scans:
+            done, _ = wait(scans, return_when=FIRST_COMPLETED)
+            for scan in done:
+                directory = scans.pop(scan)
+                files, subdirs = scan.result()
+                if files:
+                    tree[directory.relative_to(top)] = files
+                for subdir in subdirs:
+                    scans[pool.submit(scan_dir, subdir)] = subdir
+    return tree
+
+
+def mirror_bins(
+    mpool: "MediaPool", into: "MediaPoolFolder", dirs: List[Path]
+) -> Dict[Path, "MediaPoolFolder"]:
+    """
+    A bin for each of `dirs` (relative paths, and their parents) under
+    `into`, reusing bins which are already there, by path
+
+    Bins are made a level at a time, in a few requests each (each a
+    `daisychain_batch`); and only bins which were already there are asked
+    for their sub-bins. Bins made are listed again after, so that (found
+    by a `Get*` call) they can be found again should the Host reset its
+    objects, as long-running watches need
+    """
+    from daisychain.resolve import MediaPoolFolder
+    from daisychain import remote
+
+    bins: Dict[Path, "MediaPoolFolder"] = {Path("."): into}
+    existed = {Path(".")}
+
+    levels = defaultdict(set)
+    for directory in dirs:
+        for parent in [directory, *directory.parents][:-1]:
+            levels[len(parent.parts)].add(parent)
+
+    def checked(values: list) -> list:
+        for value in values:
+            if isinstance(value, remote.RPCError):
+                raise value
+        return values
+
+    def sub_bins(parents: List[Path]) -> Dict[Path, "MediaPoolFolder"]:
+        """The sub-bins of each of `parents`, by path, in two requests"""
+        found = remote.batch_each([bins[p] for p in parents], ["GetSubFolderList"])
+        listed = checked([subs for (subs,) in found])
+        subs = [
+            (parent, MediaPoolFolder(sub))
+            for parent, found_subs in zip(parents, listed)
+            for sub in found_subs or []
+        ]
+        names = remote.batch_each([sub for _, sub in subs], ["GetName"])
+        return {
+            parent / name: sub
+            for (parent, sub), (name,) in zip(subs, names)
+            if isinstance(name, str)
+        }
+
+    for depth in sorted(levels):
+        level = sorted(levels[depth])
+        there = sub_bins(sorted({d.parent for d in level if d.parent in existed}))
+        there = {d: sub for d, sub in there.items() if d in levels[depth]}
+
+        missing = [d for d in level if d not in there]
+        bins.update(there)
+        existed.update(there)
+        if missing:
+            checked(
+                remote.batch(
+                    mpool, [("AddSubFolder", bins[d.parent], d.name) for d in missing]
+                )
+            )
+            added = sub_bins(sorted({d.parent for d in missing}))
+            bins.update((d, sub) for d, sub in added.items() if d in levels[depth])
+        print(
+            f"> Level {depth}: {len(level) - len(missing)} bins already there,"
+            f" {len(missing)} added"
+        )
+    return bins
+
+
+def ingest_tree(
+    mpool: "MediaPool",
+    top: Path,
+    chunk: int = 200,
+    workers: int = 8,
+    index: Optional["MediaIndex"] = None,
+):
+    """
+    Mirror the directory tree at `top` into a bin (named after it) in the
+    current bin, importing each directory's media into its bin
+    (but for media the project has already, by `index`)
+    """
+    start = time.perf_counter()
+    tree = scan_tree(top, workers)
+    files = sum(len(files) for files in tree.values())
+    print(
+        f"> Found {files} files in {len(tree)} directories"
+        f" in {time.perf_counter() - start:.2f}s"
+    )
+    if index is not None:
+        tree = {d: skip_known(index, settled) for d, settled in tree.items()}
+        tree = {d: settled for d, settled in tree.items() if settled}
+        new = sum(len(files) for files in tree.values())
+        print(f"> {files - new} of them are duplicates")
+        files = new
+    if not tree:
+        return 0
+
+    current = mpool.get_current_folder()
+    top_bin = Path(top.resolve().name)
+    bins = mirror_bins(mpool, current, [top_bin / d for d in tree])
 
-            if str(change_type) != "Change.added":
+    # media goes into the current bin, so one bin at a time
+    imported = 0
+    try:
+        for directory, settled in sorted(tree.items()):
+            print(f"> {directory}")
+            mpool.set_current_folder(bins[top_bin / directory])
+            imported += import_settled(mpool, settled, chunk, index)
+    finally:
+        mpool.set_current_folder(current)
+        if index is not None:
+            index.save()
+
+    seconds = time.perf_counter() - start
+    print(f"✅ Imported {imported} of {files} files in {seconds:.1f}s")
+    return imported
+
+
+class Rule:
+    """
+    Files under `watch` go into the bin at `bin` (a path from the media
+    pool's root, made if need be), if they match all of `glob` (on their
+    path under `watch`), `ext` (any of) and `regex` (searched for in it)
+    """
+
+    def __init__(
+        self,
+        watch: str,
+        bin: str,
+        glob: Optional[str] = None,
+        ext: Optional[List[str]] = None,
+        regex: Optional[str] = None,
+    ):
+        self.watch = Path(watch).expanduser().resolve()
+        self.bin = Path(bin.strip("/"))
+        self.glob = glob
+        self.ext = None if ext is None else [e.lower() for e in ext]
+        self.regex = None if regex is None else re.compile(regex)
+
+    def matches(self, path: Path) -> bool:
+        try:
+            relative = path.relative_to(self.watch).as_posix()
+        except ValueError:
+            return False  # under another watched directory
+        if self.glob is not None and not fnmatch(relative, self.glob):
+            return False
+        if self.ext is not None and path.suffix.lower() not in self.ext:
+            return False
+        return self.regex is None or bool(self.regex.search(relative))
+
+
+def load_rules(path: str) -> List[Rule]:
+    """
+    The rules in the JSON file at `path`, first match first:
+
+    ```
+    {"rules": [
+        {"watch": "/Volumes/Offload", "glob": "*/A_CAM/*", "bin": "Footage/A Cam"},
+        {"watch": "/Volumes/Offload", "ext": [".wav", ".bwf"], "bin": "Audio"},
+        {"watch": "~/Downloads", "regex": "^GFX_", "bin": "Graphics"},
+        {"watch": "~/Downloads", "bin": "Downloads"}
+    ]}
+    ```
+    """
+    with open(path) as rules_file:
+        return [Rule(**rule) for rule in json.load(rules_file)["rules"]]
+
+
+def import_routed(
+    mpool: "MediaPool",
+    bins: Dict[Path, "MediaPoolFolder"],
+    routed: Dict[Path, List[Tuple[Path, int]]],
+    chunk: int,
+    index: Optional["MediaIndex"] = None,
+) -> int:
+    """Import `routed` files into their bins, switching to each bin once"""
+    imported = 0
+    current = mpool.get_current_folder()
+    try:
+        for bin_path, settled in routed.items():
+            settled = skip_known(index, settled)
+            if not settled:
                 continue
+            print(f"> Into {bin_path}")
+            mpool.set_current_folder(bins[bin_path])
+            imported += import_settled(mpool, settled, chunk, index)
+    finally:
+        mpool.set_current_folder(current)
+        if index is not None:
+            index.save()
+    return imported
 
-            print(f"> Importing {path} into project")
-            mitems = mpool.import_media([str(path.resolve())])
 
-            if not len(mitems): # Resolve's API fails silently...
-                print(f"! Failed for unspecified reason: {path}")
+async def rules_mode(
+    mpool: "MediaPool",
+    rules: List[Rule],
+    settle: float = 2.0,
+    chunk: int = 200,
+    index: Optional["MediaIndex"] = None,
+):
+    """
+    Watch every rule's directory at once, importing settled files into
+    the bin of the first rule they match, a batch at a time
+    """
+    from watchfiles import awatch, Change
+    from daisychain import remote
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    # media goes into the current bin, so imports happen one batch at a time,
+    # while the next batch settles: over one connection to the host, however
+    # many directories
+    importer = ThreadPoolExecutor(1, "bindive import", initializer=remote.keep_open)
+    bin_paths = sorted({rule.bin for rule in rules})
+    bins = await loop.run_in_executor(
+        importer, mirror_bins, mpool, mpool.get_root_folder(), bin_paths
+    )
+
+    watched = sorted({rule.watch for rule in rules})
+    for directory in watched:
+        print(f"👀 Watching {directory}")
+
+    settling = Settling(settle)
+    routed: Dict[Path, List[Tuple[Path, int]]] = defaultdict(list)
+    sending: Dict[Path, List[Tuple[Path, int]]] = {}  # what's importing
+    importing: Optional[asyncio.Future] = None
+    total = 0
+    tick = max(int(settle * 500), 50)
+    async for changes in awatch(
+        *watched, debounce=tick, step=50, rust_timeout=tick, yield_on_timeout=True
+    ):
+        now = time.monotonic()
+        for change_type, path in changes:
+            path = Path(path)
+            if change_type == Change.deleted:
+                settling.remove(path)
+            elif change_type == Change.added and path.is_file():
+                settling.change(path, now)
+            elif change_type == Change.modified and path in settling:
+                settling.change(path, now)
+
+        for path, size in settling.settled(now):
+            rule = next((rule for rule in rules if rule.matches(path)), None)
+            if rule is None:
+                print(f"> No rule for {path}")
+                continue
+            routed[rule.bin].append((path, size))
+
+        if importing is not None and importing.done():
+            try:
+                total += importing.result()
+                print(f"> {total} imported so far, {len(settling)} still settling")
+            except Exception as e:
+                # so again with the next batch (the index skips what did import)
+                print(f"❌ Import failed, trying again: {e}")
+                for bin_path, settled in sending.items():
+                    routed[bin_path][:0] = settled
+            importing = None
+        if routed and importing is None:
+            sending, routed = routed, defaultdict(list)
+            importing = loop.run_in_executor(
+                importer, import_routed, mpool, bins, sending, chunk, index
+            )
 
 
 @click.command()
@@ -49,17 +493,82 @@ def watch_mode(mpool: MediaPool, thisdir: str = "./"):
     default=False,
     help="Watch current directory for new files, importing when added",
 )
-def main(filepaths: Tuple[str, ...], watch: bool = False):
+@click.option(
+    "--settle",
+    default=2.0,
+    help="Seconds a watched file's size must hold still before it's imported",
+)
+@click.option("--chunk", default=200, help="Most files to import in one request")
+@click.option(
+    "-r",
+    "--recursive",
+    is_flag=True,
+    default=False,
+    help="Mirror directories into bins, importing their media into them",
+)
+@click.option(
+    "--workers", default=8, help="Directories to scan, files to fingerprint at once"
+)
+@click.option(
+    "--dedupe/--no-dedupe",
+    default=True,
+    help="Skip media the project has already (by content, see daisychain.fingerprint)",
+)
+@click.option(
+    "--rules",
+    "rules_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Watch the directories in a rules file, importing into bins by rule",
+)
+@click.option(
+    "--reindex",
+    is_flag=True,
+    default=False,
+    help="Catch up with the project's media, as deduping goes by",
+)
+def main(
+    filepaths: Tuple[str, ...],
+    watch: bool = False,
+    settle: float = 2.0,
+    chunk: int = 200,
+    recursive: bool = False,
+    workers: int = 8,
+    dedupe: bool = True,
+    reindex: bool = False,
+    rules_path: Optional[str] = None,
+):
     """Processes the given file path and converts it to an absolute path."""
 
     resolve = get_resolve()
-    mpool = resolve.get_project_manager().get_current_project().get_media_pool()
+    project = resolve.get_project_manager().get_current_project()
+    mpool = project.get_media_pool()
+
+    index = None
+    if dedupe:
+        from daisychain.fingerprint import MediaIndex
 
-    if watch and len(filepaths) == 0:
-        watch_mode(mpool)
+        index = MediaIndex(project.get_name())
+        if reindex or not index.known:
+            start = time.perf_counter()
+            clips = index.add_project(mpool, workers)
+            print(f"> Indexed {clips} clips in {time.perf_counter() - start:.1f}s")
+
+    if rules_path is not None:
+        import asyncio
+
+        rules = load_rules(rules_path)
+        asyncio.run(rules_mode(mpool, rules, settle, chunk, index))
+
+    elif watch and len(filepaths) == 0:
+        watch_mode(mpool, settle=settle, chunk=chunk, index=index)
 
     elif watch:
-        watch_mode(mpool, filepaths[0])
+        watch_mode(mpool, filepaths[0], settle=settle, chunk=chunk, index=index)
+
+    elif recursive:
+        for top in filepaths or ["./"]:
+            ingest_tree(mpool, Path(top), chunk, workers, index)
 
     else:
         if len(filepaths) == 0:
@@ -68,7 +577,16 @@ def main(filepaths: Tuple[str, ...], watch: bool = False):
 
         paths = [Path(p) for p in filepaths]
         paths = [str(p.absolute()) for p in paths if p.suffix in resolve_importables]
+        if index is not None:
+            paths = index.new_files(paths)
+            if not paths:
+                index.save()  # what it learnt indexing the project, for next time
+                print("✅ The project has all this media already")
+                return
         clips = mpool.import_media(paths)
+        if index is not None:
+            index.add(imported_paths(paths, clips))
+            index.save()
 
         if len(clips) == 0:
             print("❌ All media failed to import")
@@ -0,0 +1,250 @@
+"""
+
+🌼 daisychain command line, for looking after the host itself
+
+`daisychain stats` shows where time goes inside the host:
+    per (type, method) call counts, errors and latencies
+    for decoding, the Resolve call, and encoding
+
+`daisychain fake-host` runs the host against a fake Resolve
+    holding a synthetic project, for trying scripts offline
+
+`daisychain netsim` puts a simulated network (latency, jitter,
+    bandwidth, loss) between clients and the host
+
+`daisychain agent` keeps a warm connection to the host and a
+    shared cache of its replies for short-lived tools to use
+
+`daisychain replay` stands in for the host with the replies of
+    a recorded session (see DAISYCHAIN_RECORD), and benchmarks it
+
+"""
+
+from typing import Optional
+import click
+import json
+import time
+
+STAGES = ("decode", "call", "encode")
+
+
+def print_stats(stats: dict, top: int):
+    p95 = stats["p95_ms"]
+    print(
+        f"🌼 DaisyChain Host v{stats['version']}"
+        f" up {stats['uptime_s']:.0f}s\n"
+        f"   requests  {stats['requests']:,}"
+        f" ({stats['requests_per_s']:.1f}/s"
+        f", p95 {'-' if p95 is None else f'{p95:.2f} ms'})\n"
+        f"   bytes     {stats['bytes_in']:,} in / {stats['bytes_out']:,} out\n"
+        f"   queue     {stats['queue_depth']} (max {stats['queue_depth_max']})\n"
+        f"   objects   {stats['api_objects']:,}"
+    )
+
+    # hosts predating compression don't report it
+    compression = stats.get("compression", {"replies": 0})
+    if compression["replies"]:
+        print(
+            f"   zlib      {compression['replies']:,} replies,"
+            f" {compression['bytes_in']:,} → {compression['bytes_out']:,} bytes"
+            f" (p95 {compression['compress']['p95_ms']:.2f} ms)"
+        )
+    shared = stats.get("shared", {"replies": 0})
+    if shared["replies"]:
+        print(
+            f"   shared    {shared['replies']:,} replies,"
+            f" {shared['bytes']:,} bytes through memory"
+        )
+    print()
+
+    def total_ms(item) -> float:
+        _, method = item
+        return sum(method[stage]["total_ms"] for stage in STAGES)
+
+    # most expensive methods first
+    methods = sorted(stats["methods"].items(), key=total_ms, reverse=True)
+
+    header = f"{'method':<44} {'calls':>8} {'errors':>6}"
+    for stage in STAGES:
+        header += f" {stage + ' p50':>11} {stage + ' p95':>11}"
+    print(header)
+    print("-" * len(header))
+
+    for name, method in methods[:top]:
+        line = f"{name:<44} {method['calls']:>8,} {method['errors']:>6,}"
+        for stage in STAGES:
+            hist = method[stage]
+            line += f" {hist['p50_ms']:>8.2f} ms {hist['p95_ms']:>8.2f} ms"
+        print(line)
+
+
+@click.group()
+def main():
+    """🌼 DaisyChain host tools"""
+
+
+@main.command()
+@click.option("--json", "as_json", is_flag=True, default=False, help="Dump raw JSON")
+@click.option("--top", type=int, default=25, help="Number of methods to list")
+def stats(as_json: bool, top: int):
+    from daisychain.remote import rpc_stats
+
+    """Show the host's call counts, latencies and sizes"""
+    snapshot = rpc_stats()
+
+    if as_json:
+        print(json.dumps(snapshot, indent=2))
+    else:
+        print_stats(snapshot, top)
+
+
+@main.command("fake-host")
+@click.option("--clips", default=1_000, help="Clips in the synthetic project")
+@click.option("--bin-depth", default=2, help="Depth of the bin tree")
+@click.option("--timeline-items", default=500, help="Items on the timeline")
+@click.option("--media-dir", type=click.Path(file_okay=False), default=None)
+@click.option("--latency", default=0.0, help="Seconds per Resolve API call")
+@click.option("--interval", type=int, default=None, help="Host timer (ms)")
+@click.option(
+    "--host-script",
+    type=click.Path(dir_okay=False, exists=True),
+    default=None,
+    help="DaisyChain.py to run (default: the `host_script` setting, else the repo's)",
+)
+def fake_host(
+    clips: int,
+    bin_depth: int,
+    timeline_items: int,
+    media_dir: Optional[str],
+    latency: float,
+    interval: Optional[int],
+    host_script: Optional[str],
+):
+    """Run the host against a fake Resolve, until interrupted"""
+    from daisychain.fake import generate_project, run_host
+
+    resolve = generate_project(
+        clips=clips,
+        bin_depth=bin_depth,
+        timeline_items=timeline_items,
+        media_dir=media_dir,
+        latency=latency,
+    )
+
+    with run_host(resolve, host_script, interval_ms=interval) as host:
+        print(f"🌼 Fake host serving {clips:,} clips, ctrl-c to stop")
+        try:
+            while host.thread.is_alive():
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+
+
+@main.command()
+@click.option(
+    "--profile",
+    default="wifi",
+    help="Network to simulate (loopback, lan, wifi, ...)",
+)
+@click.option("--port", default=65433, help="Port for clients to connect to")
+@click.option("--host-port", default=65432, help="Port of the host")
+def netsim(profile: str, port: int, host_port: int):
+    """Simulate a network between clients and the host, until interrupted"""
+    # (with asyncio, only for the subcommands which need them)
+    from daisychain.netsim import NetworkSimulator, PROFILES
+
+    if profile not in PROFILES:
+        raise click.BadParameter(
+            f"not one of {', '.join(PROFILES)}", param_hint="--profile"
+        )
+    simulator = NetworkSimulator(
+        PROFILES[profile],
+        target=("127.0.0.1", host_port),
+        listen=("127.0.0.1", port),
+    )
+    with simulator:
+        print(f"📶 Simulating {profile}: {PROFILES[profile]}")
+        print(f"   run clients with DAISYCHAIN_PORT={simulator.port}, ctrl-c to stop")
+        try:
+            while simulator.thread.is_alive():
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+
+
+@main.command()
+@click.option(
+    "--ttl",
+    type=float,
+    default=None,
+    help="Seconds to serve cached replies for (default: agent_ttl)",
+)
+@click.option(
+    "--connections",
+    type=int,
+    default=None,
+    help="Connections to the host (default: agent_connections)",
+)
+def agent(ttl: Optional[float], connections: Optional[int]):
+    """Answer local clients for the host from one warm connection, until interrupted"""
+    from daisychain.agent import Agent, TTL, CONNECTIONS
+
+    ttl = TTL if ttl is None else ttl
+    connections = CONNECTIONS if connections is None else connections
+    try:
+        with Agent(ttl=ttl, connections=connections) as running:
+            print(f"🌼 Agent listening on {running.path}, ctrl-c to stop")
+            try:
+                while running.thread.is_alive():
+                    time.sleep(0.5)
+            except KeyboardInterrupt:
+                pass
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    stats = running.stats
+    print(
+        f"🌼 Answered {stats['requests']:,} requests from {stats['clients']:,} clients,"
+        f" {stats['cached']:,} from the cache"
+    )
+
+
+@main.command()
+@click.argument("log", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--pace",
+    type=click.Choice(["full", "recorded"]),
+    default="full",
+    help="Reply (and drive requests) at full speed, or as recorded",
+)
+@click.option(
+    "--serve",
+    is_flag=True,
+    default=False,
+    help="Only stand in for the host (on --port) until interrupted",
+)
+@click.option("--port", default=0, help="Port to serve on (default: any)")
+def replay(log: str, pace: str, serve: bool, port: int):
+    """Replay a recorded session without Resolve"""
+    from daisychain.replay import ReplayHost, drive
+    from daisychain import remote
+
+    with ReplayHost(log, pace=pace, listen=("127.0.0.1", port)) as host:
+        if serve:
+            print(f"📼 Replaying {log}, run clients with DAISYCHAIN_PORT={host.port}")
+            try:
+                while host.thread.is_alive():
+                    time.sleep(0.5)
+            except KeyboardInterrupt:
+                pass
+            return
+
+        remote.PORT, remote.AGENT = host.port, None
+        result = drive(log, pace=pace)
+
+    print(
+        f"📼 Replayed {result['requests']:,} requests ({result['errors']} errors)\n"
+        f"   wall      {result['wall_s']:.3f}s (recorded {result['recorded_wall_s']:.3f}s)\n"
+        f"   requests  {result['request_s']:.3f}s"
+        f" (recorded {result['recorded_request_s']:.3f}s)"
+    )
@@ -1,78 +1,723 @@
-from typing import Callable
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
 
 import click
 from daisychain import get_resolve
-from daisychain.resolve import MediaPoolFolder
+from daisychain.fingerprint import folder_contents
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from collections import Counter, defaultdict, deque
 from pathlib import Path
+import hashlib
 import shutil
+import errno
+import sys
+import json
+import time
+import os
 
+if TYPE_CHECKING:
+    from daisychain.resolve import (
+        MediaPool,
+        MediaPoolFolder,
+        MediaPoolItem,
+        Project,
+        Timeline,
+    )
 
-def file_action(src_file: Path, dst_file: Path, action="copy"):
+MANIFEST = ".collate-manifest.jsonl"
+
+
+class Job:
+    """Copy (or move) `src` to `dst`, then relink the `clips` using it"""
+
+    __slots__ = ("src", "dst", "size", "volume", "clips")
+
+    def __init__(self, src: Path, dst: Path, size: int, volume: int):
+        self.src = src
+        self.dst = dst
+        self.size = size
+        self.volume = volume  # the device `src` is on
+        self.clips: List["MediaPoolItem"] = []
+
+
+# the action to take with each file, and how (for `--action copy`) to copy
+ACTIONS = ("copy", "move", "hardlink", "reflink")
+CHUNK = 8 * 1024 * 1024  # bytes per read / kernel copy / checksum update
+
+FICLONE = 0x40049409  # from linux/fs.h, which btrfs, xfs & co. support
+# errors meaning "not here", not "this file": try the next way of copying
+UNSUPPORTED = {
+    errno.EXDEV,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTTY,
+}
+# (way of copying, source device, destination device)s which don't work
+unsupported: Set[Tuple[str, int, int]] = set()
+
+
+class ChecksumMismatch(OSError):
+    pass
+
+
+def reflink(src_file: Path, dst_file: Path):
+    """Share `src_file`'s blocks with `dst_file`, copy-on-write"""
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        raise OSError(errno.ENOTSUP, "No reflinks here")
+    with open(src_file, "rb") as src, open(dst_file, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def copy_range(src_file: Path, dst_file: Path):
+    """Copy in the kernel (or the filesystem, or the NAS) with copy_file_range"""
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "No copy_file_range here")
+    with open(src_file, "rb") as src, open(dst_file, "wb") as dst:
+        while os.copy_file_range(src.fileno(), dst.fileno(), CHUNK):
+            pass
+
+
+def send_file(src_file: Path, dst_file: Path):
+    """Copy in the kernel with sendfile, which takes files on Linux only"""
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.ENOSYS, "No sendfile between files here")
+    with open(src_file, "rb") as src, open(dst_file, "wb") as dst:
+        offset = 0
+        while True:
+            sent = os.sendfile(dst.fileno(), src.fileno(), offset, CHUNK)
+            if not sent:
+                break
+            offset += sent
+
+
+def copy_bytes(src_file: Path, dst_file: Path):
+    shutil.copyfile(src_file, dst_file)
+
+
+# fastest first, for `--action copy`
+COPIES: Dict[str, Callable[[Path, Path], None]] = {
+    "reflink": reflink,
+    "copy_file_range": copy_range,
+    "sendfile": send_file,
+    "copy": copy_bytes,
+}
+
+
+def copy_file(src_file: Path, dst_file: Path, ways: Tuple[str, ...]) -> str:
+    """
+    Copy `src_file` to `dst_file` by the first of `ways` that works
+    between their devices, and return which
+    """
+    devices = (src_file.stat().st_dev, dst_file.parent.stat().st_dev)
+    for way in ways:
+        if (way, *devices) in unsupported:
+            continue
+        if way == "reflink" and devices[0] != devices[1]:
+            continue
+        try:
+            COPIES[way](src_file, dst_file)
+            return way
+        except OSError as e:
+            if e.errno not in UNSUPPORTED or way == ways[-1]:
+                raise
+            unsupported.add((way, *devices))
+    raise OSError(errno.ENOTSUP, f"Can't {'/'.join(ways)} {src_file} to here")
+
+
+def copy_hashed(src_file: Path, dst_file: Path) -> str:
+    """
+    Copy `src_file` to `dst_file` through Python, checksumming it as it's
+    read (so it's read once), and return the checksum once it's on disk
+    """
+    src_hash = hashlib.blake2b(digest_size=16)
+    with open(src_file, "rb") as src, open(dst_file, "wb") as dst:
+        while True:
+            chunk = src.read(CHUNK)
+            if not chunk:
+                break
+            src_hash.update(chunk)
+            dst.write(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    return src_hash.hexdigest()
+
+
+def checksum(path: Path) -> str:
+    """Checksum the file at `path`, as it is on disk"""
+    file_hash = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as chunks:
+        if hasattr(os, "posix_fadvise"):
+            # so what was written is read back from the disk, not from memory
+            os.posix_fadvise(chunks.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        while True:
+            chunk = chunks.read(CHUNK)
+            if not chunk:
+                break
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def verify(src_file: Path, dst_file: Path, src_checksum: str) -> str:
+    """The checksum of `dst_file`, if it's that of `src_file`, `src_checksum`"""
+    if checksum(dst_file) != src_checksum:
+        raise ChecksumMismatch(errno.EIO, f"The copy of {src_file} differs from it")
+    return src_checksum
+
+
+def file_action(
+    src_file: Path, dst_file: Path, action="copy", check: bool = False
+) -> Tuple[str, Optional[str]]:
+    """
+    Copy, move, hardlink or reflink `src_file` to `dst_file`, verifying
+    the copy if `check`; returns how, and the checksum (if checked)
+    """
     src_file = src_file.absolute()
     dst_file = dst_file.absolute()
 
-    print("...", src_file, dst_file)
-
-    if src_file == dst_file:
-        return
+    if src_file == dst_file or dst_file.exists() and dst_file.samefile(src_file):
+        return "none", None  # already been moved (or linked)
 
-    if action == "copy":
+    dst_file.parent.mkdir(parents=True, exist_ok=True)
+    if action == "move":
         try:
-            shutil.copyfile(src_file, dst_file)
-        except shutil.SameFileError:
-            pass  # already been moved
-    elif action == "move":
+            os.replace(src_file, dst_file)
+            return "rename", None
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        # to another volume, so copying and then deleting
+        how, copied = file_action(src_file, dst_file, "copy", check)
+        os.remove(src_file)
+        return how, copied
+
+    # into place only once it's whole, so an interrupted copy is redone
+    part = dst_file.with_name(f"{dst_file.name}.part")
+    try:
+        os.remove(part)
+    except FileNotFoundError:
+        pass
+    if action == "hardlink":
         try:
-            shutil.move(src_file, dst_file)
-        except shutil.SameFileError:
-            pass  # already been moved
+            os.link(src_file, part)
+            os.replace(part, dst_file)
+            return "hardlink", None  # the same file, so nothing to verify
+        except OSError as e:
+            if e.errno not in UNSUPPORTED and e.errno != errno.EPERM:
+                raise
+            action = "copy"  # to another volume
+    src_checksum = None
+    if action == "reflink":
+        how = copy_file(src_file, part, ("reflink",))
+        if check:
+            # nothing went through Python to be checksummed on the way
+            src_checksum = checksum(src_file)
+    elif action == "copy" and check:
+        # read once to copy and checksum it, rather than once for each
+        how, src_checksum = "copy", copy_hashed(src_file, part)
+    elif action == "copy":
+        how = copy_file(src_file, part, tuple(COPIES))
     else:
         raise NotImplementedError
 
+    try:
+        copied = verify(src_file, part, src_checksum) if check else None
+    except ChecksumMismatch:
+        os.remove(part)
+        raise
+    shutil.copystat(src_file, part)
+    os.replace(part, dst_file)
+    return how, copied
+
+
+class Manifest:
+    """
+    What's been done, appended to a file as it's done, so that an
+    interrupted collate picks up where it stopped
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done: Dict[Tuple[str, str], str] = {}  # (src, dst): state
+        if path.exists():
+            with open(path) as manifest_file:
+                for line in manifest_file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # the last line, if we stopped mid-write
+                    self.done[(record["src"], record["dst"])] = record["state"]
+        self.file = open(path, "a", buffering=1)
+
+    def state(self, job: Job) -> Optional[str]:
+        """`"copied"` or `"relinked"`, if `job` was (and its file is still there)"""
+        if job.src == job.dst:
+            return "relinked"  # the clips use the collated file already
+        state = self.done.get((str(job.src), str(job.dst)))
+        if state is not None:
+            try:
+                if job.dst.stat().st_size == job.size:
+                    return state
+            except OSError:
+                pass
+            return None  # since deleted (or cut short), so again
+
+        # done before there was a manifest, or since it was lost
+        try:
+            src, dst = job.src.stat(), job.dst.stat()
+        except OSError:
+            return None
+        same = (dst.st_size, dst.st_mtime_ns) == (src.st_size, src.st_mtime_ns)
+        return "copied" if same else None
+
+    def record(self, job: Job, state: str, **details):
+        """Note `job` is `state`, with `details` (like how, and its checksum)"""
+        self.done[(str(job.src), str(job.dst))] = state
+        record = {"src": str(job.src), "dst": str(job.dst), "size": job.size}
+        self.file.write(json.dumps({**record, "state": state, **details}) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+def add_jobs(
+    into: Path,
+    placed: List[Tuple[Path, "MediaPoolItem"]],
+    jobs: Dict[Path, Job],
+    taken: Dict[Path, Path],
+):
+    """
+    Add to `jobs` (by source) the files of the clips `placed` in folders
+    under `into`, each file going where its first clip is placed
+    """
+    from daisychain import remote
 
-def walk_down(root: MediaPoolFolder, path: list[str], action: str):
-    into_path = Path("/".join(path))
-    into_path.mkdir(exist_ok=True)
+    clips = [clip for _, clip in placed]
+    paths = remote.batch_each(clips, [("GetClipProperty", "File Path")])
+    for (folder, clip), (file_path,) in zip(placed, paths):
+        if isinstance(file_path, remote.RPCError) or not file_path:
+            continue  # not a media file (timelines, generators, ...)
+        src = Path(file_path).absolute()
+        job = jobs.get(src)
+        if job is None:
+            dst = into / folder / src.name
+            if taken.get(dst, src) != src:
+                print(f"❌ Skipping {src}, {taken[dst]} is going to {dst}")
+                continue
+            try:
+                stat = src.stat()
+            except OSError:
+                try:
+                    stat = dst.stat()  # moved, but not relinked yet
+                except OSError:
+                    continue  # offline
+            job = jobs[src] = Job(src, dst, stat.st_size, stat.st_dev)
+            taken[dst] = src
+        job.clips.append(clip)
 
-    # Collect the clips in the folder
-    for clip in root.get_clip_list():
-        file_path = clip.get_clip_property("File Path")  # "clipPath" ???
-        assert isinstance(file_path, str)
-        file_path = Path(file_path)
-        if file_path.exists() == False or file_path.is_file() == False:
-            print("... Not a media file")
+
+def plan(root: "MediaPoolFolder", into: Path) -> List[Job]:
+    """
+    Every file to collate from the bins under `root` into `into`, a
+    level of bins at a time (in a few requests each)
+    """
+    from daisychain import remote
+
+    jobs: Dict[Path, Job] = {}  # by source, which many clips may use
+    taken: Dict[Path, Path] = {}  # destination: source
+    folders = [(Path(), root)]
+    while folders:
+        found = folder_contents([f for _, f in folders])
+        bin_clips = [
+            (bin_path, clip)
+            for (bin_path, _), (clips, _) in zip(folders, found)
+            for clip in clips
+        ]
+        add_jobs(into, bin_clips, jobs, taken)
+
+        subs = [
+            (bin_path, sub)
+            for (bin_path, _), (_, bins) in zip(folders, found)
+            for sub in bins
+        ]
+        names = remote.batch_each([sub for _, sub in subs], ["GetName"])
+        folders = [
+            (bin_path / name, sub)
+            for (bin_path, sub), (name,) in zip(subs, names)
+            if isinstance(name, str)
+        ]
+    return list(jobs.values())
+
+
+def sections(timeline: "Timeline", color: Optional[str]) -> List[Tuple[int, Path]]:
+    """
+    The frames at which each section of `timeline` starts, with its
+    folder, named after the markers of `color`
+    """
+    starts = [(-1, Path())]  # before the first marker
+    if color is None:
+        return starts
+    from daisychain import remote
+
+    start_frame, markers = remote.batch(timeline, ["GetStartFrame", "GetMarkers"])
+    if isinstance(markers, remote.RPCError):
+        raise markers
+    # frames come over the wire as json keys, so as strings
+    markers = {int(frame): marker for frame, marker in markers.items()}
+    for frame, marker in sorted(markers.items()):
+        if marker["color"].lower() != color.lower():
             continue
-        else:
-            print(f"... Is a media file: {file_path}")
-        into_file = into_path / file_path.name
-        print(
-            f"Relink and {action}\n"
-            f"    {clip.get_name()}\n"
-            f"    {file_path}\n"
-            f"    {file_path.absolute()}\n"
-            f"    {into_file.absolute()}"
-        )
-        file_action(file_path, into_file, action)
-        clip.replace_clip(str(into_file.absolute()))
-
-    # Recurse into sub-folders
-    for fold in root.get_subfolder_list():
-        walk_down(fold, path + [fold.get_name()], action)
+        name = marker["name"] or f"Section {len(starts)}"
+        starts.append((start_frame + frame, Path(name.replace(os.sep, "-"))))
+    return starts
+
+
+def plan_timeline(
+    timeline: "Timeline", into: Path, color: Optional[str] = None
+) -> List[Job]:
+    """
+    Every file used on `timeline` (on any video or audio track) to
+    collate into `into`, in folders named after its markers of `color`,
+    by where each clip is first used
+
+    The timeline is read in a few batches (its tracks, their items, then
+    every item's clip and start), however many items it has
+    """
+    from daisychain.resolve import MediaPoolItem, TimelineItem
+    from daisychain import remote
+
+    def values(found: list) -> list:
+        for value in found:
+            if isinstance(value, remote.RPCError):
+                raise value
+        return found
+
+    types = ("video", "audio")
+    counts = values(remote.batch(timeline, [("GetTrackCount", t) for t in types]))
+    tracks = [(t, i) for t, n in zip(types, counts) for i in range(1, n + 1)]
+    listed = values(
+        remote.batch(timeline, [("GetItemListInTrack", *track) for track in tracks])
+    )
+    items = [TimelineItem(ref) for track in listed for ref in track or []]
+    found = remote.batch_each(items, ["GetMediaPoolItem", "GetStart"])
+    starts = sections(timeline, color)
+
+    used: Dict[Any, Tuple[int, "MediaPoolItem"]] = {}
+    for ref, frame in found:
+        if not isinstance(ref, dict) or isinstance(frame, remote.RPCError):
+            continue  # generators, titles, compound clips, ...
+        clip = MediaPoolItem(ref)
+        # handles are only the same clip's within an epoch
+        key = clip.unique_id or (clip.epoch, clip.handle)
+        if key not in used or frame < used[key][0]:
+            used[key] = (frame, clip)
+    print(f"> {len(used)} clips used by {len(items)} timeline items")
+
+    placed = []
+    for frame, clip in sorted(used.values(), key=lambda use: use[0]):
+        section = [folder for start, folder in starts if start <= frame][-1]
+        placed.append((section, clip))
+    jobs: Dict[Path, Job] = {}
+    add_jobs(into, placed, jobs, {})
+    return list(jobs.values())
+
+
+def volume_limits(volumes: Tuple[str, ...]) -> Dict[int, int]:
+    """`--volume /Volumes/RAID=8`s, as copies at once by device"""
+    limits = {}
+    for volume in volumes:
+        path, _, limit = volume.rpartition("=")
+        limits[os.stat(path).st_dev] = int(limit)
+    return limits
+
+
+class Volumes:
+    """
+    Jobs queued by the volume they read from, started while that volume
+    has fewer than `limits[volume]` (else `per_volume`) copies running
+    """
+
+    def __init__(self, jobs: List[Job], limits: Dict[int, int], per_volume: int):
+        self.limits = limits
+        self.per_volume = per_volume
+        self.queues: Dict[int, deque] = defaultdict(deque)
+        for job in jobs:
+            self.queues[job.volume].append(job)
+        self.running: Dict[int, int] = defaultdict(int)
+
+    def __bool__(self) -> bool:
+        return any(self.queues.values())
+
+    def ready(self, most: int) -> List[Job]:
+        """Up to `most` jobs to start now, taking turns between volumes"""
+        jobs = []
+        while len(jobs) < most:
+            started = len(jobs)
+            for volume, queue in self.queues.items():
+                limit = self.limits.get(volume, self.per_volume)
+                if queue and self.running[volume] < limit and len(jobs) < most:
+                    self.running[volume] += 1
+                    jobs.append(queue.popleft())
+            if len(jobs) == started:
+                break  # every volume is busy (or done)
+        return jobs
+
+    def finished(self, job: Job):
+        self.running[job.volume] -= 1
+
+
+class Relinks:
+    """
+    Copied files waiting for the rest of their folder, so that their
+    clips are relinked with one `relink_clips` per folder (not one
+    `replace_clip` per clip), noting them relinked in `manifest`
+    """
+
+    def __init__(
+        self,
+        media_pool: Optional["MediaPool"],
+        manifest: "Manifest",
+        todo: List[Job],
+        copied: List[Job],
+    ):
+        self.media_pool = media_pool
+        self.manifest = manifest
+        self.remaining = Counter(job.dst.parent for job in todo)
+        self.copied: Dict[Path, List[Job]] = defaultdict(list)
+        self.calls = self.clips = 0
+        for job in copied:  # but not relinked, before we were interrupted
+            self.copied[job.dst.parent].append(job)
+        for folder in list(self.copied):
+            if not self.remaining[folder]:
+                self.relink(folder)
+
+    def finished(self, job: Job, copied: bool = True):
+        folder = job.dst.parent
+        if copied:
+            self.copied[folder].append(job)
+        self.remaining[folder] -= 1
+        if not self.remaining[folder] and self.copied[folder]:
+            self.relink(folder)
+
+    def relink(self, folder: Path):
+        jobs = self.copied.pop(folder)
+        clips = [clip for job in jobs for clip in job.clips]
+        relinked = []
+        if self.media_pool is not None:
+            self.calls += 1
+            if self.media_pool.relink_clips(clips, str(folder.absolute())):
+                relinked = jobs
+        if not relinked:
+            # one by one, eg. for clips whose names aren't their files'
+            self.calls += len(clips)
+            relinked = [
+                job
+                for job in jobs
+                if all(clip.replace_clip(str(job.dst.absolute())) for clip in job.clips)
+            ]
+        for job in relinked:
+            self.manifest.record(job, "relinked")
+            self.clips += len(job.clips)
+
+
+def collate(
+    root: "MediaPoolFolder",
+    into: Path,
+    action: str = "copy",
+    workers: int = 16,
+    per_volume: int = 4,
+    limits: Optional[Dict[int, int]] = None,
+    manifest_path: Optional[Path] = None,
+    check: bool = False,
+    media_pool: Optional["MediaPool"] = None,
+    timeline: Optional["Timeline"] = None,
+    color: Optional[str] = None,
+) -> int:
+    """
+    Copy (or move, hardlink, reflink) the media of every clip under `root`
+    into `into`, mirroring the bins (or only that used by `timeline`, in
+    sections by its markers of `color`), and relink the clips to their new
+    files; on `workers` threads, with at most `per_volume` (or
+    `limits[device]`) copies reading from each source volume at once,
+    verifying each copy if `check`. The clips of each folder are relinked
+    together (by `media_pool`, else one by one) once its copies are done.
+    Returns how many files failed
+    """
+    into.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    if timeline is not None:
+        jobs = plan_timeline(timeline, into, color)
+    else:
+        jobs = plan(root, into)
+    total = sum(job.size for job in jobs)
+    print(
+        f"> {len(jobs)} files ({total / 1e9:,.2f} GB) to {action},"
+        f" planned in {time.perf_counter() - start:.1f}s"
+    )
+
+    manifest = Manifest(manifest_path or into / MANIFEST)
+    todo: List[Job] = []
+    unlinked: List[Job] = []
+    for job in jobs:
+        state = manifest.state(job)
+        if state is None:
+            todo.append(job)
+        elif state == "copied":
+            unlinked.append(job)
+    done = len(jobs) - len(todo)
+    if done:
+        print(f"> Resuming, {done} files were done already")
+    relinks = Relinks(media_pool, manifest, todo, unlinked)
+
+    volumes = Volumes(todo, limits or {}, per_volume)
+    running: Dict[Future, Job] = {}
+    failed = copied = 0
+    ways: Dict[str, int] = defaultdict(int)  # files by how they were copied
+    start = last = time.perf_counter()
+    pool = ThreadPoolExecutor(workers, "collate")
+    try:
+        while volumes or running:
+            for job in volumes.ready(workers - len(running)):
+                future = pool.submit(file_action, job.src, job.dst, action, check)
+                running[future] = job
+            finished, _ = wait(running, timeout=1, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = running.pop(future)
+                volumes.finished(job)
+                try:
+                    how, checksum = future.result()
+                except OSError as e:
+                    failed += 1
+                    print(f"❌ {job.src}: {e}")
+                    relinks.finished(job, copied=False)
+                    continue
+                done += 1
+                copied += job.size
+                ways[how] += 1
+                details = {"how": how}
+                if checksum is not None:
+                    details["checksum"] = checksum
+                manifest.record(job, "copied", **details)
+                # the clips are relinked here, one thread talking to Resolve
+                relinks.finished(job)
+
+            now = time.perf_counter()
+            if now - last > 5 or not running:
+                last = now
+                print(
+                    f"> {done}/{len(jobs)} files, {copied / 1e9:,.2f} GB"
+                    f" at {copied / 1e6 / (now - start):,.0f} MB/s"
+                )
+    finally:
+        # if interrupted, without starting what's queued
+        pool.shutdown(cancel_futures=True)
+        manifest.close()
+
+    print(f"✅ {done}/{len(jobs)} files collated into {into}, {failed} failed")
+    if ways:
+        print("> " + ", ".join(f"{n} by {how}" for how, n in sorted(ways.items())))
+    if relinks.calls:
+        print(f"> {relinks.clips} clips relinked in {relinks.calls} calls")
+    return failed
+
+
+def find_timeline(project: "Project", name: str) -> Optional["Timeline"]:
+    """The project's timeline called `name`, looking at them all in a few requests"""
+    from daisychain.resolve import Timeline
+    from daisychain import remote
+
+    count = project.get_timeline_count()
+    found = remote.batch(
+        project, [("GetTimelineByIndex", i) for i in range(1, count + 1)]
+    )
+    timelines = [Timeline(ref) for ref in found if isinstance(ref, dict)]
+    names = remote.batch_each(timelines, ["GetName"])
+    return next((t for t, (n,) in zip(timelines, names) if n == name), None)
 
 
 @click.command()
-@click.option("-a", "--action", default="copy")
+@click.option("-a", "--action", type=click.Choice(ACTIONS), default="copy")
 @click.option(
     "-d", "--dst", type=click.Path(exists=True, file_okay=False), default=Path("./")
 )
-def main(action: str, dst):
+@click.option("--workers", default=16, help="Files to copy at once, at most")
+@click.option("--per-volume", default=4, help="Files to copy from one volume at once")
+@click.option(
+    "--volume",
+    "volumes",
+    multiple=True,
+    metavar="PATH=N",
+    help="Files to copy at once from the volume PATH is on (eg. a RAID)",
+)
+@click.option(
+    "--manifest",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help=f"What's been done, to resume from [default: DST/{MANIFEST}]",
+)
+@click.option("--verify", is_flag=True, help="Checksum each copy against its source")
+@click.option(
+    "-t",
+    "--timeline",
+    "timeline_name",
+    default=None,
+    metavar="NAME",
+    help="Collate only the media used on this timeline, not the current bin's",
+)
+@click.option(
+    "-m",
+    "--markers",
+    "color",
+    default=None,
+    metavar="COLOR",
+    help="Sections of the timeline, by its markers of this color, into folders",
+)
+def main(
+    action: str,
+    dst,
+    workers: int,
+    per_volume: int,
+    volumes,
+    manifest,
+    verify: bool,
+    timeline_name: Optional[str],
+    color: Optional[str],
+):
+    """
+    Collate the media of the current bin (and its bins), or of a timeline,
+    into DST, resuming where an interrupted run stopped. Copies are
+    reflinked where the filesystem can, else copied by the kernel
+    (copy_file_range, sendfile)
+    """
     resolve = get_resolve()
-    media_pool = resolve.get_project_manager().get_current_project().get_media_pool()
-    # TODO
-    # implement a "timeline" focus, and allow subfolders for clips to be defined
-    # by a timeline markers of a specified color that denote the start of a 'section'
+    project = resolve.get_project_manager().get_current_project()
+    media_pool = project.get_media_pool()
     current_bin = media_pool.get_current_folder()
-    walk_down(current_bin, [str(dst.absolute())], action)
+    timeline = None
+    if timeline_name is not None:
+        timeline = find_timeline(project, timeline_name)
+        if timeline is None:
+            raise click.BadParameter(
+                f"No timeline called {timeline_name!r}", param_hint="--timeline"
+            )
+    failed = collate(
+        current_bin,
+        Path(dst).absolute(),
+        action,
+        workers,
+        per_volume,
+        volume_limits(volumes),
+        Path(manifest) if manifest else None,
+        verify,
+        media_pool,
+        timeline,
+        color,
+    )
+    if failed:
+        sys.exit(1)
 
 
-main()
+if __name__ == "__main__":
+    main()
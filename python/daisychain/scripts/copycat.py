@@ -4,16 +4,80 @@
     field says on the current TimelineItem
     (and its MediaPoolItem) to the Clipboard!
 
+It only asks about the item when the playhead has moved onto another
+one, and hosts which can watch (see `daisychain.remote.watch`) say when
+that is, so parked on one clip it costs next to nothing.
+
 Requires:
 `pip install pyperclip`
 
 """
 
 from daisychain import get_resolve
+from typing import TYPE_CHECKING, Iterator, Optional
 from time import sleep
-import pyperclip
 import click
 
+if TYPE_CHECKING:
+    from daisychain.resolve import Project
+
+# the unique id of the video item under the playhead, as the host finds it
+CURRENT_ITEM = ["GetCurrentTimeline", "GetCurrentVideoItem", "GetUniqueId"]
+
+
+def watched_items(project: "Project", interval: float) -> Iterator[Optional[str]]:
+    """
+    The unique id of the video item under the playhead (None between
+    items) each time it changes, at most every `interval` seconds: told
+    by the host (which looks every `interval`), or if it can't watch, by
+    asking it every `interval`
+    """
+    from daisychain import remote
+
+    try:
+        item_id = remote.watch(project, CURRENT_ITEM, timeout=0)
+    except remote.RPCError as e:
+        if "daisychain_watch" not in str(e):
+            raise
+        yield from polled_items(project, interval)
+        return
+
+    yield item_id
+    while True:
+        sleep(interval)
+        try:
+            changed = remote.watch(project, CURRENT_ITEM, item_id, every=interval)
+        except remote.RPCTimeout:
+            continue  # Resolve is busy (rendering?), so again
+        if changed != item_id:
+            item_id = changed
+            yield item_id
+
+
+def polled_items(project: "Project", interval: float) -> Iterator[Optional[str]]:
+    """
+    The unique id of the video item under the playhead each time it
+    changes, asking for the playhead every `interval` seconds, and for
+    the item only when the playhead has moved
+    """
+    playhead = item_id = None
+    first = True
+    while True:
+        timeline = project.get_current_timeline()
+        moved = None
+        if timeline is not None:
+            moved = (timeline.handle, timeline.get_current_timecode())
+
+        if moved != playhead or first:
+            playhead = moved
+            item = timeline.get_current_video_item() if timeline else None
+            changed = item.get_unique_id() if item is not None else None
+            if changed != item_id or first:
+                item_id, first = changed, False
+                yield item_id
+
+        sleep(interval)
+
 
 @click.command()
 @click.option(
@@ -23,19 +87,22 @@ import click
     help="Seconds between copying to clipboard",
 )
 def main(interval: float = 1.0):
+    import pyperclip
+
     resolve = get_resolve()
     proj = resolve.get_project_manager().get_current_project()
 
     copy_field = "Comments"
-    copy_intvl = interval
+    copied = None
 
     print("🐈 Copy Cat is watching!")
 
-    while True:
-        timeline = proj.get_current_timeline()
-        item_clip = timeline.get_current_video_item()
+    for item_id in watched_items(proj, interval):
+        if item_id is None:
+            continue  # between items, see #5
 
-        # TODO: error occurs if item_clip is None, see #5
+        timeline = proj.get_current_timeline()
+        item_clip = timeline.get_current_video_item() if timeline else None
 
         if item_clip is not None:
             item_in_pool = item_clip.get_media_pool_item()
@@ -44,10 +111,10 @@ def main(interval: float = 1.0):
                 # get the clip property from the media pool item
                 value = item_in_pool.get_clip_property(copy_field)
 
-                if value != "":
+                # only when it's changed, the clipboard is slow to write
+                if value != "" and value != copied:
                     pyperclip.copy(value)
+                    copied = value
                     print(f"🐈 MEOW `{value}`")
 
         # TODO: pause mechanism (perhaps a TUI?)
-
-        sleep(copy_intvl)
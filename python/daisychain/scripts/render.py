@@ -0,0 +1,401 @@
+"""
+
+🎬 Render queues deliverables for many timelines (or, by their
+    markers, for many ranges of them), starts them and shows
+    their progress as they render
+
+```
+render "Reel 1" "Reel 2" --preset "H.264 Master" -d /Volumes/Deliverables
+render --all --markers Blue --set ExportAlpha=true
+```
+
+Every job is queued in one request (see `daisychain.remote.batch`), and
+the status of every job comes in one request per poll, polled less
+often while nothing changes (and not much after a job should be done)
+
+"""
+
+from daisychain import get_resolve
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from pathlib import Path
+import click
+import json
+import sys
+import time
+import os
+
+if TYPE_CHECKING:
+    from daisychain.resolve import Project, Timeline
+
+FINISHED = ("Complete", "Failed", "Cancelled")
+BAR = 20  # characters in a progress bar
+
+
+class Deliverable:
+    """A render job to queue: `timeline`, or its frames `mark_in` to `mark_out`"""
+
+    __slots__ = ("name", "timeline", "mark_in", "mark_out", "job_id", "status")
+
+    def __init__(
+        self,
+        name: str,
+        timeline: "Timeline",
+        mark_in: Optional[int] = None,
+        mark_out: Optional[int] = None,
+    ):
+        self.name = name
+        self.timeline = timeline
+        self.mark_in = mark_in
+        self.mark_out = mark_out
+        self.job_id: Optional[str] = None
+        self.status: dict = {}
+
+    @property
+    def state(self) -> str:
+        return self.status.get("JobStatus", "Queued")
+
+    def settings(self, target_dir: str, extra: dict) -> dict:
+        settings = {**extra, "TargetDir": target_dir, "CustomName": self.name}
+        if self.mark_in is None:
+            settings["SelectAllFrames"] = True
+        else:
+            settings.update(
+                SelectAllFrames=False, MarkIn=self.mark_in, MarkOut=self.mark_out
+            )
+        return settings
+
+
+def project_timelines(project: "Project") -> Dict[str, "Timeline"]:
+    """The project's timelines, by name, in a few requests however many"""
+    from daisychain.resolve import Timeline
+    from daisychain import remote
+
+    count = project.get_timeline_count()
+    found = remote.batch(
+        project, [("GetTimelineByIndex", i) for i in range(1, count + 1)]
+    )
+    timelines = [Timeline(ref) for ref in found if isinstance(ref, dict)]
+    names = remote.batch_each(timelines, ["GetName"])
+    return {
+        name: timeline
+        for timeline, (name,) in zip(timelines, names)
+        if isinstance(name, str)
+    }
+
+
+def marked_ranges(
+    chosen: List[Tuple[str, "Timeline"]], color: str
+) -> List[Deliverable]:
+    """
+    A deliverable for each marker of `color` on each of the `chosen`
+    timelines (and their names): its range if it has one, else up to the
+    next (or the end of the timeline), read in one request
+    """
+    from daisychain import remote
+
+    found = remote.batch_each(
+        [timeline for _, timeline in chosen],
+        ["GetStartFrame", "GetEndFrame", "GetMarkers"],
+    )
+    ranges = []
+    for (name, timeline), values in zip(chosen, found):
+        failed = [value for value in values if isinstance(value, remote.RPCError)]
+        if failed:
+            print(f"❌ Couldn't read the markers of {name}: {failed[0]}")
+            continue
+        start, end, markers = values
+        # frames come over the wire as json keys, so as strings
+        marks = sorted(
+            (start + int(frame), marker)
+            for frame, marker in markers.items()
+            if marker["color"].lower() == color.lower()
+        )
+        for n, (mark_in, marker) in enumerate(marks):
+            if marker["duration"] > 1:
+                mark_out = mark_in + marker["duration"] - 1
+            else:
+                mark_out = (marks[n + 1][0] if n + 1 < len(marks) else end) - 1
+            section = marker["name"] or f"Section {n + 1}"
+            ranges.append(
+                Deliverable(f"{name} - {section}", timeline, mark_in, mark_out)
+            )
+    return ranges
+
+
+def queue(
+    project: "Project",
+    deliverables: List[Deliverable],
+    target_dir: str,
+    preset: Optional[str],
+    extra: dict,
+) -> List[Deliverable]:
+    """
+    Add a render job for each of `deliverables`, all in one request,
+    returning those which were queued
+    """
+    from daisychain import remote
+
+    current = project.get_current_timeline()
+    calls = []
+    for deliverable in deliverables:
+        calls.append(("SetCurrentTimeline", deliverable.timeline))
+        if preset is not None:
+            calls.append(("LoadRenderPreset", preset))
+        calls.append(("SetRenderSettings", deliverable.settings(target_dir, extra)))
+        calls.append("AddRenderJob")
+    if current is not None:
+        calls.append(("SetCurrentTimeline", current))  # as it was
+    results = remote.batch(project, calls)
+
+    queued, unwanted = [], []
+    per_job = 4 if preset is not None else 3
+    for n, deliverable in enumerate(deliverables):
+        group = results[n * per_job : (n + 1) * per_job]
+        calls_made = calls[n * per_job : (n + 1) * per_job]
+        # these say they failed by returning False, and AddRenderJob is made
+        # anyway, with the timeline, preset or settings of the job before
+        failed = [
+            (call[0] if isinstance(call, tuple) else call, result)
+            for call, result in zip(calls_made, group)
+            if isinstance(result, remote.RPCError) or not result
+        ]
+        job_id = group[-1]
+        if not failed:
+            deliverable.job_id = job_id
+            queued.append(deliverable)
+            continue
+        impl, result = failed[0]
+        why = f"{impl}: {result}" if result else f"{impl} failed"
+        print(f"❌ Couldn't queue {deliverable.name}, {why}")
+        if not isinstance(job_id, remote.RPCError) and job_id:
+            unwanted.append(("DeleteRenderJob", job_id))
+    if unwanted:
+        remote.batch(project, unwanted)
+    return queued
+
+
+def poll(project: "Project", deliverables: List[Deliverable]) -> bool:
+    """Get the status of every job, in one request; True if any has changed state"""
+    from daisychain import remote
+
+    calls = [("GetRenderJobStatus", deliverable.job_id) for deliverable in deliverables]
+    changed = False
+    for deliverable, status in zip(deliverables, remote.batch(project, calls)):
+        if isinstance(status, Exception) or not status:
+            status = {"JobStatus": "Failed", "Error": str(status or "job is gone")}
+        changed |= status.get("JobStatus") != deliverable.state
+        deliverable.status = status
+    return changed
+
+
+def next_poll(
+    deliverables: List[Deliverable],
+    wait: float,
+    interval: float,
+    most: float,
+    changed: bool,
+) -> float:
+    """
+    Seconds until the next poll: `interval` when jobs have just changed
+    state, else longer and longer (up to `most`), but not much longer
+    than the job rendering now should take to finish
+    """
+    wait = interval if changed else min(wait * 1.5, most)
+    left = [
+        deliverable.status.get("EstimatedTimeRemainingInMs") or 0
+        for deliverable in deliverables
+        if deliverable.state == "Rendering"
+    ]
+    if any(left):
+        wait = min(wait, max(min(ms for ms in left if ms) / 1000, interval))
+    return wait
+
+
+def seconds(ms: Optional[int]) -> str:
+    if not ms:
+        return ""
+    s = int(ms / 1000)
+    return f"{s // 3600}:{s // 60 % 60:02d}:{s % 60:02d}"
+
+
+def rows(deliverables: List[Deliverable]) -> List[str]:
+    width = min(max(len(deliverable.name) for deliverable in deliverables), 40)
+    lines = []
+    for deliverable in deliverables:
+        status = deliverable.status
+        done = float(status.get("CompletionPercentage", 0))
+        bar = "█" * int(BAR * done / 100)
+        took = seconds(status.get("TimeTakenToRenderInMs"))
+        left = seconds(status.get("EstimatedTimeRemainingInMs"))
+        time_text = f"took {took}" if took else f"{left} left" if left else ""
+        lines.append(
+            f"{deliverable.name[:width]:<{width}}  {deliverable.state:<10}"
+            f" {bar:<{BAR}} {done:>3.0f}%  {time_text}"
+        )
+        if status.get("Error"):
+            lines.append(f"{'':<{width}}  ❌ {status['Error']}")
+    return lines
+
+
+class Table:
+    """The progress of every job, redrawn in place on a terminal"""
+
+    def __init__(self, live: bool):
+        self.live = live
+        self.drawn = 0  # lines, to go back up over
+        self.states: Dict[str, str] = {}
+
+    def show(self, deliverables: List[Deliverable]):
+        if self.live:
+            lines = rows(deliverables)
+            up = f"\x1b[{self.drawn}F" if self.drawn else ""
+            print(up + "\n".join(f"{line}\x1b[K" for line in lines), flush=True)
+            self.drawn = len(lines)
+            return
+        # else (piped to a log, say) a line for each job as it changes state
+        for deliverable, line in zip(deliverables, rows(deliverables)):
+            if self.states.get(deliverable.job_id) != deliverable.state:
+                self.states[deliverable.job_id] = deliverable.state
+                print(line, flush=True)
+
+
+def monitor(
+    project: "Project",
+    deliverables: List[Deliverable],
+    interval: float,
+    most: float,
+    table: Table,
+) -> int:
+    """Show `deliverables` render, returning how many didn't complete"""
+    from daisychain import remote
+
+    wait = interval
+    while True:
+        try:
+            changed = poll(project, deliverables)
+        except remote.RPCError:
+            # Resolve is slow to answer while it renders (or the breaker
+            # is open, or it restarted), so less often, rather than give up
+            wait = min(wait * 2, most)
+            time.sleep(wait)
+            continue
+        table.show(deliverables)
+        if all(deliverable.state in FINISHED for deliverable in deliverables):
+            break
+        wait = next_poll(deliverables, wait, interval, most, changed)
+        time.sleep(wait)
+    return sum(deliverable.state != "Complete" for deliverable in deliverables)
+
+
+def render_setting(value: str) -> Tuple[str, object]:
+    """`KEY=VALUE`, with VALUE as json if it is (eg. `true`, `1920`)"""
+    key, _, text = value.partition("=")
+    try:
+        return key, json.loads(text)
+    except json.JSONDecodeError:
+        return key, text
+
+
+@click.command()
+@click.argument("timelines", nargs=-1)
+@click.option("-a", "--all", "every", is_flag=True, help="Every timeline")
+@click.option("-p", "--preset", default=None, help="Render preset to load")
+@click.option(
+    "-d",
+    "--dst",
+    type=click.Path(file_okay=False),
+    default=Path("./"),
+    help="Where to render to",
+)
+@click.option(
+    "-m",
+    "--markers",
+    "color",
+    default=None,
+    metavar="COLOR",
+    help="Render the ranges of the markers of this color, each on its own",
+)
+@click.option(
+    "-s",
+    "--set",
+    "settings",
+    multiple=True,
+    metavar="KEY=VALUE",
+    help="Render settings, eg. ExportAlpha=true",
+)
+@click.option("--start/--no-start", default=True, help="Start rendering the jobs")
+@click.option("--interval", default=1.0, help="Seconds between polls, at least")
+@click.option("--max-interval", default=15.0, help="Seconds between polls, at most")
+def main(
+    timelines: Tuple[str, ...],
+    every: bool,
+    preset: Optional[str],
+    dst,
+    color: Optional[str],
+    settings: Tuple[str, ...],
+    start: bool,
+    interval: float,
+    max_interval: float,
+):
+    """
+    Render TIMELINES (by name, else the current timeline) and show their
+    progress; exits non-zero if any job doesn't complete
+    """
+    resolve = get_resolve()
+    project = resolve.get_project_manager().get_current_project()
+
+    if every or timelines:
+        by_name = project_timelines(project)
+        missing = [name for name in timelines if name not in by_name]
+        if missing:
+            raise click.BadParameter(f"No timeline called {missing[0]!r}")
+        chosen = (
+            list(by_name.items()) if every else [(n, by_name[n]) for n in timelines]
+        )
+    else:
+        current = project.get_current_timeline()
+        if current is None:
+            raise click.UsageError("No timeline is open, so name some")
+        chosen = [(current.get_name(), current)]
+
+    if preset is not None and preset not in project.get_render_preset_list():
+        raise click.BadParameter(f"No render preset called {preset!r}")
+
+    if color is not None:
+        deliverables = marked_ranges(chosen, color)
+    else:
+        deliverables = [Deliverable(name, timeline) for name, timeline in chosen]
+    for deliverable in deliverables:
+        deliverable.name = deliverable.name.replace(os.sep, "-")
+    if not deliverables:
+        print("🎬 Nothing to render")
+        return
+
+    target_dir = str(Path(dst).absolute())
+    extra = dict(render_setting(setting) for setting in settings)
+    queued = queue(project, deliverables, target_dir, preset, extra)
+    print(
+        f"🎬 Queued {len(queued)}/{len(deliverables)} jobs, rendering to {target_dir}"
+    )
+    if not queued or not start:
+        sys.exit(len(queued) != len(deliverables))
+
+    project.start_rendering(*[deliverable.job_id for deliverable in queued])
+    started = time.perf_counter()
+    try:
+        failed = monitor(
+            project, queued, interval, max_interval, Table(sys.stdout.isatty())
+        )
+    except KeyboardInterrupt:
+        project.stop_rendering()
+        print("\n🎬 Stopped rendering")
+        sys.exit(1)
+
+    took = seconds(int((time.perf_counter() - started) * 1000))
+    print(f"✅ Rendered {len(queued) - failed}/{len(queued)} jobs in {took}")
+    if failed or len(queued) != len(deliverables):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+# Request tracing
+_Where did the wall clock go?_
+
+Set `DAISYCHAIN_TRACE=/path/to/trace.json` (or call `start_tracing`)
+and every `rpc` is recorded as a set of spans:
+
+- client encode / connect / send
+- network + host timer wait (time the request sat before the host got to it)
+- host queue / decode / Resolve call / encode (as timed by the host)
+- client decode
+
+On exit the spans are written as Chrome trace events, which can be
+opened in `chrome://tracing` or https://ui.perfetto.dev
+"""
+
+from typing import Optional
+import threading
+import atexit
+import json
+import time
+import os
+
+CLIENT_PID = 1
+HOST_PID = 2
+
+
+class Tracer:
+    """Collects Chrome trace events, written out on `save`"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.events: list[dict] = [
+            _process_name(CLIENT_PID, f"daisychain client (pid {os.getpid()})"),
+            _process_name(HOST_PID, "DaisyChain Host"),
+        ]
+
+    def us(self, t: float) -> float:
+        """perf_counter seconds -> trace microseconds"""
+        return (t - self.origin) * 1e6
+
+    def span(
+        self,
+        name: str,
+        start: float,
+        end: float,
+        pid: int = CLIENT_PID,
+        cat: str = "rpc",
+        args: Optional[dict] = None,
+    ):
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": self.us(start),
+            "dur": max(0.0, (end - start) * 1e6),
+            "pid": pid,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self.lock:
+            self.events.append(event)
+
+    def record_rpc(self, name: str, marks: dict, timings: Optional[dict]):
+        """
+        Record one request from the client's `marks` (perf_counter times)
+        and the host's reply `timings` (milliseconds), if it sent any
+        """
+        self.span(name, marks["start"], marks["end"], args={"impl": name})
+        self.span("client encode", marks["start"], marks["encoded"])
+        self.span("connect", marks["encoded"], marks["connected"])
+        self.span("send", marks["connected"], marks["sent"])
+        self.span("client decode", marks["received"], marks["end"])
+
+        if not timings:
+            self.span("network + host", marks["sent"], marks["received"])
+            return
+
+        # the host's clock isn't ours, so its spans are laid out
+        # to finish as the reply arrives; whatever is left of the
+        # wait is network transfer plus waiting for the host's timer
+        stages = [
+            ("host queue", timings.get("queue_ms", 0.0)),
+            ("host decode", timings.get("decode_ms", 0.0)),
+            ("resolve call", timings.get("call_ms", 0.0)),
+            ("host encode", timings.get("encode_ms", 0.0)),
+        ]
+        host_s = sum(ms for _, ms in stages) / 1000
+        host_start = max(marks["sent"], marks["received"] - host_s)
+
+        self.span("network + host timer wait", marks["sent"], host_start)
+        self.span(name, host_start, host_start + host_s, pid=HOST_PID)
+        at = host_start
+        for stage, ms in stages:
+            self.span(stage, at, at + ms / 1000, pid=HOST_PID)
+            at += ms / 1000
+
+    def save(self):
+        with self.lock:
+            events = list(self.events)
+        with open(self.path, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+        print(f"🌼 Wrote {len(events)} trace events to {self.path}")
+
+
+def _process_name(pid: int, name: str) -> dict:
+    return {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": name}}
+
+
+tracer: Optional[Tracer] = None
+
+
+def start_tracing(path: str) -> Tracer:
+    """Trace every rpc from now on, saving to `path` at exit"""
+    global tracer
+    if tracer is None:
+        atexit.register(stop_tracing)
+    tracer = Tracer(path)
+    return tracer
+
+
+def stop_tracing():
+    """Stop tracing and write out what was recorded"""
+    global tracer
+    if tracer is not None:
+        tracer.save()
+        tracer = None
+
+
+if os.environ.get("DAISYCHAIN_TRACE"):
+    start_tracing(os.environ["DAISYCHAIN_TRACE"])
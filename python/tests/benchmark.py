@@ -0,0 +1,307 @@
+"""
+# Benchmarks
+_Latency, throughput and payload size, offline_
+
+Runs the real DaisyChain Host against a fake Resolve (see `daisychain.fake`)
+holding a synthetic project, then times the core calls and the bundled
+scripts through it, optionally over a simulated network (`daisychain.netsim`).
+No Resolve required:
+
+```
+python tests/benchmark.py --clips 50000 --timeline-items 5000
+python tests/benchmark.py --latency 0.002 --json results.json
+python tests/benchmark.py --network wifi --network loopback
+python tests/benchmark.py --codec json --codec msgpack
+```
+
+Per-call bytes come from the Host's own `daisychain_stats`.
+"""
+
+from daisychain.fake import generate_project, run_host
+from daisychain.netsim import NetworkSimulator, PROFILES
+from daisychain.remote import rpc_stats, CODECS
+from daisychain import remote
+from daisychain.resolve import MediaPoolFolder
+from daisychain.scripts import collate, copycat
+import daisychain
+
+from typing import Callable, Optional, Tuple
+from pathlib import Path
+import contextlib
+import statistics
+import tempfile
+import click
+import json
+import time
+import io
+
+
+def method_bytes(before: dict, after: dict) -> tuple:
+    """Bytes in & out for everything but the stats calls themselves"""
+    sent = received = 0
+    for name, method in after["methods"].items():
+        if name == "DaisyChain.daisychain_stats":
+            continue
+        prior = before["methods"].get(name, {"bytes_in": 0, "bytes_out": 0})
+        sent += method["bytes_in"] - prior["bytes_in"]
+        received += method["bytes_out"] - prior["bytes_out"]
+    return sent, received
+
+
+def bench(name: str, run: Callable[[], int], repeat: int = 1) -> dict:
+    """
+    Time `run` (which returns how many requests it made) `repeat` times
+    """
+    before = rpc_stats()
+    times = []
+    requests = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        requests += run()
+        times.append(time.perf_counter() - start)
+    after = rpc_stats()
+    sent, received = method_bytes(before, after)
+
+    total = sum(times)
+    return {
+        "name": name,
+        "repeat": repeat,
+        "requests": requests,
+        "total_s": total,
+        "p50_ms": 1000 * statistics.median(times),
+        "p95_ms": 1000 * sorted(times)[min(len(times) - 1, int(0.95 * len(times)))],
+        "requests_per_s": requests / total if total else 0.0,
+        "bytes_in": sent,
+        "bytes_out": received,
+    }
+
+
+def core_benchmarks(resolve, repeat: int, loop_clips: int) -> list:
+    project = resolve.get_project_manager().get_current_project()
+    media_pool = project.get_media_pool()
+    root = media_pool.get_root_folder()
+    timeline = project.get_current_timeline()
+    clips = root.get_clip_list()[:loop_clips]
+
+    def round_trip():
+        resolve.get_product_name()
+        return 1
+
+    def walk(folder: MediaPoolFolder) -> int:
+        requests = 2
+        folder.get_clip_list()
+        for sub in folder.get_subfolder_list():
+            requests += walk(sub)
+        return requests
+
+    def clip_property_loop():
+        for clip in clips:
+            clip.get_clip_property("File Path")
+        return len(clips)
+
+    def clip_properties_all():
+        for clip in clips:
+            clip.get_clip_property()
+        return len(clips)
+
+    def timeline_items():
+        timeline.get_item_list_in_track("video", 1)
+        return 1
+
+    def thumbnail():
+        timeline.get_current_clip_thumbnail_image()
+        return 1
+
+    def markers():
+        timeline.get_markers()
+        return 1
+
+    return [
+        bench("round trip (GetProductName)", round_trip, repeat),
+        bench("walk bins (GetClipList per bin)", lambda: walk(root)),
+        bench(f"{len(clips)} × GetClipProperty(name)", clip_property_loop),
+        bench(f"{len(clips)} × GetClipProperty()", clip_properties_all),
+        bench("timeline items (V1)", timeline_items, repeat),
+        bench("thumbnail", thumbnail, repeat),
+        bench("markers", markers, repeat),
+    ]
+
+
+def script_benchmarks(resolve, repeat: int, media_dir: Path, import_files: int) -> list:
+    project = resolve.get_project_manager().get_current_project()
+    media_pool = project.get_media_pool()
+
+    # collate one (leaf) bin of real files into a scratch directory
+    folder = media_pool.get_root_folder()
+    while folder.get_subfolder_list():
+        folder = folder.get_subfolder_list()[0]
+    into = media_dir / "collated"
+    into.mkdir(exist_ok=True)
+
+    def collate_bin():
+        with contextlib.redirect_stdout(io.StringIO()):
+            collate.collate(folder, into, "copy", media_pool=media_pool)
+        # the bin's contents, every clip's path (in one batch) & one relink
+        return 2 + 1 + 1
+
+    # bindive: one import_media with every new file
+    incoming = media_dir / "incoming"
+    incoming.mkdir(exist_ok=True)
+    paths = []
+    for n in range(import_files):
+        path = incoming / f"incoming_{n:05d}.mov"
+        path.write_bytes(bytes(1024))
+        paths.append(str(path))
+
+    def bindive_import():
+        media_pool.import_media(paths)
+        return 1
+
+    # copycat: parked on one clip, it asks the host to watch for another
+    item_id = remote.watch(project, copycat.CURRENT_ITEM, timeout=0)
+
+    def copycat_tick():
+        remote.watch(project, copycat.CURRENT_ITEM, item_id, timeout=0)
+        return 1
+
+    return [
+        bench(f"collate one bin ({len(folder.get_clip_list())} clips)", collate_bin),
+        bench(f"bindive import ({import_files} files)", bindive_import),
+        bench("copycat tick", copycat_tick, repeat),
+    ]
+
+
+def run_benchmarks(
+    media_dir: Path, repeat: int, loop_clips: int, import_files: int
+) -> list:
+    resolve = daisychain.get_resolve()
+    results = core_benchmarks(resolve, repeat, loop_clips)
+    results += script_benchmarks(resolve, repeat, media_dir, import_files)
+    return results
+
+
+def print_results(results: list):
+    header = (
+        f"{'benchmark':<36} {'requests':>8} {'total':>9} {'p50':>10}"
+        f" {'p95':>10} {'req/s':>8} {'bytes in':>10} {'bytes out':>11}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['name']:<36} {r['requests']:>8,} {r['total_s']:>8.2f}s"
+            f" {r['p50_ms']:>7.2f} ms {r['p95_ms']:>7.2f} ms {r['requests_per_s']:>8.1f}"
+            f" {r['bytes_in']:>10,} {r['bytes_out']:>11,}"
+        )
+
+
+@click.command()
+@click.option("--clips", default=5_000, help="Clips in the synthetic project")
+@click.option("--bin-depth", default=3, help="Depth of the bin tree")
+@click.option("--bin-fanout", default=3, help="Bins per bin")
+@click.option("--timeline-items", default=1_000, help="Items on the timeline")
+@click.option("--latency", default=0.0, help="Seconds per Resolve API call")
+@click.option("--interval", type=int, default=None, help="Host timer (ms)")
+@click.option("--repeat", default=20, help="Repeats of the small benchmarks")
+@click.option("--loop-clips", default=100, help="Clips in the per-clip loops")
+@click.option("--import-files", default=200, help="Files for bindive to import")
+@click.option(
+    "--network",
+    "networks",
+    type=click.Choice(list(PROFILES)),
+    multiple=True,
+    help="Simulated network(s) to run over (default: none)",
+)
+@click.option(
+    "--codec",
+    "codecs",
+    type=click.Choice(list(CODECS)),
+    multiple=True,
+    help="Wire codec(s) to compare (default: the best both sides speak)",
+)
+@click.option("--json", "json_path", type=click.Path(), default=None)
+def main(
+    clips: int,
+    bin_depth: int,
+    bin_fanout: int,
+    timeline_items: int,
+    latency: float,
+    interval: Optional[int],
+    repeat: int,
+    loop_clips: int,
+    import_files: int,
+    networks: Tuple[str, ...],
+    codecs: Tuple[str, ...],
+    json_path: Optional[str],
+):
+    """Benchmark the Host, core calls and bundled scripts against a fake Resolve"""
+    with tempfile.TemporaryDirectory() as scratch:
+        media_dir = Path(scratch)
+        start = time.perf_counter()
+        fake = generate_project(
+            clips=clips,
+            bin_depth=bin_depth,
+            bin_fanout=bin_fanout,
+            timeline_items=timeline_items,
+            media_dir=media_dir / "media",
+            latency=latency,
+        )
+        print(
+            f"🌼 Generated {clips:,} clips & {timeline_items:,} timeline items"
+            f" in {time.perf_counter() - start:.1f}s"
+        )
+
+        results = {}
+        with run_host(fake, interval_ms=interval):
+            host_port, share_above = remote.PORT, remote.SHARE_ABOVE
+            remote.AGENT = None  # measure the host, not a running agent's cache
+            for network in networks or (None,):
+                for codec in codecs or (None,):
+                    remote.CODEC = codec
+                    name = " · ".join(filter(None, (network or "direct", codec)))
+                    if network is None:
+                        results[name] = run_benchmarks(
+                            media_dir, repeat, loop_clips, import_files
+                        )
+                        continue
+
+                    simulator = NetworkSimulator(
+                        PROFILES[network], target=(remote.HOST, host_port)
+                    )
+                    with simulator:
+                        # replies shared through memory would skip the network
+                        remote.PORT, remote.SHARE_ABOVE = simulator.port, -1
+                        try:
+                            results[name] = run_benchmarks(
+                                media_dir, repeat, loop_clips, import_files
+                            )
+                        finally:
+                            remote.PORT, remote.SHARE_ABOVE = host_port, share_above
+
+    for network, network_results in results.items():
+        print(f"\n📶 {network}")
+        print_results(network_results)
+
+    if json_path is not None:
+        with open(json_path, "w") as json_file:
+            json.dump(
+                {
+                    "config": {
+                        "clips": clips,
+                        "bin_depth": bin_depth,
+                        "bin_fanout": bin_fanout,
+                        "timeline_items": timeline_items,
+                        "latency": latency,
+                        "interval": interval,
+                        "networks": list(networks),
+                        "codecs": list(codecs),
+                    },
+                    "results": results,
+                },
+                json_file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
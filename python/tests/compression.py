@@ -0,0 +1,151 @@
+"""
+# Compression crossover
+_From what size does compressing a reply pay for itself?_
+
+Times replies of growing size (a project's settings, padded out with
+metadata-like text) with compression off and on, straight to the Host
+and over simulated networks (`daisychain.netsim`), against a fake Resolve:
+
+```
+python tests/compression.py
+python tests/compression.py --network wifi --network vpn --repeat 20
+```
+
+The crossover for each network is the smallest size from which
+compressed replies are faster, a guide for `DAISYCHAIN_COMPRESS_ABOVE`.
+"""
+
+from daisychain.fake import generate_project, run_host
+from daisychain.netsim import NetworkSimulator, PROFILES
+from daisychain import remote
+import daisychain
+
+from typing import Optional, Tuple
+import statistics
+import random
+import click
+import json
+import time
+
+SIZES = (1, 4, 16, 64, 256, 1024, 4096)  # KiB
+
+WORDS = (
+    "A001 C004 scene take camera roll reel angle shot day night interior exterior"
+    " Sony ARRI RED Blackmagic ProRes 422 HQ 4444 DNxHR H.264 HEVC 23.976 24 25"
+    " 29.97 3840 2160 1920 1080 Rec709 Log-C S-Log3 good circled wild track"
+).split()
+
+
+def settings_of_size(size: int, seed: int = 0) -> dict:
+    """About `size` bytes (as json) of settings-like keys & text"""
+    rand = random.Random(seed)
+    settings = {}
+    total = 0
+    while total < size:
+        key = f"{rand.choice(WORDS)}{len(settings)}"
+        value = " ".join(rand.choice(WORDS) for _ in range(rand.randint(1, 12)))
+        settings[key] = value
+        total += len(key) + len(value) + 6
+    return settings
+
+
+def time_replies(project, repeat: int, compress_above: int) -> float:
+    """Median seconds to fetch the settings, compressing over `compress_above`"""
+    remote.COMPRESS_ABOVE = compress_above
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        project.get_setting()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def crossover(fake, repeat: int) -> list:
+    resolve = daisychain.get_resolve()
+    project = resolve.get_project_manager().get_current_project()
+    if remote.compression is None:
+        raise click.ClickException("the Host doesn't compress")
+
+    rows = []
+    for kib in SIZES:
+        fake.GetProjectManager().GetCurrentProject()._settings = settings_of_size(
+            kib * 1024
+        )
+        rows.append(
+            {
+                "kib": kib,
+                "plain_ms": 1000 * time_replies(project, repeat, -1),
+                "compressed_ms": 1000 * time_replies(project, repeat, 0),
+            }
+        )
+    return rows
+
+
+def find_crossover(rows: list) -> Optional[int]:
+    """Smallest size (KiB) from which compressing is always faster"""
+    found = None
+    for row in reversed(rows):
+        if row["compressed_ms"] >= row["plain_ms"]:
+            break
+        found = row["kib"]
+    return found
+
+
+def print_rows(rows: list):
+    print(f"{'size':>9} {'plain':>10} {'compressed':>12} {'speedup':>8}")
+    for row in rows:
+        print(
+            f"{row['kib']:>6} KiB {row['plain_ms']:>7.2f} ms {row['compressed_ms']:>9.2f} ms"
+            f" {row['plain_ms'] / row['compressed_ms']:>7.2f}×"
+        )
+
+
+@click.command()
+@click.option("--repeat", default=10, help="Replies timed per size")
+@click.option("--interval", type=int, default=1, help="Host timer (ms)")
+@click.option(
+    "--network",
+    "networks",
+    type=click.Choice(list(PROFILES)),
+    multiple=True,
+    help="Simulated network(s) (default: loopback & wifi)",
+)
+@click.option("--json", "json_path", type=click.Path(), default=None)
+def main(
+    repeat: int, interval: int, networks: Tuple[str, ...], json_path: Optional[str]
+):
+    """Find where compressing replies starts paying off, per network"""
+    fake = generate_project(clips=10, timelines=1, timeline_items=10)
+
+    results = {}
+    with run_host(fake, interval_ms=interval):
+        host_port, share_above = remote.PORT, remote.SHARE_ABOVE
+        remote.AGENT = None  # measure the host, not a running agent's cache
+        for network in networks or ("loopback", "wifi"):
+            simulator = NetworkSimulator(
+                PROFILES[network], target=(remote.HOST, host_port), seed=0
+            )
+            with simulator:
+                # replies shared through memory would skip the network
+                remote.PORT, remote.SHARE_ABOVE = simulator.port, -1
+                try:
+                    results[network] = crossover(fake, repeat)
+                finally:
+                    remote.PORT, remote.SHARE_ABOVE = host_port, share_above
+
+    for network, rows in results.items():
+        print(f"\n📶 {network}")
+        print_rows(rows)
+        kib = find_crossover(rows)
+        if kib is None:
+            print("🗜️  compressing never pays off")
+        else:
+            print(f"🗜️  compressing pays off from {kib} KiB")
+
+    if json_path is not None:
+        with open(json_path, "w") as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
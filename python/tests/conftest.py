@@ -0,0 +1,44 @@
+"""
+Fixtures running the real DaisyChain Host against a fake Resolve
+(see `daisychain.fake`), so no Resolve required:
+
+```
+cd python && python -m pytest
+```
+"""
+
+from daisychain.fake import generate_project, run_host
+from daisychain import remote
+import daisychain
+
+from typing import Any, Callable, Tuple
+import pytest
+
+
+@pytest.fixture
+def fake():
+    """A small synthetic project"""
+    return generate_project(
+        clips=60, bin_depth=1, bin_fanout=2, timelines=3, timeline_items=30, markers=4
+    )
+
+
+@pytest.fixture
+def host(fake, monkeypatch):
+    """The Host, serving `fake`, straight to it (not through an agent)"""
+    monkeypatch.setattr(remote, "AGENT", None)
+    with run_host(fake, interval_ms=1) as host:
+        yield host
+
+
+@pytest.fixture
+def project(host):
+    return daisychain.get_resolve().get_project_manager().get_current_project()
+
+
+def round_trips(call: Callable, *args) -> Tuple[Any, int]:
+    """What `call(*args)` returns, and how many requests it sent the Host"""
+    before = remote.rpc_stats()["requests"]
+    value = call(*args)
+    # less the request for `before`
+    return value, remote.rpc_stats()["requests"] - before - 1
@@ -0,0 +1,110 @@
+"""
+# Import time
+_How long before a hotkey-triggered script can do anything?_
+
+Imports the package and its scripts in fresh interpreters with
+`python -X importtime`, reporting the median cumulative time of each,
+and checks that none of them pulls in what it only needs later
+(asyncio, unsync, watchfiles, pyperclip, the Fusion classes, ...):
+
+```
+python tests/import_time.py
+python tests/import_time.py --repeat 20 --top 10 --budget 50
+```
+
+Exits non-zero if a module imports something it shouldn't, or takes
+longer than `--budget` milliseconds.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+import statistics
+import subprocess
+import click
+import json
+import sys
+
+# what each module must not import (until it's used)
+DEFERRED = (
+    "asyncio",
+    "unsync",
+    "watchfiles",
+    "pyperclip",
+    "daisychain.fusion",
+    "daisychain.trace",
+    "daisychain.profiling",
+    "daisychain.replay",
+)
+MODULES = {
+    "daisychain": DEFERRED + ("daisychain.remote", "daisychain.resolve"),
+    "daisychain.resolve": DEFERRED,
+    "daisychain.scripts.bindive": DEFERRED + ("daisychain.resolve",),
+    "daisychain.scripts.collate": DEFERRED + ("daisychain.resolve",),
+    "daisychain.scripts.copycat": DEFERRED + ("daisychain.resolve",),
+    "daisychain.scripts.render": DEFERRED + ("daisychain.resolve",),
+    "daisychain.scripts.cli": DEFERRED + ("daisychain.agent", "daisychain.netsim"),
+}
+
+
+def import_times(module: str) -> Dict[str, Tuple[int, int]]:
+    """Self & cumulative µs of every module imported by `import module`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],  # where the package is
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def measure(module: str, repeat: int) -> dict:
+    runs = [import_times(module) for _ in range(repeat)]
+    imported = set(runs[0])
+    slowest = sorted(runs[0].items(), key=lambda item: item[1][0], reverse=True)
+    return {
+        "ms": statistics.median(run[module][1] for run in runs) / 1000,
+        "imported": sorted(imported),
+        "unwanted": sorted(imported & set(MODULES[module])),
+        "slowest": [(name, own / 1000) for name, (own, _) in slowest],
+    }
+
+
+@click.command()
+@click.option("--repeat", default=7, help="Fresh interpreters per module")
+@click.option("--top", default=0, help="Slowest imports to list per module")
+@click.option("--budget", type=float, default=None, help="Max ms per module")
+@click.option("--json", "json_path", type=click.Path(), default=None)
+def main(repeat: int, top: int, budget: Optional[float], json_path: Optional[str]):
+    """Time importing the package & scripts, and check what they import"""
+    results = {}
+    failures: List[str] = []
+    for module in MODULES:
+        result = results[module] = measure(module, repeat)
+        print(f"{module:<32} {result['ms']:>8.2f} ms")
+        for name, ms in result["slowest"][:top]:
+            print(f"    {name:<40} {ms:>6.2f} ms")
+        if result["unwanted"]:
+            failures.append(f"{module} imports {', '.join(result['unwanted'])}")
+        if budget is not None and result["ms"] > budget:
+            failures.append(f"{module} takes {result['ms']:.1f} ms (> {budget} ms)")
+
+    if json_path is not None:
+        with open(json_path, "w") as json_file:
+            json.dump(results, json_file, indent=2)
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("\n✅ Nothing imported before it's needed")
+
+
+if __name__ == "__main__":
+    main()
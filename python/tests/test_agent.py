@@ -0,0 +1,55 @@
+from daisychain.fake import run_host
+from daisychain.agent import Agent
+from daisychain import remote
+import daisychain
+
+import pytest
+
+
+@pytest.fixture
+def agent(host, tmp_path, monkeypatch):
+    """An agent in front of the Host, caching replies for a minute"""
+    with Agent(path=str(tmp_path / "agent.sock"), ttl=60) as agent:
+        monkeypatch.setattr(remote, "AGENT", agent.path)
+        yield agent
+
+
+def test_replies_are_cached(agent):
+    project = daisychain.get_resolve().get_project_manager().get_current_project()
+    project.get_name()
+    before = agent.stats["host"]
+    assert project.get_name() == "Synthetic Project"
+    assert agent.stats["host"] == before
+
+
+def test_changes_clear_the_cache(agent):
+    project = daisychain.get_resolve().get_project_manager().get_current_project()
+    assert project.get_render_job_list() == []
+    project.add_render_job()
+    assert len(project.get_render_job_list()) == 1
+
+
+def test_batches_clear_the_cache(agent):
+    project = daisychain.get_resolve().get_project_manager().get_current_project()
+    assert project.get_render_job_list() == []
+    remote.batch(project, ["AddRenderJob", "AddRenderJob"])
+    assert len(project.get_render_job_list()) == 2
+
+    # but not those which only get
+    before = agent.stats["host"]
+    remote.batch(project, ["GetName"])
+    project.get_render_job_list()
+    assert agent.stats["host"] == before + 1
+
+
+def test_host_restarts(fake, host, agent):
+    project = daisychain.get_resolve().get_project_manager().get_current_project()
+    clips = project.get_media_pool().get_root_folder().get_clip_list()
+    names = [clip.get_name() for clip in clips[:4]]
+    host.stop()
+    with run_host(fake, interval_ms=1):
+        # not cached, so found again at the restarted host
+        assert clips[3].get_clip_property("File Path").endswith(names[3])
+        assert [clip.get_name() for clip in clips[:4]] == names
+    # the agent agreed on its own codec with the host, leaving ours be
+    assert remote.codec.name == "json"
@@ -0,0 +1,51 @@
+from conftest import round_trips
+from daisychain.scripts.bindive import mirror_bins
+
+from pathlib import Path
+
+
+def test_mirror_bins_requests(project):
+    # a few requests a level, however many bins
+    mpool = project.get_media_pool()
+    root = mpool.get_root_folder()
+    dirs = [Path("top") / f"day {d}" / f"cam {c}" for d in range(5) for c in range(4)]
+    bins, sent = round_trips(mirror_bins, mpool, root, dirs)
+    # the root listed, then a level at a time: add, list, name
+    assert sent == 2 + 3 * 3
+    assert all(bins[d].get_name() == d.name for d in dirs)
+    # and reused after
+    again, sent = round_trips(mirror_bins, mpool, root, dirs)
+    assert sent == 2 * 3  # list, name
+    assert {d: b.get_name() for d, b in again.items()} == {
+        d: b.get_name() for d, b in bins.items()
+    }
+
+
+def test_watch_mode_survives_failed_imports(tmp_path, monkeypatch, capsys):
+    from daisychain.scripts import bindive
+    from daisychain import remote
+    import watchfiles
+    import time
+
+    clip = tmp_path / "clip.mov"
+    clip.write_bytes(b"frames")
+
+    def filewatch(*args, **kwargs):
+        yield {(watchfiles.Change.added, str(clip))}
+        for _ in range(6):
+            time.sleep(0.02)
+            yield set()
+
+    tried = []
+
+    def import_settled(mpool, settled, chunk, index=None):
+        tried.append([path for path, _ in settled])
+        if len(tried) == 1:
+            raise remote.RPCTimeout("the Host went quiet")
+        return len(settled)
+
+    monkeypatch.setattr(watchfiles, "watch", filewatch)
+    monkeypatch.setattr(bindive, "import_settled", import_settled)
+    bindive.watch_mode(None, str(tmp_path), settle=0.01)
+    assert tried == [[clip], [clip]]
+    assert "trying again" in capsys.readouterr().out
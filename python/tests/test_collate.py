@@ -0,0 +1,79 @@
+from conftest import round_trips
+from daisychain.fake import generate_project, run_host
+from daisychain.scripts import collate
+from daisychain import remote
+import daisychain
+
+import pytest
+
+
+@pytest.fixture
+def media_pool(tmp_path, monkeypatch):
+    fake = generate_project(
+        clips=40,
+        bin_depth=1,
+        bin_fanout=2,
+        timeline_items=10,
+        media_dir=tmp_path / "media",
+    )
+    monkeypatch.setattr(remote, "AGENT", None)
+    with run_host(fake, interval_ms=1):
+        project = daisychain.get_resolve().get_project_manager().get_current_project()
+        yield project.get_media_pool()
+
+
+def test_collate_relinks(media_pool, tmp_path):
+    into = tmp_path / "collated"
+    root = media_pool.get_root_folder()
+    assert collate.collate(root, into, "copy", media_pool=media_pool) == 0
+
+    clips = collate.plan(root, into)
+    assert len(clips) == 40
+    # the clips use the collated files now
+    assert all(job.src == job.dst and job.dst.exists() for job in clips)
+
+
+def test_collate_resumes(media_pool, tmp_path, monkeypatch, capsys):
+    into = tmp_path / "collated"
+    root = media_pool.get_root_folder()
+    file_action = collate.file_action
+    copies = []
+
+    def copy(src, dst, *args):
+        if stop and len(copies) == stop:
+            raise KeyboardInterrupt
+        copies.append(src)
+        return file_action(src, dst, *args)
+
+    monkeypatch.setattr(collate, "file_action", copy)
+    stop = 10
+    with pytest.raises(KeyboardInterrupt):
+        collate.collate(root, into, "copy", workers=1, media_pool=media_pool)
+
+    # picks up where it stopped, copying only the rest
+    copies.clear()
+    stop = None
+    assert collate.collate(root, into, "copy", media_pool=media_pool) == 0
+    assert "Resuming, 10 files were done already" in capsys.readouterr().out
+    assert len(copies) == 30
+
+
+def test_find_timeline_requests(project):
+    timeline, sent = round_trips(collate.find_timeline, project, "Timeline 2")
+    assert sent == 3  # count, timelines, names
+    assert timeline.get_name() == "Timeline 2"
+    assert collate.find_timeline(project, "Timeline 9") is None
+
+
+def test_file_action_verifies(tmp_path, monkeypatch):
+    src = tmp_path / "clip.mov"
+    src.write_bytes(b"frames" * 1000)
+    how, checksum = collate.file_action(src, tmp_path / "copy" / "clip.mov", check=True)
+    assert how == "copy" and checksum == collate.checksum(src)
+    assert (tmp_path / "copy" / "clip.mov").read_bytes() == src.read_bytes()
+
+    # the copy read back isn't what was read to copy
+    monkeypatch.setattr(collate, "checksum", lambda path: "garbled")
+    with pytest.raises(collate.ChecksumMismatch):
+        collate.file_action(src, tmp_path / "again" / "clip.mov", check=True)
+    assert list((tmp_path / "again").iterdir()) == []
@@ -0,0 +1,20 @@
+from conftest import round_trips
+from daisychain.fingerprint import MediaIndex
+from daisychain.fake import generate_project, run_host
+from daisychain import remote
+import daisychain
+
+
+def test_add_project_requests(tmp_path, monkeypatch):
+    # a few requests a level of bins, however many clips
+    monkeypatch.setattr(remote, "AGENT", None)
+    fake = generate_project(
+        clips=200, bin_depth=2, bin_fanout=3, timeline_items=5, media_dir=tmp_path
+    )
+    with run_host(fake, interval_ms=1):
+        project = daisychain.get_resolve().get_project_manager().get_current_project()
+        index = MediaIndex(project.get_name(), str(tmp_path / "index.json"))
+        added, sent = round_trips(index.add_project, project.get_media_pool())
+    assert added == 200
+    assert sent == 1 + 3 + 1  # the root bin, a request a level, the paths
+    assert index.new_files([str(path) for path in tmp_path.rglob("*.mov")]) == []
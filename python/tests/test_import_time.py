@@ -0,0 +1,10 @@
+from import_time import MODULES, import_times
+
+import pytest
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_nothing_imported_early(module):
+    # in a fresh interpreter, so whatever this one has imported doesn't count
+    unwanted = set(import_times(module)) & set(MODULES[module])
+    assert not unwanted, f"{module} imports {', '.join(sorted(unwanted))}"
@@ -0,0 +1,167 @@
+from conftest import round_trips
+from daisychain.fake import generate_project, run_host
+from daisychain.scripts import collate
+from daisychain import remote
+import daisychain
+
+import threading
+import time
+import pytest
+
+
+def test_batch_is_one_request(project):
+    timeline = project.get_current_timeline()
+    (start, end, markers), sent = round_trips(
+        remote.batch, timeline, ["GetStartFrame", "GetEndFrame", "GetMarkers"]
+    )
+    assert sent == 1
+    assert start < end and len(markers) == 4
+
+
+def test_batch_failures_are_errors(project):
+    name, nothing = remote.batch(project, ["GetName", ("GetTimelineByIndex", "x")])
+    assert name == "Synthetic Project"
+    assert isinstance(nothing, remote.RPCError)
+
+
+def test_batch_each_is_one_request(project):
+    clips = project.get_media_pool().get_root_folder().get_clip_list()
+    found, sent = round_trips(
+        remote.batch_each, clips, ["GetName", ("GetClipProperty", "File Path")]
+    )
+    assert sent == 1
+    assert len(found) == len(clips)
+    for clip, (name, file_path) in zip(clips, found):
+        assert file_path.endswith(name)
+
+
+def test_plan_timeline_requests(tmp_path, monkeypatch):
+    # however many items, a few requests
+    monkeypatch.setattr(remote, "AGENT", None)
+    fake = generate_project(
+        clips=100, bin_depth=0, timeline_items=500, markers=5, media_dir=tmp_path
+    )
+    with run_host(fake, interval_ms=1):
+        project = daisychain.get_resolve().get_project_manager().get_current_project()
+        timeline = project.get_current_timeline()
+        into = tmp_path / "collated"
+        jobs, sent = round_trips(collate.plan_timeline, timeline, into, "Blue")
+        assert sent == 5
+    assert jobs and all(job.dst.parent.parent == into for job in jobs)
+
+
+def test_watch_returns_changes(project):
+    timeline = project.get_current_timeline()
+    name = timeline.get_name()
+    renamed = threading.Timer(0.2, lambda: timeline.set_name("Renamed"))
+    renamed.start()
+    try:
+        assert remote.watch(timeline, ["GetName"], name, timeout=5) == "Renamed"
+    finally:
+        renamed.cancel()
+
+
+def test_watch_looks_every(fake, project):
+    # unchanged, the host looks again every `every` seconds, not every tick
+    timeline = project.get_current_timeline()
+    name = timeline.get_name()
+    before = fake._api.calls
+    assert remote.watch(timeline, ["GetName"], name, timeout=1, every=0.25) == name
+    assert fake._api.calls - before <= 6
+
+
+def test_watch_objects(codec, project):
+    # the object it had is no change, whichever the codec
+    timeline = remote.API_Object(remote.watch(project, ["GetCurrentTimeline"]))
+    start = time.monotonic()
+    remote.watch(project, ["GetCurrentTimeline"], timeline, timeout=0.5)
+    assert time.monotonic() - start > 0.4
+
+
+def test_watch_refuses_bad_args(project):
+    with pytest.raises(remote.RPCError):
+        project.rpc("daisychain_watch", "GetName")
+    assert project.get_name() == "Synthetic Project"
+
+
+@pytest.fixture(params=["json", "msgpack"])
+def codec(request, monkeypatch):
+    pytest.importorskip(request.param)
+    monkeypatch.setattr(remote, "CODEC", request.param)
+    return request.param
+
+
+def reset(host):
+    """Have the host forget every handle"""
+    host.click("reset_btn")
+    time.sleep(0.1)
+
+
+def test_stale_handles_recover(codec, host, project):
+    assert remote.codec.name == codec
+    clips = project.get_media_pool().get_root_folder().get_clip_list()
+    names = [clip.get_name() for clip in clips[:4]]
+    reset(host)
+    assert [clip.get_name() for clip in clips[:4]] == names
+
+
+def test_stale_handles_arent_found_as_others(codec, fake, host, project):
+    clips = project.get_media_pool().get_root_folder().get_clip_list()
+    names = [clip.get_name() for clip in clips[:6]]
+    # removed behind our back, so the next clips move into its place
+    fake._project_manager._current._media_pool._root._clips.pop(3)
+    reset(host)
+    assert clips[1].get_name() == names[1]
+    with pytest.raises(remote.StaleHandleError):
+        clips[5].get_name()  # a sibling, found with the first
+    with pytest.raises(remote.StaleHandleError):
+        clips[3].get_name()
+
+
+def test_listings_ask_for_no_ids(fake, project):
+    root = project.get_media_pool().get_root_folder()
+    before = fake._api.calls
+    clips = root.get_clip_list()
+    assert len(clips) > 1 and fake._api.calls - before == 1
+
+
+def test_only_quick_reads_are_sent_again():
+    assert remote.idempotent("GetName")
+    for impl in ("GetCurrentTimeline", "daisychain_batch", "ImportMedia", "SetName"):
+        assert not remote.idempotent(impl)
+
+
+def test_retries_keep_to_the_deadline(monkeypatch):
+    sent = []
+
+    def unanswered(rqst, marks=None, timeout=None):
+        sent.append(timeout)
+        time.sleep(min(timeout, 0.2))
+        raise remote.RPCTimeout("TimeoutError: no reply from the host")
+
+    monkeypatch.setattr(remote, "rpc_exchange", unanswered)
+    monkeypatch.setattr(remote, "breaker", remote.CircuitBreaker(failures=100))
+    monkeypatch.setattr(remote, "BACKOFF", 0.01)
+    rqst = {"root": {}, "impl": "GetName", "args": [], "kwgs": {}}
+    start = time.monotonic()
+    with pytest.raises(remote.RPCTimeout):
+        remote.rpc_send(rqst, timeout=0.3)
+    assert time.monotonic() - start < 0.45
+    # sent again, but only for what's left of the one deadline
+    assert len(sent) > 1 and all(timeout < 0.11 for timeout in sent[1:])
+
+
+def test_keep_open_is_per_thread(project):
+    def requests():
+        remote.keep_open()
+        project.get_name()
+        kept = remote.kept.sock
+        project.get_name()
+        found.append(kept is remote.kept.sock)
+
+    found = []
+    importer = threading.Thread(target=requests)
+    importer.start()
+    importer.join()
+    assert found == [True] and not remote.KEEP_OPEN
+    assert getattr(remote.kept, "sock", None) is None  # not this thread's
@@ -0,0 +1,32 @@
+from conftest import round_trips
+from daisychain.scripts import render
+
+
+def test_queue(fake, project, tmp_path):
+    timelines = render.project_timelines(project)
+    deliverables = [render.Deliverable(name, t) for name, t in timelines.items()]
+    queued = render.queue(project, deliverables, str(tmp_path), None, {})
+    assert [d.name for d in queued] == ["Timeline 1", "Timeline 2", "Timeline 3"]
+    assert all(d.job_id for d in queued)
+
+
+def test_queue_leaves_no_failed_jobs(fake, project, tmp_path, capsys):
+    timelines = render.project_timelines(project)
+    deliverables = [render.Deliverable(name, t) for name, t in timelines.items()]
+    # deleted behind our back, so it can't be made current to render
+    fake._project_manager._current._timelines.pop(1)
+    queued = render.queue(project, deliverables, str(tmp_path), None, {})
+
+    assert [d.name for d in queued] == ["Timeline 1", "Timeline 3"]
+    jobs = fake._project_manager._current._render_jobs.values()
+    assert [job["TimelineName"] for job in jobs] == ["Timeline 1", "Timeline 3"]
+    assert "Couldn't queue Timeline 2" in capsys.readouterr().out
+
+
+def test_marked_ranges(project):
+    timelines, sent = round_trips(render.project_timelines, project)
+    assert sent == 3  # count, timelines, names
+    ranges, sent = round_trips(render.marked_ranges, list(timelines.items()), "Blue")
+    assert sent == 1
+    assert [d.name for d in ranges] == [f"Timeline {n} - Section 1" for n in (1, 2, 3)]
+    assert all(d.mark_in < d.mark_out for d in ranges)